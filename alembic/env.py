@@ -4,6 +4,7 @@ from alembic import context
 from sqlalchemy import engine_from_config, pool
 
 from app.core.config import settings
+from app.models import idempotency, outbox, user_change  # noqa: F401
 from app.models.user import Base
 
 # This is the Alembic Config object, which provides
@@ -20,6 +21,13 @@ target_metadata = Base.metadata  # Setting target_metadata to Base.metadata
 def get_url():
     return settings.DATABASE_URL
 
+
+def is_online_mode() -> bool:
+    """Online (zero-downtime) mode, enabled with ``alembic -x online=true``."""
+    online = context.get_x_argument(as_dictionary=True).get("online", "")
+    return online.lower() in ("1", "true", "yes")
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = get_url()
@@ -36,6 +44,15 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Handed over by callers migrating a database of their own, such as
+        # app.utils.index_advisor
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = get_url()
     connectable = engine_from_config(
@@ -44,10 +61,26 @@ def run_migrations_online() -> None:
         poolclass=pool.NullPool,
     )
 
+    online = is_online_mode()
     with connectable.connect() as connection:
+        if online and connection.dialect.name == "postgresql":
+            # Fail fast instead of queueing behind long transactions while
+            # holding a lock that blocks every other query on the table
+            connection.exec_driver_sql(
+                f"SET lock_timeout = {settings.MIGRATION_LOCK_TIMEOUT_MS}"
+            )
+            connection.exec_driver_sql(
+                f"SET statement_timeout = {settings.MIGRATION_STATEMENT_TIMEOUT_MS}"
+            )
+            connection.commit()
+
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            # Read by app.utils.online_migrations
+            online=online,
+            # Keep locks short: commit after every revision
+            transaction_per_migration=online,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""Add case-insensitive email index
+
+Revision ID: 0cf608663bf9
+Revises: bae01881fced
+Create Date: 2026-10-19 14:21:09.583170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0cf608663bf9'
+down_revision: Union[str, None] = 'bae01881fced'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated by app.utils.index_advisor. The model no longer declares
+    # ix_users_id / ix_users_email (dropped in 2bc47df40ebe): the primary key
+    # and the email unique constraint already index those columns.
+    # Unique: get_by_email matches emails case-insensitively, so two users
+    # whose emails differ only in case would be ambiguous. Merge any such
+    # users before upgrading.
+    online.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    online.drop_index('ix_users_email_lower', 'users')
@@ -0,0 +1,56 @@
+"""Add user soft delete
+
+Revision ID: 21e2f0ecfef1
+Revises: f98ae7f2a096
+Create Date: 2026-10-19 17:25:37.916042
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '21e2f0ecfef1'
+down_revision: Union[str, None] = 'f98ae7f2a096'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_DELETED = sa.text('deleted_at IS NULL')
+DELETED = sa.text('deleted_at IS NOT NULL')
+
+# Indexes rebuilt as partial indexes over live users: (name, columns, unique)
+LIVE_USER_INDEXES = [
+    ('ix_users_active_superuser_id', ['is_active', 'is_superuser', 'id'], False),
+    ('ix_users_name_id', ['name', 'id'], False),
+    # A deleted user awaiting purge must not block its email for a new user
+    ('ix_users_email_lower', [sa.text('lower(email)')], True),
+]
+
+
+def upgrade() -> None:
+    online.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    for name, columns, unique in LIVE_USER_INDEXES:
+        _replace_index(name, columns, unique, postgresql_where=NOT_DELETED, sqlite_where=NOT_DELETED)
+    online.create_index('ix_users_deleted_at', 'users', ['deleted_at'], unique=False, postgresql_where=DELETED, sqlite_where=DELETED)
+
+
+def downgrade() -> None:
+    online.drop_index('ix_users_deleted_at', 'users')
+    for name, columns, unique in LIVE_USER_INDEXES:
+        _replace_index(name, columns, unique)
+    online.drop_column('users', 'deleted_at')
+
+
+def _replace_index(name, columns, unique, **kw) -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        online.drop_index(name, 'users')
+        online.create_index(name, 'users', columns, unique=unique, **kw)
+        return
+    # Build the new index beside the old one, so queries always have one
+    online.create_index(f'{name}_new', 'users', columns, unique=unique, **kw)
+    online.drop_index(name, 'users')
+    op.execute(f'ALTER INDEX {name}_new RENAME TO {name}')
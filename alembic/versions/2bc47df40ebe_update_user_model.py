@@ -24,13 +24,17 @@ def upgrade() -> None:
     op.drop_index('ix_users_email', table_name='users')
     op.drop_index('ix_users_id', table_name='users')
     op.drop_index('ix_users_name', table_name='users')
-    op.create_unique_constraint(None, 'users', ['email'])
+    # Batch mode rebuilds the table on SQLite, which cannot ALTER constraints;
+    # the name is the one Postgres gives an unnamed constraint
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.create_unique_constraint('users_email_key', ['email'])
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, 'users', type_='unique')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('users_email_key', type_='unique')
     op.create_index('ix_users_name', 'users', ['name'], unique=False)
     op.create_index('ix_users_id', 'users', ['id'], unique=False)
     op.create_index('ix_users_email', 'users', ['email'], unique=True)
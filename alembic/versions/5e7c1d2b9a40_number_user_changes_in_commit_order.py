@@ -0,0 +1,32 @@
+"""Number user changes in commit order
+
+Revision ID: 5e7c1d2b9a40
+Revises: c49a3d975936
+Create Date: 2026-10-19 21:04:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7c1d2b9a40'
+down_revision: Union[str, None] = 'c49a3d975936'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_change_sequence',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Continues after the changes numbered by the column default so far
+    op.execute('INSERT INTO user_change_sequence (id, value) SELECT 1, COALESCE(MAX(seq), 0) FROM user_changes')
+
+
+def downgrade() -> None:
+    op.drop_table('user_change_sequence')
@@ -0,0 +1,35 @@
+"""Add user updated_at
+
+Revision ID: 81e9b1a2a565
+Revises: a33d516ba8a0
+Create Date: 2026-10-19 18:31:47.208813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '81e9b1a2a565'
+down_revision: Union[str, None] = 'a33d516ba8a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    online.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Existing rows count as modified now; the database clock is UTC
+    online.backfill(
+        'users',
+        {'updated_at': sa.func.current_timestamp()},
+        name='users_updated_at',
+        where=sa.column('updated_at').is_(None),
+    )
+
+
+def downgrade() -> None:
+    online.drop_column('users', 'updated_at')
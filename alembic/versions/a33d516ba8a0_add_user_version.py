@@ -0,0 +1,28 @@
+"""Add user version
+
+Revision ID: a33d516ba8a0
+Revises: 21e2f0ecfef1
+Create Date: 2026-10-19 17:58:02.631904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a33d516ba8a0'
+down_revision: Union[str, None] = '21e2f0ecfef1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    online.add_column('users', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    online.drop_column('users', 'version')
@@ -0,0 +1,26 @@
+"""Add idempotency key owner
+
+Revision ID: b8f4e6a1c3d7
+Revises: 5e7c1d2b9a40
+Create Date: 2026-10-19 21:41:07.559812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f4e6a1c3d7'
+down_revision: Union[str, None] = '5e7c1d2b9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('owner', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'owner')
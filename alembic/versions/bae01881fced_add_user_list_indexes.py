@@ -0,0 +1,40 @@
+"""Add user list indexes
+
+Revision ID: bae01881fced
+Revises: 68e0d2564e0b
+Create Date: 2026-10-19 13:05:47.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bae01881fced'
+down_revision: Union[str, None] = '68e0d2564e0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The model gained these columns without a migration; add them where
+    # missing so the indexes below can be built
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'hashed_password' not in existing:
+        online.add_column('users', sa.Column('hashed_password', sa.String(), nullable=False, server_default=''))
+    if 'is_active' not in existing:
+        online.add_column('users', sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.true()))
+    if 'is_superuser' not in existing:
+        online.add_column('users', sa.Column('is_superuser', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+    online.create_index('ix_users_active_superuser_id', 'users', ['is_active', 'is_superuser', 'id'], unique=False)
+    online.create_index('ix_users_name_id', 'users', ['name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    online.drop_index('ix_users_name_id', 'users')
+    online.drop_index('ix_users_active_superuser_id', 'users')
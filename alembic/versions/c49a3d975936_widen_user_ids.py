@@ -0,0 +1,43 @@
+"""Widen user ids
+
+Revision ID: c49a3d975936
+Revises: 81e9b1a2a565
+Create Date: 2026-10-19 19:12:30.559120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c49a3d975936'
+down_revision: Union[str, None] = '81e9b1a2a565'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Snowflake ids of sharded users need 64 bits. On Postgres this rewrites
+    # both tables under an exclusive lock: run it in a maintenance window.
+    # SQLite integers are 64-bit already, but users.id stays INTEGER there to
+    # remain an autoincrementing rowid; user_changes.user_id is declared
+    # BIGINT like in the model.
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('user_changes') as batch_op:
+            batch_op.alter_column('user_id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+        return
+    online.with_lock_timeout(lambda: op.alter_column('users', 'id', type_=sa.BigInteger(), existing_type=sa.Integer()))
+    online.with_lock_timeout(lambda: op.alter_column('user_changes', 'user_id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('user_changes') as batch_op:
+            batch_op.alter_column('user_id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
+        return
+    online.with_lock_timeout(lambda: op.alter_column('user_changes', 'user_id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False))
+    online.with_lock_timeout(lambda: op.alter_column('users', 'id', type_=sa.Integer(), existing_type=sa.BigInteger()))
@@ -0,0 +1,34 @@
+"""Add user emails
+
+Revision ID: e2a9c4f7b150
+Revises: b8f4e6a1c3d7
+Create Date: 2026-10-19 22:15:36.902144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4f7b150'
+down_revision: Union[str, None] = 'b8f4e6a1c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_emails',
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('user_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    # Claims the emails of the live users of this database. With sharded
+    # users, run it on the default database after copying in the users of
+    # every shard, or backfill it from each shard in turn.
+    op.execute('INSERT INTO user_emails (email, user_id) SELECT lower(email), id FROM users WHERE deleted_at IS NULL')
+
+
+def downgrade() -> None:
+    op.drop_table('user_emails')
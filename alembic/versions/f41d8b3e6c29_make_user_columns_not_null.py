@@ -0,0 +1,47 @@
+"""Make user columns not null
+
+Revision ID: f41d8b3e6c29
+Revises: e2a9c4f7b150
+Create Date: 2026-10-19 22:18:04.117385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41d8b3e6c29'
+down_revision: Union[str, None] = 'e2a9c4f7b150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_DELETED = sa.text('deleted_at IS NULL')
+
+
+def upgrade() -> None:
+    # The model requires them and crud_user always sets them; only rows
+    # from before the model did may be NULL, and fail this migration
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('email', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('name', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('surname', existing_type=sa.String(length=100), nullable=False)
+    _restore_email_index()
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('surname', existing_type=sa.String(length=100), nullable=True)
+        batch_op.alter_column('name', existing_type=sa.String(), nullable=True)
+        batch_op.alter_column('email', existing_type=sa.String(), nullable=True)
+    _restore_email_index()
+
+
+def _restore_email_index() -> None:
+    # SQLite rebuilds the table, dropping the expression index it cannot
+    # reflect; Postgres alters it in place
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_users_email_lower')
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True, sqlite_where=NOT_DELETED)
@@ -0,0 +1,29 @@
+"""Add user token version
+
+Revision ID: f688f83001fb
+Revises: 2bc47df40ebe
+Create Date: 2026-10-19 09:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f688f83001fb'
+down_revision: Union[str, None] = '2bc47df40ebe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
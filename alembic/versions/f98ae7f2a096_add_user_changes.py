@@ -0,0 +1,33 @@
+"""Add user changes
+
+Revision ID: f98ae7f2a096
+Revises: a13b05b77575
+Create Date: 2026-10-19 16:48:11.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f98ae7f2a096'
+down_revision: Union[str, None] = 'a13b05b77575'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_changes',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.Text(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_changes')
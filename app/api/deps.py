@@ -1,13 +1,14 @@
-from typing import Generator
-
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
+from app.core import security
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import get_db
+from app.core.revocation import revocation_list
+from app.crud import crud_user, token_versions
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
@@ -16,31 +17,38 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 
-def get_db() -> Generator:
+def get_token_payload(token: str = Depends(reusable_oauth2)) -> TokenPayload:
     try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
+        payload = security.decode_token(token)
+        token_data = TokenPayload(**payload)
+    except (jwt.JWTError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    if token_data.typ == security.REFRESH_TOKEN_TYPE or revocation_list.is_revoked(
+        token_data.jti
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return token_data
 
 
 def get_current_user(
     db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2),
+    token_data: TokenPayload = Depends(get_token_payload),
 ) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    user = crud_user.get(db, id=token_data.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    token_versions.record(user.id, user.token_version)
+    if token_data.tv is not None and token_data.tv != user.token_version:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
@@ -59,4 +67,41 @@ def get_current_admin_user(
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+def get_current_claims(
+    db: Session = Depends(get_db),
+    token_data: TokenPayload = Depends(get_token_payload),
+) -> TokenPayload:
+    """Authorise from the token claims, falling back to the database for
+    tokens issued with an older claims layout."""
+    if token_data.cv != security.TOKEN_CLAIMS_VERSION:
+        user = get_current_user(db=db, token_data=token_data)
+        return TokenPayload(
+            sub=user.id, exp=token_data.exp, **security.user_claims(user)
+        )
+    if not token_versions.is_current(db, token_data.sub, token_data.tv):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return token_data
+
+
+def get_current_active_claims(
+    claims: TokenPayload = Depends(get_current_claims),
+) -> TokenPayload:
+    if not claims.act:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return claims
+
+
+def get_current_admin_claims(
+    claims: TokenPayload = Depends(get_current_claims),
+) -> TokenPayload:
+    if not claims.adm:
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return claims
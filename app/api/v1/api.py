@@ -1,6 +1,14 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, health, odd_numbers, users
+from app.api.v1.endpoints import (
+    auth,
+    health,
+    metrics,
+    odd_numbers,
+    profiling,
+    user_changes,
+    users,
+)
 
 api_router = APIRouter()
 
@@ -10,3 +18,8 @@ api_router.include_router(
 )
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(profiling.router, prefix="/profiling", tags=["profiling"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(
+    user_changes.router, prefix="/user-changes", tags=["user-changes"]
+)
@@ -1,16 +1,26 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.crud import crud_user
+from app.core.idempotency import (
+    IDEMPOTENCY_HEADER,
+    idempotency,
+    request_fingerprint,
+    scoped_key,
+)
+from app.core.keys import get_keyring
+from app.core.revocation import revocation_list
+from app.crud import crud_user, token_versions
 from app.models.user import User
-from app.schemas.token import Token
+from app.schemas.token import RefreshTokenRequest, Token, TokenPayload
 from app.schemas.user import UserCreate, UserResponse
 
 router = APIRouter()
@@ -36,11 +46,69 @@ async def login(
             detail="Inactive user",
         )
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        user.id, expires_delta=access_token_expires
+    return _issue_tokens(user)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: RefreshTokenRequest,
+    db: Session = Depends(deps.get_db),
+):
+    """Exchange a refresh token for a new access and refresh token pair.
+
+    Refresh tokens are single-use: presenting one that was already rotated
+    revokes every token issued to the user.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        token_data = TokenPayload(**security.decode_token(body.refresh_token))
+    except (jwt.JWTError, ValidationError):
+        raise credentials_exception
+    if token_data.typ != security.REFRESH_TOKEN_TYPE or not token_data.jti:
+        raise credentials_exception
+
+    user = crud_user.get(db, id=token_data.sub)
+    if not user or token_data.tv != user.token_version:
+        raise credentials_exception
+    if not revocation_list.revoke(token_data.jti, token_data.exp):
+        # Reuse of a rotated token: assume it leaked and log the user out
+        crud_user.update(
+            db, db_obj=user, obj_in={"token_version": user.token_version + 1}
+        )
+        raise credentials_exception
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user",
+        )
+    return _issue_tokens(user)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: Optional[RefreshTokenRequest] = None,
+    token_data: TokenPayload = Depends(deps.get_token_payload),
+) -> None:
+    """Revoke the current access token and, if given, a refresh token."""
+    if token_data.jti:
+        revocation_list.revoke(token_data.jti, token_data.exp)
+    if body is None:
+        return
+    try:
+        refresh_data = TokenPayload(**security.decode_token(body.refresh_token))
+    except (jwt.JWTError, ValidationError):
+        return
+    if refresh_data.sub == token_data.sub and refresh_data.jti:
+        revocation_list.revoke(refresh_data.jti, refresh_data.exp)
+
+
+@router.get("/jwks")
+async def jwks() -> Any:
+    """Public keys used to verify access tokens, in JWKS format."""
+    return get_keyring().jwks()
 
 
 @router.post("/register", response_model=UserResponse)
@@ -48,29 +116,48 @@ async def register(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ) -> Any:
-    """Register new user."""
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if user:
-        raise HTTPException(
-            status_code=400,
-            detail="The user with this email already exists in the system",
-        )
+    """Register new user.
 
-    user = User(
-        email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
-        name=user_in.name,
-        surname=user_in.surname,
-        role=user_in.role if user_in.role else UserRole.USER,
+    Retries carrying the same Idempotency-Key header replay the response of
+    the first successful registration.
+    """
+
+    async def create() -> UserResponse:
+        user = crud_user.get_by_email(db, email=user_in.email)
+        if user:
+            raise HTTPException(
+                status_code=400,
+                detail="The user with this email already exists in the system",
+            )
+        return UserResponse.model_validate(crud_user.create(db, obj_in=user_in))
+
+    if idempotency_key is None:
+        return await create()
+    return await idempotency.run(
+        scoped_key(request, idempotency_key),
+        request_fingerprint(user_in),
+        create,
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
 
 
 @router.post("/test-token", response_model=UserResponse)
 async def test_token(current_user: User = Depends(deps.get_current_user)) -> Any:
     """Test access token."""
     return current_user
+
+
+def _issue_tokens(user: User) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_user_access_token(
+        user, expires_delta=access_token_expires
+    )
+    refresh_token = security.create_refresh_token(user)
+    token_versions.record(user.id, user.token_version)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.core.health import readiness
 
 router = APIRouter()
 
@@ -6,3 +9,29 @@ router = APIRouter()
 @router.get("")
 async def health_check():
     return {"status": "healthy"}
+
+
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the worker is up and serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: whether this worker should receive traffic.
+
+    Reads the result cached by the background probes, so polling it adds no
+    database load.
+
+    Returns:
+        JSONResponse: Probe results, with status 503 when not ready
+    """
+    result = await readiness.status()
+    return JSONResponse(
+        status_code=(
+            status.HTTP_200_OK if result.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+        content=result.to_dict(),
+    )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Process metrics in the Prometheus text exposition format.
+
+    Returns:
+        PlainTextResponse: Every registered metric
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,80 @@
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+
+from app.api import deps
+from app.core.profiling import ProfilerState, profiler
+from app.schemas.profiling import ProfilingStart, ProfilingStatus
+
+router = APIRouter(dependencies=[Depends(deps.get_current_admin_user)])
+
+
+@router.get("", response_model=ProfilingStatus)
+async def profiling_status() -> ProfilingStatus:
+    """Current profiling session and sample counters. Admin only."""
+    return _status(profiler.state)
+
+
+@router.post("/start", response_model=ProfilingStatus)
+async def start_profiling(body: ProfilingStart) -> ProfilingStatus:
+    """
+    Start sampling matching requests, replacing any running session.
+
+    Args:
+        body: Mode, duration, routes and sampling interval
+
+    Returns:
+        ProfilingStatus: The new profiling session
+    """
+    state = profiler.start(
+        body.mode,
+        body.seconds,
+        routes=body.routes,
+        every_n=body.every_n,
+        interval=body.interval_ms / 1000,
+    )
+    return _status(state)
+
+
+@router.post("/stop", response_model=ProfilingStatus)
+async def stop_profiling() -> ProfilingStatus:
+    """Stop selecting requests; collected stacks are kept."""
+    return _status(profiler.stop())
+
+
+@router.get("/stacks", response_class=PlainTextResponse)
+async def profiling_stacks(route: Optional[str] = None) -> str:
+    """
+    Collected stacks in folded format, ready for flamegraph.pl or speedscope.
+
+    Args:
+        route: Only return stacks of this route template, optionally
+            prefixed with the method, e.g. "GET /api/v1/users/"
+
+    Returns:
+        str: One "frame;frame;frame count" line per distinct stack
+    """
+    return profiler.folded(route)
+
+
+@router.delete("/stacks", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_profiling_stacks() -> None:
+    """Discard collected stacks."""
+    profiler.reset()
+
+
+def _status(state: ProfilerState) -> ProfilingStatus:
+    return ProfilingStatus(
+        active=state.active,
+        mode=state.mode,
+        routes=sorted(state.routes),
+        every_n=state.every_n,
+        interval_ms=state.interval * 1000,
+        remaining_seconds=max(state.until - time.monotonic(), 0.0),
+        seen=state.seen,
+        profiled=state.profiled,
+        samples=state.samples,
+        dropped=state.dropped,
+    )
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request, Security
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_admin_claims
+from app.core.changefeed import notifier
+from app.core.config import settings
+from app.core.database import get_db
+from app.crud import crud_user_change
+from app.schemas.token import TokenPayload
+from app.schemas.user_change import UserChangePage, UserChangeResponse
+
+router = APIRouter()
+
+
+@router.get("", response_model=UserChangePage)
+async def get_user_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.CHANGES_PAGE_SIZE),
+    wait: float = Query(0, ge=0, le=settings.CHANGES_MAX_WAIT_SECONDS),
+    db: Session = Depends(get_db),
+    current_user: TokenPayload = Security(get_current_admin_claims),
+) -> UserChangePage:
+    """
+    Changes to users after sequence number ``since``, oldest first. Admin only.
+
+    With ``wait``, a long-poll: when there are no changes yet, the request
+    is held until one is committed or ``wait`` seconds have passed.
+
+    Args:
+        since: Last sequence number already seen, 0 for the whole log
+        limit: Maximum number of changes to return
+        wait: Seconds to wait for a change when there is none
+        db: Database session
+        current_user: Token claims of the current admin user
+
+    Returns:
+        UserChangePage: The changes and the sequence number to resume from
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        changes = await asyncio.to_thread(_read, db, since, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            break
+        await notifier.wait(min(remaining, settings.CHANGES_POLL_SECONDS))
+    return UserChangePage(
+        changes=changes, last_seq=changes[-1].seq if changes else since
+    )
+
+
+@router.get("/stream")
+async def stream_user_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: TokenPayload = Security(get_current_admin_claims),
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of changes to users after ``since``. Admin only.
+
+    Each event carries the change's sequence number as its id, so clients
+    reconnecting with Last-Event-ID resume where they stopped.
+
+    Args:
+        request: Incoming request, watched for disconnection
+        since: Last sequence number already seen, 0 for the whole log
+        last_event_id: Sent by reconnecting clients, overrides ``since``
+        db: Database session
+        current_user: Token claims of the current admin user
+
+    Returns:
+        StreamingResponse: The text/event-stream of changes
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        change_events(request, db, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def change_events(
+    request: Request, db: Session, since: int
+) -> AsyncIterator[str]:
+    """Yield SSE events for changes after ``since`` until the client leaves.
+
+    Changes are read a page at a time, so a subscriber far behind costs no
+    more memory than one that is up to date.
+    """
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        changes = await asyncio.to_thread(_read, db, since, settings.CHANGES_PAGE_SIZE)
+        for change in changes:
+            yield (
+                f"id: {change.seq}\n"
+                f"event: {change.operation}\n"
+                f"data: {change.model_dump_json()}\n\n"
+            )
+            since = change.seq
+        if changes:
+            last_sent = time.monotonic()
+            if len(changes) == settings.CHANGES_PAGE_SIZE:
+                continue
+        elif time.monotonic() - last_sent >= settings.CHANGES_HEARTBEAT_SECONDS:
+            # Comment line keeping proxies from closing an idle stream
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await notifier.wait(settings.CHANGES_POLL_SECONDS)
+
+
+def _read(db: Session, since: int, limit: int) -> List[UserChangeResponse]:
+    try:
+        return [
+            UserChangeResponse(
+                seq=change.seq,
+                user_id=change.user_id,
+                operation=change.operation,
+                data=json.loads(change.data) if change.data else None,
+                changed_at=change.changed_at,
+            )
+            for change in crud_user_change.get_since(db, since, limit)
+        ]
+    finally:
+        # End the transaction so the next read sees newer commits
+        db.rollback()
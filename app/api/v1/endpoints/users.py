@@ -1,15 +1,29 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, Security, status
-from sqlalchemy.orm import Session
-
-from app.api.deps import get_current_active_user, get_current_admin_user
-from app.core.database import get_db
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Security, status
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.deps import get_current_active_user, get_current_admin_claims
+from app.core.database import get_db, get_session_factory
+from app.core.idempotency import (
+    IDEMPOTENCY_HEADER,
+    idempotency,
+    request_fingerprint,
+    scoped_key,
+)
 from app.core.logger import logger
-from app.crud import crud_user
-from app.exceptions import UserDatabaseError, UserNotFoundError
+from app.crud import crud_user, user_cache
+from app.exceptions import (
+    PreconditionFailedError,
+    UserDatabaseError,
+    UserNotFoundError,
+    UserVersionConflictError,
+)
 from app.models.user import User
-from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.schemas.token import TokenPayload
+from app.schemas.user import UserCreate, UserResponse, UserUpdate, dump_records
+from app.utils import etag
 from app.utils.timing_decorator import time_logger
 
 router = APIRouter(tags=["Users"])
@@ -23,35 +37,144 @@ router = APIRouter(tags=["Users"])
 )
 @time_logger
 async def get_users(
+    request: Request,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Security(get_current_admin_user),
+    email_prefix: Optional[str] = None,
+    name: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_superuser: Optional[bool] = None,
+    sort: str = "id",
+    fields: Optional[str] = None,
+    after: Optional[str] = None,
+    current_user: TokenPayload = Security(get_current_admin_claims),
 ) -> List[UserResponse]:
     """
     Retrieve a list of all users from the database. Admin only.
 
+    The ETag hashes the rows of the page, so a request whose If-None-Match
+    still matches gets a 304 without the page being serialized. A full page
+    links to the next one with a ``Link: <...>; rel="next"`` header whose
+    ``after`` cursor continues after its last user; unlike ``skip``, it
+    costs the same however deep the page.
+
     Args:
+        request: Incoming request
         db: Database session
         skip: Number of records to skip
         limit: Maximum number of records to return
-        current_user: Current admin user
+        email_prefix: Only return users whose email starts with this prefix
+        name: Only return users with this name
+        is_active: Only return active (or inactive) users
+        is_superuser: Only return admins (or non-admins)
+        sort: Comma-separated sort keys (id, email, name), "-" for descending
+        fields: Comma-separated fields to return, e.g. "id,email"
+        after: Cursor from the next link of the previous page
+        current_user: Token claims of the current admin user
 
     Returns:
         List[UserResponse]: A list of users containing their ID, name, surname,
-        and email.
+        and email, or only the requested fields.
 
     Raises:
+        HTTPException: If a sort key, field or cursor is not supported
         UserDatabaseError: If there is an error during database access.
     """
+    sort_keys = [key.strip() for key in sort.split(",") if key.strip()]
+    field_names = (
+        [field.strip() for field in fields.split(",") if field.strip()]
+        if fields
+        else None
+    )
+    filters = {
+        "email_prefix": email_prefix,
+        "name": name,
+        "is_active": is_active,
+        "is_superuser": is_superuser,
+    }
+    next_cursor = None
     try:
         logger.info("Fetching users from database")
-        users = crud_user.get_multi(db, skip=skip, limit=limit)
+        cursor_fields = [key.lstrip("-") for key in crud_user.sort_keys(sort_keys)]
+        if after is not None:
+            filters["after"] = crud_user.decode_cursor(after)
+        if field_names is None:
+            users = crud_user.get_multi_records(
+                db, skip=skip, limit=limit, sort=sort_keys, **filters
+            )
+            if len(users) == limit:
+                last = users[-1]
+                next_cursor = [getattr(last, field) for field in cursor_fields]
+        else:
+            # The sort columns make the cursor even when not asked for
+            extra = [field for field in cursor_fields if field not in field_names]
+            users = crud_user.get_multi_fields(
+                db,
+                fields=field_names + extra,
+                skip=skip,
+                limit=limit,
+                sort=sort_keys,
+                **filters,
+            )
+            if len(users) == limit:
+                next_cursor = [users[-1][field] for field in cursor_fields]
+            for user in users:
+                for field in extra:
+                    del user[field]
         logger.info(f"Successfully retrieved {len(users)} users")
-        return users
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error retrieving users: {str(e)}")
         raise UserDatabaseError() from e
+    headers = etag.validator_headers(etag.content_etag(users))
+    if next_cursor is not None:
+        url = request.url.remove_query_params("skip").include_query_params(
+            after=crud_user.encode_cursor(next_cursor)
+        )
+        headers["Link"] = f'<{url}>; rel="next"'
+    if etag.not_modified(request.headers, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if field_names is not None:
+        return JSONResponse(content=users, headers=headers)
+    # Rows are trusted: skip validating them against UserResponse again
+    return Response(
+        content=dump_records(users), media_type="application/json", headers=headers
+    )
+
+
+# Declared before /{user_id}, which would otherwise match /me
+@router.get(
+    "/me",
+    response_model=UserResponse,
+    summary="Get Current User",
+)
+@time_logger
+async def read_user_me(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+) -> UserResponse:
+    """
+    Get current user.
+
+    Args:
+        request: Incoming request
+        response: Outgoing response, carrying the user's validators
+        current_user: Current authenticated user
+
+    Returns:
+        UserResponse: Current user data, or a 304 if the client's copy is
+        still current
+    """
+    headers = _user_validators(current_user)
+    if etag.not_modified(request.headers, headers["ETag"], current_user.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return current_user
 
 
 @router.get(
@@ -61,13 +184,22 @@ async def get_users(
     summary="Get User by ID",
 )
 @time_logger
-async def get_user(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
+async def get_user(
+    user_id: int,
+    request: Request,
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> UserResponse:
     """
     Retrieve a specific user by their ID.
 
+    Served from the user cache when possible, as pre-serialized JSON. The
+    ETag header carries the user's version for a later If-Match, and a
+    matching If-None-Match or If-Modified-Since gets a 304.
+
     Args:
         user_id: The ID of the user to retrieve
-        db: Database session
+        request: Incoming request
+        session_factory: Opens the session of a cache miss's load
 
     Returns:
         UserResponse: The user details containing their ID, name, surname, and email.
@@ -78,14 +210,22 @@ async def get_user(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
     """
     try:
         logger.info(f"Attempting to fetch user with ID: {user_id}")
-        user = crud_user.get(db, id=user_id)
+        cached = await user_cache.get_response(session_factory, user_id)
 
-        if not user:
+        if cached is None:
             logger.warning(f"User with ID {user_id} not found")
             raise UserNotFoundError(user_id)
 
         logger.info(f"Successfully retrieved user with ID: {user_id}")
-        return user
+        if etag.not_modified(request.headers, cached.etag, cached.last_modified):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=cached.headers
+            )
+        return Response(
+            content=cached.body,
+            media_type="application/json",
+            headers=cached.headers,
+        )
 
     except UserNotFoundError:
         raise
@@ -103,14 +243,21 @@ async def get_user(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
 @time_logger
 async def create_user_endpoint(
     user: UserCreate,
+    request: Request,
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ) -> UserResponse:
     """
     Create a new user.
 
+    Retries carrying the same Idempotency-Key header replay the response of
+    the first successful request instead of creating the user again.
+
     Args:
         user: User data
+        request: Incoming request
         db: Database session
+        idempotency_key: Optional client-generated key identifying the request
 
     Returns:
         UserResponse: Created user data
@@ -118,34 +265,24 @@ async def create_user_endpoint(
     Raises:
         HTTPException: If email is already registered
     """
-    existing_user = crud_user.get_by_email(db, email=user.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
-        )
-    return crud_user.create(db, obj_in=user)
-
-
-@router.get(
-    "/me",
-    response_model=UserResponse,
-    summary="Get Current User",
-)
-@time_logger
-async def read_user_me(
-    current_user: User = Depends(get_current_active_user),
-) -> UserResponse:
-    """
-    Get current user.
-
-    Args:
-        current_user: Current authenticated user
 
-    Returns:
-        UserResponse: Current user data
-    """
-    return current_user
+    async def create() -> UserResponse:
+        existing_user = crud_user.get_by_email(db, email=user.email)
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered",
+            )
+        return UserResponse.model_validate(crud_user.create(db, obj_in=user))
+
+    if idempotency_key is None:
+        return await create()
+    return await idempotency.run(
+        scoped_key(request, idempotency_key),
+        request_fingerprint(user),
+        create,
+        status_code=status.HTTP_201_CREATED,
+    )
 
 
 @router.put(
@@ -158,6 +295,8 @@ async def update_user_me(
     *,
     db: Session = Depends(get_db),
     user_in: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
 ) -> UserResponse:
     """
@@ -166,12 +305,18 @@ async def update_user_me(
     Args:
         db: Database session
         user_in: User update data
+        response: Outgoing response, carrying the updated user's validators
+        if_match: Optional ETag the user must still have
         current_user: Current authenticated user
 
     Returns:
         UserResponse: Updated user data
+
+    Raises:
+        PreconditionFailedError: If the user no longer matches If-Match
+        UserVersionConflictError: If the user was changed concurrently
     """
-    return crud_user.update(db, db_obj=current_user, obj_in=user_in)
+    return _update_versioned(db, current_user, user_in, if_match, response)
 
 
 @router.put(
@@ -183,8 +328,10 @@ async def update_user_me(
 async def update_user(
     user_id: int,
     user_in: UserUpdate,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Security(get_current_admin_user),
+    if_match: Optional[str] = Header(None),
+    current_user: TokenPayload = Security(get_current_admin_claims),
 ) -> UserResponse:
     """
     Update user. Admin only.
@@ -192,14 +339,18 @@ async def update_user(
     Args:
         user_id: ID of the user to update
         user_in: User update data
+        response: Outgoing response, carrying the updated user's validators
         db: Database session
-        current_user: Current admin user
+        if_match: Optional ETag the user must still have
+        current_user: Token claims of the current admin user
 
     Returns:
         UserResponse: Updated user data
 
     Raises:
         HTTPException: If user is not found
+        PreconditionFailedError: If the user no longer matches If-Match
+        UserVersionConflictError: If the user was changed concurrently
     """
     user = crud_user.get(db, id=user_id)
     if not user:
@@ -207,7 +358,34 @@ async def update_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    return crud_user.update(db, db_obj=user, obj_in=user_in)
+    return _update_versioned(db, user, user_in, if_match, response)
+
+
+def _update_versioned(
+    db: Session,
+    user: User,
+    user_in: UserUpdate,
+    if_match: Optional[str],
+    response: Response,
+) -> User:
+    # The update only applies to the version checked here; a write that
+    # commits in between is a conflict rather than a lost update
+    if not etag.if_match(if_match, etag.user_etag(user.id, user.version)):
+        raise PreconditionFailedError()
+    try:
+        user = crud_user.update(db, db_obj=user, obj_in=user_in)
+    except UserVersionConflictError:
+        if if_match is not None:
+            raise PreconditionFailedError() from None
+        raise
+    response.headers.update(_user_validators(user))
+    return user
+
+
+def _user_validators(user: User) -> Dict[str, str]:
+    return etag.validator_headers(
+        etag.user_etag(user.id, user.version), user.updated_at
+    )
 
 
 @router.delete(
@@ -219,7 +397,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Security(get_current_admin_user),
+    current_user: TokenPayload = Security(get_current_admin_claims),
 ) -> None:
     """
     Delete user. Admin only.
@@ -227,15 +405,13 @@ async def delete_user(
     Args:
         user_id: ID of the user to delete
         db: Database session
-        current_user: Current admin user
+        current_user: Token claims of the current admin user
 
     Raises:
         HTTPException: If user is not found
     """
-    user = crud_user.get(db, id=user_id)
-    if not user:
+    if crud_user.remove(db, id=user_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    crud_user.remove(db, id=user_id)
@@ -1,6 +1,14 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, health, odd_numbers, users
+from app.api.v1.endpoints import (
+    auth,
+    health,
+    metrics,
+    odd_numbers,
+    profiling,
+    user_changes,
+    users,
+)
 
 api_router = APIRouter()
 
@@ -32,3 +40,24 @@ api_router.include_router(
     tags=["Users"],
     responses={404: {"description": "Not found"}},
 )
+
+api_router.include_router(
+    profiling.router,
+    prefix="/profiling",
+    tags=["Profiling"],
+    responses={404: {"description": "Not found"}},
+)
+
+api_router.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["Metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+api_router.include_router(
+    user_changes.router,
+    prefix="/user-changes",
+    tags=["User Changes"],
+    responses={404: {"description": "Not found"}},
+)
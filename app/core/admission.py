@@ -0,0 +1,268 @@
+"""
+admission.py
+
+Admission control: AdmissionControlMiddleware caps the requests in flight
+and sheds load instead of letting every request queue. Requests are ranked
+by class, most important first:
+
+* ``health``: health checks and metrics, so probes answer under overload;
+* ``read``: authenticated GET, HEAD and OPTIONS requests;
+* ``write``: every other request, anonymous reads included;
+* ``login``: login and registration, which spend most of their time
+  hashing passwords and come in bursts.
+
+The cap adapts to observed latency (AIMD): it grows by one per cap's worth
+of requests while the smoothed latency stays under
+ADMISSION_LATENCY_TARGET_MS and shrinks by ADMISSION_BACKOFF_RATIO, at most
+once per target interval, when it goes over. Requests over the cap wait,
+highest class first, for at most ADMISSION_QUEUE_TIMEOUT_MS of their class.
+A request that would wait longer, going by the latency and the queue ahead
+of it, is rejected at once with 503 and a Retry-After header.
+
+Long-lived requests (the user change feed and profiling) are not admission
+controlled: they would hold slots and skew the latency for minutes.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+class Priority(IntEnum):
+    HEALTH = 0
+    READ = 1
+    WRITE = 2
+    LOGIN = 3
+
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+HEALTH_PATHS = tuple(f"{settings.API_V1_STR}{path}" for path in ("/health", "/metrics"))
+LOGIN_PATHS = frozenset(
+    f"{settings.API_V1_STR}{path}" for path in ("/auth/login", "/auth/register")
+)
+EXEMPT_PATHS = tuple(
+    f"{settings.API_V1_STR}{path}" for path in ("/user-changes", "/profiling")
+)
+
+
+def classify(scope: Scope) -> Optional[Priority]:
+    """Class of a request, or None if it is not admission controlled."""
+    path = scope["path"]
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(HEALTH_PATHS):
+        return Priority.HEALTH
+    if path in LOGIN_PATHS:
+        return Priority.LOGIN
+    if scope["method"] in READ_METHODS and _has_authorization(scope):
+        return Priority.READ
+    return Priority.WRITE
+
+
+def _has_authorization(scope: Scope) -> bool:
+    return any(name == b"authorization" for name, _ in scope["headers"])
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Overloaded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class AIMDLimit:
+    """Concurrency limit with additive increase and multiplicative decrease
+    driven by an exponentially weighted moving average of latencies."""
+
+    def __init__(
+        self,
+        initial: int = settings.ADMISSION_INITIAL_LIMIT,
+        min_limit: int = settings.ADMISSION_MIN_LIMIT,
+        max_limit: int = settings.ADMISSION_MAX_LIMIT,
+        latency_target_ms: float = settings.ADMISSION_LATENCY_TARGET_MS,
+        backoff_ratio: float = settings.ADMISSION_BACKOFF_RATIO,
+        smoothing: float = 0.1,
+    ) -> None:
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target_ms / 1000
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        # Seconds, 0 until the first sample
+        self.latency = 0.0
+        self._last_decrease = -math.inf
+
+    def observe(
+        self, latency: float, in_flight: int, now: Optional[float] = None
+    ) -> None:
+        """Account for a request that took ``latency`` seconds while
+        ``in_flight`` requests, itself included, were running."""
+        if self.latency == 0.0:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        now = time.monotonic() if now is None else now
+        if self.latency > self.latency_target:
+            # The requests finishing right after a decrease were admitted
+            # under the old limit; let them drain before deciding again
+            if now - self._last_decrease >= self.latency_target:
+                self.value = max(self.min_limit, self.value * self.backoff_ratio)
+                self._last_decrease = now
+        elif in_flight * 2 >= self.value:
+            # Only a limit that is in use has shown it can grow
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+
+class AdmissionController:
+    """Admits requests up to the limit and queues the rest by priority."""
+
+    def __init__(
+        self,
+        limit: Optional[AIMDLimit] = None,
+        queue_timeouts_ms: Optional[Dict[str, float]] = None,
+        max_queue: int = settings.ADMISSION_MAX_QUEUE,
+    ) -> None:
+        self.limit = AIMDLimit() if limit is None else limit
+        timeouts = settings.ADMISSION_QUEUE_TIMEOUT_MS
+        if queue_timeouts_ms is not None:
+            timeouts = queue_timeouts_ms
+        self.queue_timeouts = {
+            priority: timeouts[priority.name.lower()] / 1000 for priority in Priority
+        }
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = {priority: 0 for priority in Priority}
+        # Entries are [priority, arrival, future]; futures of requests that
+        # gave up stay in the heap until they reach its top
+        self._queue: List[list] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the request at ``position`` in the queue is admitted."""
+        return position * self.limit.latency / self.limit.value
+
+    async def acquire(self, priority: Priority) -> None:
+        """Wait for a slot, which the caller must ``release``.
+
+        Raises:
+            Overloaded: If the request should be rejected
+        """
+        self._prune()
+        if self.in_flight < self.limit.value and (
+            not self._queue or self._queue[0][0] > priority
+        ):
+            self.in_flight += 1
+            return
+
+        timeout = self.queue_timeouts[priority]
+        ahead = sum(
+            1 for entry in self._queue if entry[0] <= priority and not entry[2].done()
+        )
+        wait = self.expected_wait(ahead + 1)
+        if ahead >= self.max_queue or wait > timeout:
+            self._reject(priority, wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._arrivals), future])
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                # Admitted just as the client went away
+                self.in_flight -= 1
+                self._admit_waiters()
+            raise
+        if not future.cancel():
+            return
+        self._reject(priority, max(wait, timeout))
+
+    def release(self, latency: float) -> None:
+        self.limit.observe(latency, self.in_flight)
+        self.in_flight -= 1
+        self._admit_waiters()
+
+    def _reject(self, priority: Priority, wait: float) -> None:
+        self.rejected[priority] += 1
+        raise Overloaded(wait)
+
+    def _prune(self) -> None:
+        while self._queue and self._queue[0][2].done():
+            heapq.heappop(self._queue)
+
+    def _admit_waiters(self) -> None:
+        while self._queue and self.in_flight < self.limit.value:
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+
+controller = AdmissionController()
+
+registry.gauge(
+    "admission_limit", "Adaptive concurrency limit", lambda: controller.limit.value
+)
+registry.gauge(
+    "admission_in_flight", "Admitted requests in flight", lambda: controller.in_flight
+)
+registry.gauge(
+    "admission_queued", "Requests waiting for admission", lambda: controller.queued
+)
+for _priority in Priority:
+    registry.gauge(
+        f"admission_rejected_{_priority.name.lower()}",
+        f"Rejected {_priority.name.lower()} requests",
+        lambda priority=_priority: controller.rejected[priority],
+    )
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware, so the latency covers the whole response."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController = controller,
+        enabled: bool = settings.ADMISSION_ENABLED,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        priority = classify(scope) if scope["type"] == "http" else None
+        if not self.enabled or priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(priority)
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": "Service overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - start)
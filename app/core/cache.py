@@ -0,0 +1,240 @@
+"""
+cache.py
+
+Bounded in-process cache with per-entry expiry, plus the invalidation bus
+that keeps the caches of several workers consistent.
+
+``TTLCache.get_or_load`` lets one caller load a missing or expired key while
+concurrent callers for the same key await its result, so a hot entry
+expiring costs one database read instead of one per waiting request.
+Deleting a key while it is being loaded discards the loaded value, which
+may already be stale.
+
+Writers delete or overwrite their local entry and publish the key on the
+bus; every other worker subscribed to the bus drops its copy. The local
+bus only reaches caches in the same process. The Postgres bus reaches every
+worker connected to the database through LISTEN/NOTIFY. Notifications are
+best effort, so entries still expire after their TTL.
+"""
+
+import abc
+import asyncio
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.logger import logger
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """LRU cache of values that expire ``ttl_seconds`` after being set."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Bumped by every delete, so loads that raced one are not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def invalidate(self, key: Optional[str]) -> None:
+        """Bus subscriber: drop ``key``, or everything when it is None."""
+        if key is None:
+            self.clear()
+        else:
+            self.delete(key)
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[V]]]
+    ) -> Optional[V]:
+        """Cached value of ``key``, loading it once for all concurrent callers.
+
+        ``None`` results are returned but not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._load(key, loader, self._generation))
+            self._loading[key] = task
+        # A cancelled caller must not cancel the load other callers await
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[V]]],
+        generation: int,
+    ) -> Optional[V]:
+        try:
+            value = await loader()
+            if value is not None and generation == self._generation:
+                self.set(key, value)
+            return value
+        finally:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+
+
+class InvalidationBus(abc.ABC):
+    """Delivers invalidated keys published by one cache to its peers.
+
+    Subscribers receive None when every key must be dropped, e.g. after
+    notifications may have been missed.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: List[Callable[[Optional[str]], None]] = []
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]) -> None:
+        self._subscribers.append(callback)
+
+    @abc.abstractmethod
+    def publish(self, key: str) -> None:
+        """Deliver ``key`` to the subscribers of the other buses."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def _deliver(self, key: Optional[str]) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(key)
+            except Exception:
+                logger.exception(f"Cache invalidation of {key} failed")
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """In-process stand-in delivering to the buses sharing ``peers``."""
+
+    def __init__(self, peers: Optional[List["LocalInvalidationBus"]] = None) -> None:
+        super().__init__()
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+
+    def publish(self, key: str) -> None:
+        for peer in list(self.peers):
+            if peer is not self:
+                peer._deliver(key)
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """Cross-worker bus over Postgres LISTEN/NOTIFY on ``channel``."""
+
+    def __init__(self, engine: Engine, channel: str = "cache_invalidation") -> None:
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        # Lets a worker ignore its own notifications
+        self.origin = uuid.uuid4().hex
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def publish(self, key: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": f"{self.origin}:{key}"},
+            )
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                self._stopped.wait(1.0)
+
+    def _listen_once(self) -> None:
+        connection = self.engine.raw_connection()
+        # Closed rather than returned to the pool in autocommit, listening
+        connection.detach()
+        try:
+            driver_connection = connection.driver_connection
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            # Notifications sent while disconnected were lost
+            self._deliver(None)
+            while not self._stopped.is_set():
+                if select.select([driver_connection], [], [], 1.0)[0]:
+                    driver_connection.poll()
+                    while driver_connection.notifies:
+                        notify = driver_connection.notifies.pop(0)
+                        origin, _, key = notify.payload.partition(":")
+                        if origin != self.origin:
+                            self._deliver(key)
+        finally:
+            connection.close()
+
+
+def build_bus(backend: str, engine: Engine, channel: str) -> InvalidationBus:
+    """Bus of the ``backend`` configured for a cache, "local" or "postgres"."""
+    if backend == "local":
+        return LocalInvalidationBus()
+    if backend == "postgres":
+        return PostgresInvalidationBus(engine, channel=channel)
+    raise ValueError(f"Unknown cache invalidation backend: {backend}")
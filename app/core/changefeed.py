@@ -0,0 +1,49 @@
+"""
+changefeed.py
+
+Wakes the user change feed subscribers of this worker when a change is
+committed, so long-polls and event streams answer immediately instead of
+on their next poll. Changes committed by other workers are only noticed by
+polling, every CHANGES_POLL_SECONDS.
+"""
+
+import asyncio
+import threading
+from typing import Set, Tuple
+
+
+class ChangeNotifier:
+    def __init__(self) -> None:
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+        self._lock = threading.Lock()
+
+    def notify(self) -> None:
+        """Wake every waiter; safe to call from any thread."""
+        with self._lock:
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, future)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for the next notification, returning False on timeout."""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+notifier = ChangeNotifier()
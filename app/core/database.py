@@ -3,6 +3,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
+from app.core import deadline
 from app.core.config import settings
 
 
@@ -18,13 +19,27 @@ engine = create_engine(
     echo=False,
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory, routing users to their shards if configured
+if settings.USER_SHARDS:
+    from app.core.sharding import build_router
+
+    router = build_router(engine, settings.USER_SHARDS)
+    SessionLocal = router.sessionmaker(autocommit=False, autoflush=False)
+else:
+    router = None
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_session_factory() -> sessionmaker:
+    """Session factory for work that must not share the request's session,
+    such as loads awaited by several requests."""
+    return SessionLocal
 
 
 def get_db():
-    """Get database session."""
+    """Get database session, bounded by the deadline of the request."""
     db = SessionLocal()
+    deadline.track_session(db)
     try:
         yield db
     finally:
@@ -0,0 +1,241 @@
+"""
+deadline.py
+
+Per-request deadlines. DeadlineMiddleware gives every request a deadline:
+REQUEST_TIMEOUT_SECONDS, or the timeout of the longest matching prefix in
+REQUEST_TIMEOUT_ROUTES, shortened by an ``X-Request-Timeout`` header (in
+seconds) if the client sends one. The deadline lives in a context variable,
+so code anywhere below the middleware can read it:
+
+* ``check`` raises DeadlineExceededError (504) once it has passed; call it
+  before expensive steps such as hashing a password;
+* sessions from ``get_db`` (``track_session``) refuse to begin transactions
+  after it and, on Postgres, set ``statement_timeout`` to the time left.
+
+When the deadline passes or the client disconnects before the response is
+complete, the middleware cancels the statements the request's sessions are
+running (``cancel()`` on psycopg2, ``interrupt()`` on SQLite) and cancels
+the request. A sync endpoint's thread cannot be cancelled, but it fails at
+its next statement or ``check``. Background tasks that run after a complete
+response are left alone.
+"""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.exceptions import DeadlineExceededError
+
+TIMEOUT_HEADER = b"x-request-timeout"
+# statement_timeout backs up the cancellation by the middleware, which
+# should fire first and answer 504
+STATEMENT_TIMEOUT_GRACE_SECONDS = 0.1
+
+
+class Deadline:
+    def __init__(self, expires_at: Optional[float]) -> None:
+        # time.monotonic() value, None for no deadline
+        self.expires_at = expires_at
+        # DBAPI connections of open transactions, per session
+        self._connections: Dict[int, Set[Any]] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def track(self, session: Session, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._connections.setdefault(id(session), set()).add(dbapi_connection)
+
+    def untrack(self, session: Session) -> None:
+        with self._lock:
+            self._connections.pop(id(session), None)
+
+    def cancel_statements(self) -> None:
+        with self._lock:
+            connections = [c for group in self._connections.values() for c in group]
+        for connection in connections:
+            cancel = getattr(connection, "cancel", None) or getattr(
+                connection, "interrupt", None
+            )
+            if cancel is None:
+                continue
+            try:
+                cancel()
+            except Exception:
+                logger.exception("Could not cancel a statement")
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the deadline of the current request, if any."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check() -> None:
+    """
+    Raises:
+        DeadlineExceededError: If the deadline of the current request passed
+    """
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceededError()
+
+
+def track_session(db: Session) -> None:
+    """Apply the deadline of the current request to the transactions of
+    ``db``; sessions outside requests are left alone."""
+    deadline = _current.get()
+    if deadline is None or deadline.expires_at is None:
+        return
+
+    @event.listens_for(db, "after_begin")
+    def after_begin(session, transaction, connection) -> None:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError()
+        if connection.dialect.name == "postgresql":
+            timeout_ms = int((remaining + STATEMENT_TIMEOUT_GRACE_SECONDS) * 1000)
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+        deadline.track(session, connection.connection.dbapi_connection)
+
+    @event.listens_for(db, "after_transaction_end")
+    def after_transaction_end(session, transaction) -> None:
+        if transaction.parent is None:
+            deadline.untrack(session)
+
+
+def route_timeout(path: str) -> Optional[float]:
+    """Timeout of the route serving ``path``, None for no deadline."""
+    timeout = settings.REQUEST_TIMEOUT_SECONDS
+    matched = ""
+    for prefix, seconds in settings.REQUEST_TIMEOUT_ROUTES.items():
+        prefix = f"{settings.API_V1_STR}{prefix}"
+        if path.startswith(prefix) and len(prefix) > len(matched):
+            matched, timeout = prefix, seconds
+    return timeout or None
+
+
+def requested_timeout(scope: Scope) -> Optional[float]:
+    for name, value in scope["headers"]:
+        if name == TIMEOUT_HEADER:
+            try:
+                seconds = float(value)
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+
+def request_timeout(scope: Scope) -> Optional[float]:
+    """The route's timeout, shortened by the client's if it sent one."""
+    timeouts = [
+        timeout
+        for timeout in (route_timeout(scope["path"]), requested_timeout(scope))
+        if timeout is not None
+    ]
+    return min(timeouts) if timeouts else None
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware running the request in its own task, so it can
+    be cancelled when the deadline passes or the client goes away."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = request_timeout(scope)
+        deadline = Deadline(None if timeout is None else time.monotonic() + timeout)
+        token = _current.set(deadline)
+        try:
+            await self._run(scope, receive, send, deadline)
+        finally:
+            _current.reset(token)
+
+    async def _run(
+        self, scope: Scope, receive: Receive, send: Send, deadline: Deadline
+    ) -> None:
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response = {"started": False, "complete": False}
+
+        async def listen() -> None:
+            # The only reader of receive, so disconnects are seen while the
+            # app is busy; the app reads what it passed on
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def app_receive() -> Message:
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def app_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response["complete"] = True
+            await send(message)
+
+        app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        listener = asyncio.ensure_future(listen())
+        disconnect = asyncio.ensure_future(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, disconnect},
+                timeout=deadline.remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if app_task in done or response["complete"]:
+                await app_task
+                return
+
+            gone = disconnected.is_set()
+            logger.warning(
+                f"Cancelling {scope['method']} {scope['path']}: "
+                f"{'client disconnected' if gone else 'deadline exceeded'}"
+            )
+            deadline.cancel_statements()
+            app_task.cancel()
+            await asyncio.gather(app_task, return_exceptions=True)
+            if not gone and not response["started"]:
+                error = DeadlineExceededError()
+                await JSONResponse(
+                    {"detail": error.detail}, status_code=error.status_code
+                )(scope, receive, send)
+        finally:
+            for task in (app_task, listener, disconnect):
+                task.cancel()
@@ -0,0 +1,202 @@
+"""
+health.py
+
+Readiness probes for the /health/ready endpoint. Probes run in a background
+task every HEALTH_REFRESH_SECONDS and the endpoint only reads the cached
+result, so however often an orchestrator polls, the database sees one
+``SELECT 1`` per refresh interval per worker.
+
+A worker is ready when:
+
+* the database answers ``SELECT 1`` within HEALTH_DB_TIMEOUT_SECONDS;
+* fewer than HEALTH_POOL_SATURATION of its pooled connections are checked
+  out;
+* the event loop lagged less than HEALTH_LOOP_LAG_THRESHOLD_MS since the
+  previous refresh;
+* the cached result is younger than HEALTH_MAX_AGE_SECONDS, so a wedged
+  refresh task is reported instead of serving a stale "ready".
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.database import engine as default_engine
+from app.core.logger import logger
+from app.core.loop_monitor import LoopMonitor
+from app.exceptions.health import HealthCheckError
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    detail: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Readiness:
+    ready: bool
+    checked_at: float
+    checks: Dict[str, ProbeResult] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "not ready",
+            "checked_at": self.checked_at,
+            "checks": {name: asdict(result) for name, result in self.checks.items()},
+        }
+
+
+class ReadinessChecker:
+    """Runs the readiness probes in the background and caches the result."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        refresh_seconds: float = settings.HEALTH_REFRESH_SECONDS,
+        max_age_seconds: float = settings.HEALTH_MAX_AGE_SECONDS,
+        db_timeout_seconds: float = settings.HEALTH_DB_TIMEOUT_SECONDS,
+        pool_saturation: float = settings.HEALTH_POOL_SATURATION,
+        loop_lag_threshold_ms: float = settings.HEALTH_LOOP_LAG_THRESHOLD_MS,
+    ) -> None:
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.db_timeout_seconds = db_timeout_seconds
+        self.pool_saturation = pool_saturation
+        self.loop_lag_threshold_ms = loop_lag_threshold_ms
+        self.loop_lag = LoopMonitor()
+        self._result: Optional[Readiness] = None
+        self._task: Optional[asyncio.Task] = None
+        # A probe left running by a timeout is not started again
+        self._database_probe: Optional[asyncio.Future] = None
+
+    async def start(self) -> None:
+        if self._running():
+            return
+        self.loop_lag.start()
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        await self.loop_lag.stop()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def status(self) -> Readiness:
+        """Cached readiness, starting the background refresh on first use."""
+        if not self._running():
+            await self.start()
+        result = self._result
+        age = time.time() - result.checked_at
+        if age > self.max_age_seconds:
+            return Readiness(
+                ready=False,
+                checked_at=result.checked_at,
+                checks={
+                    **result.checks,
+                    "freshness": ProbeResult(
+                        ok=False,
+                        detail={"age_seconds": round(age, 3)},
+                        error="Readiness probes are not being refreshed",
+                    ),
+                },
+            )
+        return result
+
+    async def refresh(self) -> Readiness:
+        checks = {
+            "database": await self._probe(self.check_database),
+            "pool": await self._probe(self.check_pool),
+            "event_loop": await self._probe(self.check_loop_lag),
+        }
+        self._result = Readiness(
+            ready=all(check.ok for check in checks.values()),
+            checked_at=time.time(),
+            checks=checks,
+        )
+        if not self._result.ready:
+            failed = [name for name, check in checks.items() if not check.ok]
+            logger.warning(f"Readiness checks failing: {', '.join(failed)}")
+        return self._result
+
+    async def check_database(self) -> Dict[str, Any]:
+        probe = self._database_probe
+        if (
+            probe is None
+            or probe.done()
+            or probe.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._database_probe = asyncio.ensure_future(
+                asyncio.to_thread(self._select_one)
+            )
+        try:
+            latency = await asyncio.wait_for(
+                asyncio.shield(self._database_probe), self.db_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            raise HealthCheckError(
+                f"Database did not answer within {self.db_timeout_seconds}s"
+            )
+        return {"latency_ms": round(latency * 1000, 3)}
+
+    def _select_one(self) -> float:
+        start = time.perf_counter()
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return time.perf_counter() - start
+
+    async def check_pool(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        if not isinstance(pool, QueuePool):
+            return {"pool": type(pool).__name__}
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        checked_out = pool.checkedout()
+        detail = {"checked_out": checked_out, "capacity": capacity}
+        if capacity and checked_out / capacity >= self.pool_saturation:
+            raise HealthCheckError(
+                f"Connection pool saturated: {checked_out}/{capacity} in use"
+            )
+        return detail
+
+    async def check_loop_lag(self) -> Dict[str, Any]:
+        lag_ms = self.loop_lag.take_max_lag() * 1000
+        if lag_ms >= self.loop_lag_threshold_ms:
+            raise HealthCheckError(f"Event loop lagged {lag_ms:.0f}ms")
+        return {"max_lag_ms": round(lag_ms, 3)}
+
+    async def _probe(self, check) -> ProbeResult:
+        try:
+            return ProbeResult(ok=True, detail=await check())
+        except HealthCheckError as e:
+            return ProbeResult(ok=False, error=e.message)
+        except Exception as e:
+            return ProbeResult(ok=False, error=f"{type(e).__name__}: {e}")
+
+    def _running(self) -> bool:
+        # Tasks die with their event loop, e.g. between test clients
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Readiness refresh failed")
+
+
+readiness = ReadinessChecker(default_engine)
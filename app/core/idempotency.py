@@ -0,0 +1,370 @@
+"""
+idempotency.py
+
+Idempotency-Key support for non-idempotent endpoints. The first request
+with a given key executes and its response is stored; retries with the same
+key and payload replay the stored response instead of executing again, and
+concurrent retries wait for the first execution to finish.
+
+A claim on a key is leased for IDEMPOTENCY_LEASE_SECONDS and renewed while
+the request runs, so a retry only runs it again once the worker running it
+has gone away. Claims are fenced by an owner token: a request that lost its
+claim cannot complete or release the claim of the retry that took it over.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from jose import JWTError
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import security
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.exceptions import IdempotencyKeyConflictError, IdempotencyKeyInProgressError
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@dataclass
+class IdempotencyRecord:
+    fingerprint: str
+    expires_at: float
+    status_code: Optional[int] = None
+    body: Optional[str] = None
+    # Token of the claim executing the request
+    owner: Optional[str] = None
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class MemoryIdempotencyStore:
+    """Bounded in-process store, evicting the oldest keys first.
+
+    Claims still running are never evicted, since a retry would then run
+    the request again; the store may go over ``max_entries`` meanwhile.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, lease_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record.expires_at <= time.time():
+                del self._records[key]
+                return None
+            return record
+
+    def claim(self, key: str, fingerprint: str) -> Optional[str]:
+        """Claim ``key`` for a new execution, returning the owner token of
+        the claim, or None if the key is taken."""
+        with self._lock:
+            now = time.time()
+            record = self._records.get(key)
+            if record is not None and record.expires_at > now:
+                return None
+            owner = uuid.uuid4().hex
+            self._records[key] = IdempotencyRecord(
+                fingerprint=fingerprint,
+                expires_at=now + self.lease_seconds,
+                owner=owner,
+            )
+            self._records.move_to_end(key)
+            self._evict(now)
+            return owner
+
+    def renew(self, key: str, owner: str) -> bool:
+        """Extend a running claim's lease; False if ``owner`` lost it."""
+        with self._lock:
+            record = self._owned(key, owner)
+            if record is None or record.completed:
+                return False
+            record.expires_at = time.time() + self.lease_seconds
+            return True
+
+    def complete(self, key: str, owner: str, status_code: int, body: str) -> None:
+        with self._lock:
+            record = self._owned(key, owner)
+            if record is None:
+                return
+            record.status_code = status_code
+            record.body = body
+            record.expires_at = time.time() + self.ttl_seconds
+
+    def release(self, key: str, owner: str) -> None:
+        with self._lock:
+            if self._owned(key, owner) is not None:
+                del self._records[key]
+
+    def _owned(self, key: str, owner: str) -> Optional[IdempotencyRecord]:
+        record = self._records.get(key)
+        return record if record is not None and record.owner == owner else None
+
+    def _evict(self, now: float) -> None:
+        excess = len(self._records) - self.max_entries
+        if excess <= 0:
+            return
+        evictable = (
+            key
+            for key, record in self._records.items()
+            if record.completed or record.expires_at <= now
+        )
+        for key in list(itertools.islice(evictable, excess)):
+            del self._records[key]
+
+
+class DatabaseIdempotencyStore:
+    """Store shared by all workers through the idempotency_keys table."""
+
+    # Expired rows are purged once every this many claims
+    PURGE_EVERY = 1000
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        ttl_seconds: int,
+        lease_seconds: int,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._claims = 0
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        with self.session_factory() as db:
+            row = db.get(IdempotencyKey, key)
+            if row is None or row.expires_at <= datetime.utcnow():
+                return None
+            return IdempotencyRecord(
+                fingerprint=row.fingerprint,
+                expires_at=row.expires_at.timestamp(),
+                status_code=row.status_code,
+                body=row.body,
+            )
+
+    def claim(self, key: str, fingerprint: str) -> Optional[str]:
+        self._claims += 1
+        if self._claims % self.PURGE_EVERY == 0:
+            self.purge_expired()
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        with self.session_factory() as db:
+            # Drop an expired record for this key so it can be claimed again
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+                )
+            )
+            db.add(
+                IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=self.lease_seconds),
+                    owner=owner,
+                )
+            )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return None
+            return owner
+
+    def renew(self, key: str, owner: str) -> bool:
+        expires_at = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        with self.session_factory() as db:
+            result = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.owner == owner,
+                    IdempotencyKey.status_code.is_(None),
+                )
+                .values(expires_at=expires_at)
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    def complete(self, key: str, owner: str, status_code: int, body: str) -> None:
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        with self.session_factory() as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.owner == owner)
+                .values(status_code=status_code, body=body, expires_at=expires_at)
+            )
+            db.commit()
+
+    def release(self, key: str, owner: str) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key, IdempotencyKey.owner == owner
+                )
+            )
+            db.commit()
+
+    def purge_expired(self) -> int:
+        with self.session_factory() as db:
+            result = db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.expires_at <= datetime.utcnow()
+                )
+            )
+            db.commit()
+            return result.rowcount
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Hash a request payload so reused keys with other payloads are caught."""
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def scoped_key(request: Request, key: str) -> str:
+    """Store key for an Idempotency-Key sent with ``request``, scoped to its
+    route and client so clients that pick the same key never share a record."""
+    return f"{request.url.path}:{_client_id(request)}:{key}"
+
+
+def _client_id(request: Request) -> str:
+    # The token subject when authenticated: it survives token refreshes and
+    # address changes between retries
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = security.decode_token(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject is not None:
+            return f"user:{subject}"
+    host = request.client.host if request.client else "unknown"
+    return f"addr:{host}"
+
+
+class IdempotencyManager:
+    """Execute a request at most once per idempotency key."""
+
+    def __init__(self, store: Any, wait_timeout: float, poll_interval: float = 0.05):
+        self.store = store
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._in_flight: Dict[str, asyncio.Event] = {}
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Any]],
+        status_code: int = 200,
+    ) -> Response:
+        """Run ``execute`` for a new key, or replay the stored response.
+
+        Raises:
+            IdempotencyKeyConflictError: If the key was used with another payload
+            IdempotencyKeyInProgressError: If the first request is still running
+                after ``wait_timeout`` seconds
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            record = self.store.get(key)
+            if record is not None:
+                if record.fingerprint != fingerprint:
+                    raise IdempotencyKeyConflictError()
+                if record.completed:
+                    return self._response(record.status_code, record.body, True)
+                await self._wait(key, deadline)
+                continue
+            owner = self.store.claim(key, fingerprint)
+            if owner is not None:
+                break
+
+        event = self._in_flight[key] = asyncio.Event()
+        renewal = asyncio.ensure_future(self._renew(key, owner))
+        try:
+            result = await execute()
+        except BaseException:
+            self.store.release(key, owner)
+            raise
+        else:
+            body = json.dumps(jsonable_encoder(result))
+            self.store.complete(key, owner, status_code, body)
+            return self._response(status_code, body, False)
+        finally:
+            renewal.cancel()
+            # A retry may have taken over a claim that was lost
+            if self._in_flight.get(key) is event:
+                del self._in_flight[key]
+            event.set()
+
+    async def _renew(self, key: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            if not self.store.renew(key, owner):
+                logger.warning(f"Lost the idempotency claim on {key}")
+                return
+
+    async def _wait(self, key: str, deadline: float) -> None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyKeyInProgressError()
+        event = self._in_flight.get(key)
+        if event is None:
+            # Claimed by another worker: poll the shared store
+            await asyncio.sleep(min(self.poll_interval, remaining))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise IdempotencyKeyInProgressError()
+
+    @staticmethod
+    def _response(status_code: int, body: str, replayed: bool) -> Response:
+        return Response(
+            content=body,
+            status_code=status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true" if replayed else "false"},
+        )
+
+
+def build_store() -> Any:
+    if settings.IDEMPOTENCY_BACKEND == "database":
+        return DatabaseIdempotencyStore(
+            SessionLocal,
+            ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+            lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+        )
+    return MemoryIdempotencyStore(
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+    )
+
+
+idempotency = IdempotencyManager(
+    build_store(), wait_timeout=settings.IDEMPOTENCY_LEASE_SECONDS
+)
@@ -0,0 +1,245 @@
+"""
+keys.py
+
+Key management for JWT signing. Symmetric algorithms (HS*) sign and verify
+with SECRET_KEY. Asymmetric algorithms (RS*, ES*) load one PEM private key
+per file from JWT_KEYS_DIR, named ``<kid>.pem``: the active key signs, every
+loaded key verifies, and public keys are published as a JWKS so other
+services can validate tokens without holding any secret.
+
+Rotate keys with ``python -m app.core.keys rotate``. The directory is
+rescanned on first sight of an unknown kid and when signing, at most every
+RELOAD_INTERVAL_SECONDS: new files are loaded, deleted ones dropped, and the
+newest key starts signing unless JWT_ACTIVE_KID pins one. Pin JWT_ACTIVE_KID
+to the old key until every worker has published the new one. Retire an old
+key by deleting its file once the longest-lived token signed with it has
+expired.
+"""
+
+import argparse
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWTError
+
+from app.core.config import settings
+from app.core.logger import logger
+
+# Minimum delay between directory rescans triggered by unknown key ids
+RELOAD_INTERVAL_SECONDS = 5.0
+
+_EC_CURVES = {
+    "ES256": ec.SECP256R1,
+    "ES384": ec.SECP384R1,
+    "ES512": ec.SECP521R1,
+}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm[:2] in ("RS", "ES")
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    """Generate a PEM encoded private key for an asymmetric algorithm."""
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm in _EC_CURVES:
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm]())
+    else:
+        raise ValueError(f"Unsupported asymmetric algorithm: {algorithm}")
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class KeyRing:
+    """Signing and verification keys for one JWT algorithm, addressed by kid.
+
+    Keys are parsed once and kept as ``jose`` key objects, so signing and
+    verification never re-parse PEM or secret material. The key maps are
+    replaced, never mutated, and read and swapped under ``_lock``.
+    """
+
+    def __init__(self, algorithm: str, secret: Optional[str] = None) -> None:
+        self.algorithm = algorithm
+        self.active_kid: Optional[str] = None
+        self.keys_dir: Optional[str] = None
+        self._last_reload = 0.0
+        self._lock = threading.Lock()
+        self._private_keys: Dict[str, Key] = {}
+        self._public_keys: Dict[str, Key] = {}
+        # Kids loaded from keys_dir, dropped when their file is deleted
+        self._dir_kids: Set[str] = set()
+        # Kid chosen by ``activate``; None signs with the newest key
+        self._pinned_kid: Optional[str] = None
+        self._secret_key = (
+            jwk.construct(secret, algorithm) if secret is not None else None
+        )
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        if not is_asymmetric(settings.ALGORITHM):
+            return cls(settings.ALGORITHM, secret=settings.SECRET_KEY)
+        if not settings.JWT_KEYS_DIR:
+            raise ValueError(
+                f"JWT_KEYS_DIR must be set when using the {settings.ALGORITHM} "
+                "algorithm"
+            )
+        keyring = cls(settings.ALGORITHM)
+        keyring.load_dir(settings.JWT_KEYS_DIR)
+        keyring.activate(settings.JWT_ACTIVE_KID or None)
+        return keyring
+
+    def add_private_key(self, kid: str, pem: bytes) -> None:
+        private_key = jwk.construct(pem, self.algorithm)
+        with self._lock:
+            self._private_keys = {**self._private_keys, kid: private_key}
+            self._public_keys = {**self._public_keys, kid: private_key.public_key()}
+
+    def add_public_jwk(self, jwk_dict: Dict[str, Any]) -> None:
+        """Trust an externally published public key for verification."""
+        public_key = jwk.construct(jwk_dict, self.algorithm)
+        with self._lock:
+            self._public_keys = {**self._public_keys, jwk_dict["kid"]: public_key}
+
+    def load_dir(self, path: str) -> None:
+        """Sync the keys loaded from ``path`` with its ``<kid>.pem`` files.
+
+        New files are parsed outside the lock, then the new key maps are
+        swapped in at once, without the kids whose file was deleted.
+        """
+        self.keys_dir = path
+        self._last_reload = time.monotonic()
+        files = {key_file.stem: key_file for key_file in Path(path).glob("*.pem")}
+        with self._lock:
+            known = set(self._private_keys)
+        parsed = {
+            kid: jwk.construct(key_file.read_bytes(), self.algorithm)
+            for kid, key_file in files.items()
+            if kid not in known
+        }
+        with self._lock:
+            removed = self._dir_kids - files.keys()
+            private_keys = {
+                kid: key
+                for kid, key in self._private_keys.items()
+                if kid not in removed
+            }
+            public_keys = {
+                kid: key for kid, key in self._public_keys.items() if kid not in removed
+            }
+            for kid, private_key in parsed.items():
+                private_keys[kid] = private_key
+                public_keys[kid] = private_key.public_key()
+            self._private_keys, self._public_keys = private_keys, public_keys
+            self._dir_kids = set(files)
+            self._select_active()
+
+    def activate(self, kid: Optional[str] = None) -> None:
+        """Select the signing key, defaulting to the newest (highest) kid.
+
+        A kid given here keeps signing across rescans for as long as its
+        file exists; otherwise rescans switch to the newest key.
+        """
+        with self._lock:
+            if kid is not None and kid not in self._private_keys:
+                raise ValueError(f"No private key loaded for kid {kid!r}")
+            self._pinned_kid = kid
+            self._select_active()
+            if self.active_kid is None:
+                raise ValueError("No private key loaded")
+
+    def _select_active(self) -> None:
+        # Called under _lock
+        if self._pinned_kid is not None and self._pinned_kid not in self._private_keys:
+            logger.warning(
+                f"Signing key {self._pinned_kid!r} was removed; "
+                "signing with the newest key"
+            )
+            self._pinned_kid = None
+        if self._pinned_kid is not None:
+            self.active_kid = self._pinned_kid
+        else:
+            self.active_kid = max(self._private_keys, default=None)
+
+    def signing_key(self) -> Tuple[Optional[str], Key]:
+        if self._secret_key is not None:
+            return None, self._secret_key
+        self._reload_if_due()
+        with self._lock:
+            kid = self.active_kid
+            if kid is None:
+                raise ValueError("No active signing key")
+            return kid, self._private_keys[kid]
+
+    def verification_key(self, kid: Optional[str]) -> Key:
+        if self._secret_key is not None:
+            return self._secret_key
+        with self._lock:
+            key = self._public_keys.get(kid or self.active_kid)
+        if key is None and self._reload_if_due():
+            with self._lock:
+                key = self._public_keys.get(kid or self.active_kid)
+        if key is None:
+            raise JWTError(f"Unknown key id: {kid}")
+        return key
+
+    def _reload_if_due(self) -> bool:
+        """Rescan keys_dir if the last scan is old enough; True if it ran."""
+        if (
+            not self.keys_dir
+            or time.monotonic() - self._last_reload <= RELOAD_INTERVAL_SECONDS
+        ):
+            return False
+        self.load_dir(self.keys_dir)
+        return True
+
+    def jwks(self) -> Dict[str, Any]:
+        """Public keys in JSON Web Key Set format."""
+        with self._lock:
+            public_keys = self._public_keys
+        keys = []
+        for kid, public_key in sorted(public_keys.items()):
+            key_dict = public_key.to_dict()
+            key_dict.update({"kid": kid, "use": "sig"})
+            keys.append(key_dict)
+        return {"keys": keys}
+
+
+def rotate(keys_dir: str, algorithm: str) -> str:
+    """Write a new private key to ``keys_dir`` and return its kid."""
+    kid = time.strftime("%Y%m%d%H%M%S", time.gmtime())
+    path = Path(keys_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    key_file = path / f"{kid}.pem"
+    key_file.write_bytes(generate_private_key(algorithm))
+    key_file.chmod(0o600)
+    return kid
+
+
+@lru_cache
+def get_keyring() -> KeyRing:
+    """Key ring configured from settings, built on first use."""
+    return KeyRing.from_settings()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rotate_parser = subparsers.add_parser("rotate", help="Generate a new key")
+    rotate_parser.add_argument("--dir", default=settings.JWT_KEYS_DIR)
+    rotate_parser.add_argument("--algorithm", default=settings.ALGORITHM)
+    args = parser.parse_args()
+
+    if not args.dir:
+        parser.error("--dir is required when JWT_KEYS_DIR is not set")
+    print(rotate(args.dir, args.algorithm))
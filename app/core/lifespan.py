@@ -0,0 +1,39 @@
+"""
+lifespan.py
+
+Startup and shutdown of the background tasks each worker runs.
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.health import readiness
+from app.core.loop_monitor import loop_monitor
+from app.core.outbox import outbox_worker
+from app.core.purge import purge_worker
+from app.crud.token_versions import bus as token_versions_bus
+from app.crud.user_cache import bus as user_cache_bus
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    user_cache_bus.start()
+    token_versions_bus.start()
+    await readiness.start()
+    if settings.OUTBOX_ENABLED:
+        outbox_worker.start()
+    if settings.USER_SOFT_DELETE and settings.USER_PURGE_ENABLED:
+        purge_worker.start()
+    try:
+        yield
+    finally:
+        await purge_worker.stop()
+        await outbox_worker.stop()
+        await readiness.stop()
+        await loop_monitor.stop()
+        token_versions_bus.stop()
+        user_cache_bus.stop()
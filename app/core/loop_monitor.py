@@ -0,0 +1,146 @@
+"""
+loop_monitor.py
+
+Event loop lag and blocking call detection. Sync crud and bcrypt calls run
+inside ``async def`` handlers, so one slow call stalls every request the
+worker is serving.
+
+A heartbeat task wakes every LOOP_MONITOR_INTERVAL_MS and records how late
+it woke in the ``event_loop_lag_seconds`` histogram. A watchdog thread
+checks that the heartbeat keeps beating; when it has not beaten for
+LOOP_BLOCK_THRESHOLD_MS the loop is blocked, and the watchdog captures the
+stack of the event loop thread, logs it once per stall and keeps it in
+``recent_blocks``. While the loop is healthy both only wake a few times a
+second.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import Counter, Histogram, registry
+
+
+@dataclass
+class BlockedLoop:
+    detected_at: float
+    blocked_seconds: float
+    stack: List[str]
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = 0.1,
+        block_threshold: Optional[float] = None,
+        histogram: Optional[Histogram] = None,
+        blocked_counter: Optional[Counter] = None,
+        keep_blocks: int = 20,
+    ) -> None:
+        self.interval = interval
+        # None disables the watchdog and leaves only lag measurement
+        self.block_threshold = block_threshold
+        self.histogram = histogram
+        self.blocked_counter = blocked_counter
+        self.max_lag = 0.0
+        self.blocked_total = 0
+        self.recent_blocks: Deque[BlockedLoop] = deque(maxlen=keep_blocks)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        ):
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        if self.block_threshold is not None and self._watchdog is None:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def take_max_lag(self) -> float:
+        """Largest lag in seconds since the previous call."""
+        lag, self.max_lag = self.max_lag, 0.0
+        return lag
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(now - expected, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            if self.histogram is not None:
+                self.histogram.observe(lag)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        poll = self.block_threshold / 2
+        while not self._stopped.wait(poll):
+            task = self._task
+            # A loop that was stopped or closed is idle, not blocked
+            if task is None or not task.get_loop().is_running():
+                continue
+            last_beat = self._last_beat
+            # The heartbeat is due every interval; anything beyond is a stall
+            blocked = time.monotonic() - last_beat - self.interval
+            if blocked >= self.block_threshold and last_beat != reported_beat:
+                reported_beat = last_beat
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        self.blocked_total += 1
+        if self.blocked_counter is not None:
+            self.blocked_counter.inc()
+        self.recent_blocks.append(BlockedLoop(time.time(), blocked, stack))
+        logger.warning(
+            f"Event loop blocked for at least {blocked * 1000:.0f}ms in:\n"
+            + "".join(stack)
+        )
+
+
+lag_histogram = registry.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop heartbeat"
+)
+blocked_counter = registry.counter(
+    "event_loop_blocked_total",
+    "Stalls of the event loop longer than LOOP_BLOCK_THRESHOLD_MS",
+)
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000,
+    block_threshold=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+    histogram=lag_histogram,
+    blocked_counter=blocked_counter,
+)
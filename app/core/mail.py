@@ -0,0 +1,81 @@
+"""
+mail.py
+
+Mail transports used by the outbox worker. ``SMTPTransport`` sends through
+SMTP_HOST with smtplib in a worker thread; ``MemoryTransport`` is the local
+stand-in for development and tests and only keeps what it was given.
+"""
+
+import asyncio
+import smtplib
+from email.message import EmailMessage
+from typing import Any, Dict, List
+
+from app.core.config import settings
+
+
+class MailTransport:
+    async def send(self, message: EmailMessage) -> None:
+        raise NotImplementedError
+
+
+class SMTPTransport(MailTransport):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        timeout: float = 10.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+
+    async def send(self, message: EmailMessage) -> None:
+        await asyncio.to_thread(self._send, message)
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+
+
+class MemoryTransport(MailTransport):
+    """Keeps sent messages in ``sent`` instead of delivering them."""
+
+    def __init__(self) -> None:
+        self.sent: List[EmailMessage] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        self.sent.append(message)
+
+
+def get_transport(name: str = settings.MAIL_TRANSPORT) -> MailTransport:
+    if name == "smtp":
+        return SMTPTransport(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            settings.SMTP_USER,
+            settings.SMTP_PASSWORD,
+        )
+    if name == "memory":
+        return MemoryTransport()
+    raise ValueError(f"Unknown mail transport: {name}")
+
+
+def welcome_email(payload: Dict[str, Any]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.MAIL_FROM
+    message["To"] = payload["email"]
+    message["Subject"] = f"Welcome to {settings.PROJECT_NAME}"
+    message.set_content(
+        f"Hi {payload['name']},\n\n"
+        f"Your {settings.PROJECT_NAME} account is ready. "
+        f"Sign in with {payload['email']}.\n"
+    )
+    return message
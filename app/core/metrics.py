@@ -0,0 +1,146 @@
+"""
+metrics.py
+
+Minimal in-process metrics registry rendered in the Prometheus text
+exposition format by GET /metrics. Only counters, gauges and histograms
+without labels are supported; that covers the process-level metrics this
+service exports without pulling in a client library.
+"""
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Seconds, suited to latencies from a millisecond to several seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format(self.value)}"]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Optional[Callable[[], float]] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+        # Read at scrape time instead of being set
+        self.function = function
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self) -> List[str]:
+        value = self.function() if self.function is not None else self.value
+        return [f"{self.name} {_format(value)}"]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Register ``metric``, or return the one already registered under
+        its name so modules can declare metrics at import time."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.register(Counter(name, documentation))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        function: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, function))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+registry = Registry()
@@ -10,8 +10,8 @@ import time
 from typing import Callable
 
 from fastapi import FastAPI, Request, Response
-from fastapi.middleware.base import BaseHTTPMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 
@@ -26,6 +26,14 @@ def add_cors_middleware(app):
     )
 
 
+# middleware to report how long each request took
+async def add_process_time_header(request: Request, call_next: Callable) -> Response:
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    response.headers["X-Process-Time"] = f"{time.perf_counter() - start_time:.6f}"
+    return response
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp, calls: int = 10, window: int = 60) -> None:
         super().__init__(app)
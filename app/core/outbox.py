@@ -0,0 +1,212 @@
+"""
+outbox.py
+
+Transactional outbox for side effects of user lifecycle changes, such as
+welcome emails. ``enqueue`` adds a message to the caller's session, so it
+is committed or rolled back together with the change that caused it, and
+requests never wait for delivery.
+
+``OutboxWorker`` drains the outbox in the background: it claims up to
+OUTBOX_BATCH_SIZE due messages, delivers at most OUTBOX_CONCURRENCY at a
+time through the topic's handler and retries failures with exponential
+backoff until OUTBOX_MAX_ATTEMPTS. A claimed message is leased for
+OUTBOX_LEASE_SECONDS, so messages of a worker that died are picked up
+again: delivery is at least once.
+"""
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.core.mail import MailTransport, get_transport, welcome_email
+from app.models.outbox import FAILED, PENDING, SENT, OutboxMessage
+
+USER_CREATED = "user.created"
+
+Handler = Callable[[Dict[str, Any], MailTransport], Awaitable[None]]
+
+
+def enqueue(db: Session, topic: str, payload: Dict[str, Any]) -> OutboxMessage:
+    """Add a message to the current transaction of ``db`` without committing."""
+    message = OutboxMessage(
+        topic=topic,
+        payload=json.dumps(payload),
+        status=PENDING,
+        attempts=0,
+    )
+    db.add(message)
+    return message
+
+
+async def send_welcome_email(payload: Dict[str, Any], transport: MailTransport) -> None:
+    await transport.send(welcome_email(payload))
+
+
+HANDLERS: Dict[str, Handler] = {USER_CREATED: send_welcome_email}
+
+
+@dataclass
+class ClaimedMessage:
+    id: int
+    topic: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        transport: MailTransport,
+        handlers: Optional[Dict[str, Handler]] = None,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        concurrency: int = settings.OUTBOX_CONCURRENCY,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        poll_seconds: float = settings.OUTBOX_POLL_SECONDS,
+        backoff_seconds: float = settings.OUTBOX_BACKOFF_SECONDS,
+        backoff_max_seconds: float = settings.OUTBOX_BACKOFF_MAX_SECONDS,
+        lease_seconds: float = settings.OUTBOX_LEASE_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.transport = transport
+        self.handlers = HANDLERS if handlers is None else handlers
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if (
+            self._task is None
+            or self._task.done()
+            or self._task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due messages and return its size."""
+        # Database work runs in threads to keep the event loop responsive
+        messages = await asyncio.to_thread(self._claim)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(
+            *(self._deliver(message, semaphore) for message in messages)
+        )
+        return len(messages)
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retrying after ``attempts`` failures."""
+        delay = min(
+            self.backoff_seconds * 2 ** (attempts - 1), self.backoff_max_seconds
+        )
+        # Jitter spreads out retries of messages that failed together
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _deliver(
+        self, message: ClaimedMessage, semaphore: asyncio.Semaphore
+    ) -> None:
+        async with semaphore:
+            try:
+                handler = self.handlers.get(message.topic)
+                if handler is None:
+                    raise LookupError(f"No handler for topic {message.topic}")
+                await handler(message.payload, self.transport)
+            except Exception as e:
+                await asyncio.to_thread(
+                    self._mark_failed, message, f"{type(e).__name__}: {e}"
+                )
+            else:
+                await asyncio.to_thread(self._mark_sent, message)
+
+    def _claim(self) -> List[ClaimedMessage]:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            stmt = (
+                select(OutboxMessage)
+                .where(OutboxMessage.status == PENDING)
+                .where(OutboxMessage.available_at <= now)
+                .order_by(OutboxMessage.available_at, OutboxMessage.id)
+                .limit(self.batch_size)
+                # Concurrent workers claim disjoint batches on Postgres
+                .with_for_update(skip_locked=True)
+            )
+            rows = list(db.scalars(stmt))
+            lease_until = now + timedelta(seconds=self.lease_seconds)
+            for row in rows:
+                row.available_at = lease_until
+            db.commit()
+            return [
+                ClaimedMessage(row.id, row.topic, json.loads(row.payload), row.attempts)
+                for row in rows
+            ]
+
+    def _mark_sent(self, message: ClaimedMessage) -> None:
+        self._update(
+            message,
+            status=SENT,
+            attempts=message.attempts + 1,
+            sent_at=datetime.utcnow(),
+            last_error=None,
+        )
+
+    def _mark_failed(self, message: ClaimedMessage, error: str) -> None:
+        attempts = message.attempts + 1
+        if attempts >= self.max_attempts:
+            logger.error(
+                f"Outbox message {message.id} ({message.topic}) failed "
+                f"{attempts} times, giving up: {error}"
+            )
+            self._update(message, status=FAILED, attempts=attempts, last_error=error)
+            return
+        delay = self.backoff(attempts)
+        logger.warning(
+            f"Outbox message {message.id} ({message.topic}) failed, "
+            f"retrying in {delay:.1f}s: {error}"
+        )
+        self._update(
+            message,
+            attempts=attempts,
+            last_error=error,
+            available_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+
+    def _update(self, message: ClaimedMessage, **values: Any) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message.id)
+                .values(**values)
+            )
+            db.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delivered = await self.drain_once()
+            except Exception:
+                logger.exception("Outbox drain failed")
+                delivered = 0
+            # A full batch suggests more messages are waiting
+            if delivered < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+
+outbox_worker = OutboxWorker(SessionLocal, get_transport())
@@ -0,0 +1,285 @@
+"""
+profiling.py
+
+In-process sampling profiler that can be switched on at runtime for chosen
+routes. A background thread wakes every few milliseconds, walks the stack of
+every thread with ``sys._current_frames()`` and, when the stack passes
+through a request that ProfilingMiddleware selected for profiling, counts
+the stack under that request's route. Stacks are aggregated in the folded
+format understood by flamegraph.pl, speedscope and inferno.
+
+Requests are selected by matching their path against the route templates
+given to ``start`` (all requests when none are given), then by mode:
+
+* ``window``: every matching request until the window closes;
+* ``sample``: one in every ``every_n`` matching requests.
+
+Only code running in the request's own task is seen: work handed to the
+threadpool (sync ``def`` endpoints and dependencies) is not attributed.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+WINDOW_MODE = "window"
+SAMPLE_MODE = "sample"
+
+
+@dataclass
+class ProfilerState:
+    mode: Optional[str] = None
+    routes: FrozenSet[str] = frozenset()
+    every_n: int = 1
+    interval: float = 0.005
+    until: float = 0.0
+    seen: int = 0
+    profiled: int = 0
+    samples: int = 0
+    dropped: int = 0
+    started_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.mode is not None and time.monotonic() < self.until
+
+
+@dataclass
+class _Tracked:
+    scope: Scope = field(repr=False)
+    # Folded stacks are rooted at the middleware frame
+    root: FrameType = field(repr=False)
+    # Template selected by a route filter, otherwise resolved once routed
+    route: Optional[str] = None
+    # Stacks below the root, labelled with the route when the request ends
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def label(self) -> str:
+        route = self.route or _route_template(self.scope)
+        return f"{self.scope['method']} {route}"
+
+
+class SamplingProfiler:
+    """Samples the stacks of requests selected by ProfilingMiddleware."""
+
+    def __init__(self, max_stacks: int) -> None:
+        self.max_stacks = max_stacks
+        self.state = ProfilerState()
+        self._stacks: Counter = Counter()
+        self._tracked: Dict[int, _Tracked] = {}
+        self._patterns: List[Tuple[str, Pattern]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(
+        self,
+        mode: str,
+        seconds: float,
+        routes: Iterable[str] = (),
+        every_n: int = 1,
+        interval: float = 0.005,
+    ) -> ProfilerState:
+        """Start profiling for ``seconds``, replacing any running session."""
+        if mode not in (WINDOW_MODE, SAMPLE_MODE):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        patterns = [(route, compile_path(route)[0]) for route in routes]
+        with self._lock:
+            self._patterns = patterns
+            self.state = ProfilerState(
+                mode=mode,
+                routes=frozenset(route for route, _ in patterns),
+                every_n=max(1, every_n),
+                interval=interval,
+                until=time.monotonic() + seconds,
+                started_at=time.time(),
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+        return self.state
+
+    def stop(self) -> ProfilerState:
+        with self._lock:
+            self.state.mode = None
+        return self.state
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.state.samples = 0
+            self.state.dropped = 0
+
+    def select(self, path: str) -> Tuple[bool, Optional[str]]:
+        """Decide whether a request for ``path`` is profiled.
+
+        Returns:
+            Tuple[bool, Optional[str]]: Whether to profile the request, and
+            the route filter template it matched, if any
+        """
+        state = self.state
+        if not state.active:
+            return False, None
+        route = None
+        if self._patterns:
+            route = next(
+                (route for route, regex in self._patterns if regex.match(path)), None
+            )
+            if route is None:
+                return False, None
+        with self._lock:
+            state.seen += 1
+            if state.mode == SAMPLE_MODE and (state.seen - 1) % state.every_n:
+                return False, route
+            state.profiled += 1
+        return True, route
+
+    def track(self, frame: FrameType, scope: Scope, route: Optional[str]) -> None:
+        self._tracked[id(frame)] = _Tracked(scope, frame, route)
+
+    def untrack(self, frame: FrameType) -> None:
+        # Under the lock, so the sampler adds no stacks to the request once
+        # they are recorded
+        with self._lock:
+            tracked = self._tracked.pop(id(frame), None)
+            if tracked is None:
+                return
+            label = tracked.label
+            for stack, count in tracked.stacks.items():
+                self._record(f"{label};{stack}", count)
+
+    def folded(self, route: Optional[str] = None) -> str:
+        """Aggregated stacks, one ``frame;frame;frame count`` line each.
+
+        Stacks are rooted at ``METHOD /route/template``; ``route`` keeps only
+        the stacks of one route, given with or without the method.
+        """
+        with self._lock:
+            items = sorted(self._stacks.items())
+        lines = []
+        for stack, count in items:
+            label = stack.split(";", 1)[0]
+            if route is None or route in (label, label.split(" ", 1)[-1]):
+                lines.append(f"{stack} {count}\n")
+        return "".join(lines)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not (self.state.active or self._tracked):
+                    self._thread = None
+                    return
+            started = time.perf_counter()
+            self._sample(own_id)
+            elapsed = time.perf_counter() - started
+            time.sleep(max(self.state.interval - elapsed, 0.0005))
+
+    def _sample(self, own_id: int) -> None:
+        if not self._tracked:
+            return
+        samples: List[Tuple[_Tracked, str]] = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack: List[str] = []
+            tracked: Optional[_Tracked] = None
+            current: Optional[FrameType] = frame
+            while current is not None:
+                tracked = self._tracked.get(id(current))
+                if tracked is not None and tracked.root is current:
+                    break
+                stack.append(_describe(current))
+                current = current.f_back
+            else:
+                continue
+            if stack:
+                samples.append((tracked, ";".join(reversed(stack))))
+        with self._lock:
+            for tracked, stack in samples:
+                if self._tracked.get(id(tracked.root)) is tracked:
+                    tracked.stacks[stack] += 1
+
+    def _record(self, folded_stack: str, count: int = 1) -> None:
+        # Called with the lock held
+        self.state.samples += count
+        if folded_stack in self._stacks or len(self._stacks) < self.max_stacks:
+            self._stacks[folded_stack] += count
+        else:
+            self.state.dropped += count
+
+
+_descriptions: Dict[CodeType, str] = {}
+
+
+def _describe(frame: FrameType) -> str:
+    code = frame.f_code
+    description = _descriptions.get(code)
+    if description is None:
+        prefix = max(
+            (path for path in sys.path if path and code.co_filename.startswith(path)),
+            key=len,
+            default="",
+        )
+        filename = code.co_filename.removeprefix(prefix).lstrip("/\\")
+        description = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _descriptions[code] = description
+    return description
+
+
+profiler = SamplingProfiler(max_stacks=settings.PROFILER_MAX_STACKS)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware, so the endpoint runs below this frame."""
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler = profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.state.active:
+            await self.app(scope, receive, send)
+            return
+
+        selected, route = self.profiler.select(scope["path"])
+        if not selected:
+            await self.app(scope, receive, send)
+            return
+
+        frame = sys._getframe()
+        self.profiler.track(frame, scope, route)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.untrack(frame)
+
+
+def _route_template(scope: Scope) -> str:
+    """Full path template of the route serving a request, e.g.
+    /api/v1/users/{user_id}, or its path until routing is done."""
+    path = scope["path"]
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return path
+    # Routes of included routers only know the template below their prefix
+    params = {name: str(value) for name, value in scope["path_params"].items()}
+    try:
+        tail = path_format.format(**params)
+    except (KeyError, IndexError, ValueError):
+        return path
+    if not path.endswith(tail):
+        return path
+    return path[: len(path) - len(tail)] + path_format
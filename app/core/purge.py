@@ -0,0 +1,83 @@
+"""
+purge.py
+
+Background hard-deletion of soft-deleted users. Every
+USER_PURGE_INTERVAL_SECONDS the worker deletes the users tombstoned more
+than USER_PURGE_AFTER_SECONDS ago, USER_PURGE_BATCH_SIZE rows per
+transaction with USER_PURGE_BATCH_PAUSE_SECONDS between batches, so purging
+a large backlog never holds locks for long. USER_PURGE_ENABLED=false keeps
+the worker from starting, e.g. on all but one instance.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.crud import crud_user
+
+
+class PurgeWorker:
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        purge_after_seconds: float = settings.USER_PURGE_AFTER_SECONDS,
+        interval_seconds: float = settings.USER_PURGE_INTERVAL_SECONDS,
+        batch_size: int = settings.USER_PURGE_BATCH_SIZE,
+        batch_pause_seconds: float = settings.USER_PURGE_BATCH_PAUSE_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.purge_after_seconds = purge_after_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if (
+            self._task is None
+            or self._task.done()
+            or self._task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def purge(self) -> int:
+        """Purge every user due for it and return how many were deleted."""
+        deleted_before = datetime.utcnow() - timedelta(seconds=self.purge_after_seconds)
+        total = 0
+        while True:
+            deleted = await asyncio.to_thread(self._purge_batch, deleted_before)
+            total += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause_seconds)
+        if total:
+            logger.info(f"Purged {total} deleted users")
+        return total
+
+    def _purge_batch(self, deleted_before: datetime) -> int:
+        with self.session_factory() as db:
+            return crud_user.purge_deleted(
+                db, deleted_before=deleted_before, batch_size=self.batch_size
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logger.exception("Purging deleted users failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+purge_worker = PurgeWorker(SessionLocal)
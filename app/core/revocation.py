@@ -0,0 +1,138 @@
+"""
+revocation.py
+
+Revocation list for issued JWTs. Revoked token ids are kept in memory only
+until the token would have expired anyway, grouped into time buckets so that
+expired entries are dropped a whole bucket at a time. An optional SQLite
+store persists revocations across restarts.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class SQLiteRevocationStore:
+    """Persist revoked token ids in a local SQLite database."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens "
+                "(jti TEXT PRIMARY KEY, exp INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_exp "
+                "ON revoked_tokens (exp)"
+            )
+
+    def add(self, jti: str, exp: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (jti, exp) VALUES (?, ?)",
+                (jti, exp),
+            )
+
+    def load(self, now: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT jti, exp FROM revoked_tokens WHERE exp > ?", (now,)
+            ).fetchall()
+
+    def purge(self, now: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (now,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RevocationList:
+    """In-memory set of revoked token ids indexed by expiry bucket.
+
+    Membership checks are a single dict lookup; expired entries are evicted
+    lazily by popping whole buckets off a min-heap of bucket start times.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        store: Optional[SQLiteRevocationStore] = None,
+    ) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.store = store
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, int] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._bucket_heap: List[int] = []
+        if store is not None:
+            now = int(time.time())
+            store.purge(now)
+            self._add_many(store.load(now))
+
+    def revoke(self, jti: str, exp: int) -> bool:
+        """Revoke a token id until its expiry time.
+
+        Returns:
+            False if the token id was already revoked, True otherwise
+        """
+        now = int(time.time())
+        with self._lock:
+            evicted = self._purge(now)
+            if jti in self._revoked:
+                return False
+            self._add(jti, exp)
+        if self.store is not None:
+            if evicted:
+                self.store.purge(now)
+            self.store.add(jti, exp)
+        return True
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        with self._lock:
+            self._purge(int(time.time()))
+            return jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _add_many(self, entries: Iterable[Tuple[str, int]]) -> None:
+        with self._lock:
+            for jti, exp in entries:
+                self._add(jti, exp)
+
+    def _add(self, jti: str, exp: int) -> None:
+        # Entries live in the bucket that ends after their expiry
+        bucket = exp - exp % self.bucket_seconds
+        if bucket not in self._buckets:
+            self._buckets[bucket] = set()
+            heapq.heappush(self._bucket_heap, bucket)
+        self._buckets[bucket].add(jti)
+        self._revoked[jti] = exp
+
+    def _purge(self, now: int) -> bool:
+        evicted = False
+        while self._bucket_heap and self._bucket_heap[0] + self.bucket_seconds <= now:
+            bucket = heapq.heappop(self._bucket_heap)
+            for jti in self._buckets.pop(bucket):
+                del self._revoked[jti]
+            evicted = True
+        return evicted
+
+
+revocation_list = RevocationList(
+    bucket_seconds=settings.TOKEN_REVOCATION_BUCKET_SECONDS,
+    store=(
+        SQLiteRevocationStore(settings.TOKEN_REVOCATION_DB)
+        if settings.TOKEN_REVOCATION_DB
+        else None
+    ),
+)
@@ -1,15 +1,28 @@
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Dict, Optional
+from uuid import uuid4
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.keys import get_keyring
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Version of the authorization claims layout embedded in access tokens.
+# Tokens carrying a different version are re-authorised against the database.
+TOKEN_CLAIMS_VERSION = 1
 
-def create_access_token(subject: Any, expires_delta: timedelta | None = None) -> str:
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+def create_access_token(
+    subject: Any,
+    expires_delta: timedelta | None = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> str:
     """Create JWT access token."""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -18,13 +31,55 @@ def create_access_token(subject: Any, expires_delta: timedelta | None = None) ->
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid4().hex}
+    if claims:
+        to_encode.update(claims)
+    kid, key = get_keyring().signing_key()
     encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        to_encode,
+        key,
+        algorithm=settings.ALGORITHM,
+        headers={"kid": kid} if kid else None,
     )
     return encoded_jwt
 
 
+def user_claims(user: Any) -> Dict[str, Any]:
+    """Build the authorization claims embedded in a user's access token."""
+    return {
+        "typ": ACCESS_TOKEN_TYPE,
+        "cv": TOKEN_CLAIMS_VERSION,
+        "act": bool(user.is_active),
+        "adm": bool(user.is_superuser),
+        "tv": user.token_version or 0,
+    }
+
+
+def create_user_access_token(user: Any, expires_delta: timedelta | None = None) -> str:
+    """Create JWT access token carrying the user's authorization claims."""
+    return create_access_token(
+        user.id, expires_delta=expires_delta, claims=user_claims(user)
+    )
+
+
+def create_refresh_token(user: Any, expires_delta: timedelta | None = None) -> str:
+    """Create single-use JWT refresh token."""
+    if not expires_delta:
+        expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return create_access_token(
+        user.id,
+        expires_delta=expires_delta,
+        claims={"typ": REFRESH_TOKEN_TYPE, "tv": user.token_version or 0},
+    )
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Decode and verify a JWT, returning its payload."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = get_keyring().verification_key(kid)
+    return jwt.decode(token, key, algorithms=[settings.ALGORITHM])
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash."""
     return pwd_context.verify(plain_password, hashed_password)
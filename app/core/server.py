@@ -0,0 +1,201 @@
+"""
+server.py
+
+ASGI server profiles. ``python -m app.core.server`` serves main:app with
+the profile named by SERVER_PROFILE:
+
+* ``default``: uvicorn with its own defaults, as ``uvicorn main:app``;
+* ``tuned``: uvicorn on uvloop with the httptools parser, keep-alive longer
+  than the 60 second idle timeout of common load balancers (so they never
+  reuse a connection the server is closing), a deeper listen backlog for
+  connection bursts, and a cap on concurrent requests beyond which uvicorn
+  answers 503 instead of queueing without bound;
+* ``http2``: hypercorn, serving HTTP/2 next to HTTP/1.1: h2 over TLS with
+  SERVER_CERTFILE and SERVER_KEYFILE, h2c otherwise. Hypercorn has no
+  concurrency cap; it limits the streams of each connection instead.
+
+The SERVER_* settings override the values of the profile. Compare the
+profiles with benchmarks/bench_server.py.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Union
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.logger import logger
+
+
+@dataclass(frozen=True)
+class ServerProfile:
+    name: str
+    # "uvicorn" or "hypercorn"
+    server: str = "uvicorn"
+    # Event loop: "auto", "asyncio" or "uvloop"
+    loop: str = "auto"
+    # uvicorn HTTP/1.1 parser: "auto", "h11" or "httptools"
+    http: str = "auto"
+    keepalive_seconds: int = 5
+    backlog: int = 2048
+    limit_concurrency: Optional[int] = None
+    workers: int = 1
+    http2: bool = False
+
+
+PROFILES: Dict[str, ServerProfile] = {
+    "default": ServerProfile("default"),
+    "tuned": ServerProfile(
+        "tuned",
+        loop="uvloop",
+        http="httptools",
+        keepalive_seconds=75,
+        backlog=4096,
+        limit_concurrency=1000,
+    ),
+    "http2": ServerProfile(
+        "http2",
+        server="hypercorn",
+        loop="uvloop",
+        keepalive_seconds=75,
+        backlog=4096,
+        http2=True,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> ServerProfile:
+    """The profile called ``name`` (default SERVER_PROFILE) with the SERVER_*
+    overrides applied.
+
+    Raises:
+        ValueError: If there is no such profile
+    """
+    name = name or settings.SERVER_PROFILE
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown server profile {name!r}, expected one of {', '.join(PROFILES)}"
+        )
+    overrides = {
+        "workers": settings.SERVER_WORKERS,
+        "keepalive_seconds": settings.SERVER_KEEPALIVE_SECONDS,
+        "backlog": settings.SERVER_BACKLOG,
+        "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY,
+    }
+    return replace(
+        PROFILES[name],
+        **{field: value for field, value in overrides.items() if value is not None},
+    )
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve(profile: ServerProfile) -> ServerProfile:
+    """Fall back to the asyncio loop and the h11 parser when uvloop or
+    httptools are not installed, e.g. on Windows."""
+    changes: Dict[str, str] = {}
+    if profile.loop == "uvloop" and not _installed("uvloop"):
+        changes["loop"] = "asyncio"
+    if profile.http == "httptools" and not _installed("httptools"):
+        changes["http"] = "h11"
+    for field, value in changes.items():
+        logger.warning(
+            f"Server profile {profile.name}: {getattr(profile, field)} is not "
+            f"installed, using {value}"
+        )
+    return replace(profile, **changes)
+
+
+def uvicorn_options(profile: ServerProfile, host: str, port: int) -> Dict[str, Any]:
+    return {
+        "host": host,
+        "port": port,
+        "loop": profile.loop,
+        "http": profile.http,
+        "timeout_keep_alive": profile.keepalive_seconds,
+        "backlog": profile.backlog,
+        "limit_concurrency": profile.limit_concurrency,
+        "workers": profile.workers,
+        "ssl_certfile": settings.SERVER_CERTFILE or None,
+        "ssl_keyfile": settings.SERVER_KEYFILE or None,
+    }
+
+
+def hypercorn_config(profile: ServerProfile, host: str, port: int) -> Any:
+    """Hypercorn configuration for ``profile``.
+
+    Raises:
+        RuntimeError: If hypercorn is not installed
+    """
+    if not _installed("hypercorn"):
+        raise RuntimeError(
+            f"Server profile {profile.name} needs hypercorn: pip install hypercorn"
+        )
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    config.keep_alive_timeout = profile.keepalive_seconds
+    config.backlog = profile.backlog
+    config.workers = profile.workers
+    config.worker_class = "uvloop" if profile.loop == "uvloop" else "asyncio"
+    if settings.SERVER_CERTFILE:
+        config.certfile = settings.SERVER_CERTFILE
+        config.keyfile = settings.SERVER_KEYFILE or None
+    if not profile.http2:
+        config.alpn_protocols = ["http/1.1"]
+    return config
+
+
+def serve(
+    app: Union[str, Any] = "main:app",
+    profile: Optional[ServerProfile] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+) -> None:
+    """Serve ``app``, an ASGI app or its import path, until interrupted.
+
+    Several workers need an import path to load the app in each of them.
+    """
+    profile = resolve(profile or get_profile())
+    host = host or settings.SERVER_HOST
+    port = port or settings.SERVER_PORT
+    logger.info(f"Serving {app} on {host}:{port} with {profile}")
+    if profile.server == "uvicorn":
+        uvicorn.run(app, **uvicorn_options(profile, host, port))
+        return
+
+    config = hypercorn_config(profile, host, port)
+    if isinstance(app, str):
+        from hypercorn.run import run
+
+        config.application_path = app
+        run(config)
+        return
+    from hypercorn.asyncio import serve as hypercorn_serve
+
+    if config.worker_class == "uvloop":
+        import uvloop
+
+        uvloop.run(hypercorn_serve(app, config))
+    else:
+        asyncio.run(hypercorn_serve(app, config))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API server.")
+    parser.add_argument("app", nargs="?", default="main:app", help="ASGI app path")
+    parser.add_argument("--profile", choices=PROFILES, help="Default SERVER_PROFILE")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+    serve(args.app, get_profile(args.profile), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
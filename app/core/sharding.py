@@ -0,0 +1,249 @@
+"""
+sharding.py
+
+Horizontal sharding of the users table. With USER_SHARDS set (shard id to
+database URL), ``SessionLocal`` builds ``ShardedSession``s and crud_user
+runs unchanged on top of them:
+
+* a user lives on the shard its id maps to on a consistent hash ring, so
+  adding a shard only moves about 1/N of the users (see app.utils.reshard);
+* ids are snowflake ids generated before the insert, unique across shards;
+* statements restricted to ``users.id == x`` or ``users.id IN (...)`` run
+  on the owning shards only, any other users statement on every shard, and
+  list queries merge the rows gathered from each shard (``merge_sorted``);
+* every other table stays on the default database, DATABASE_URL, including
+  user_emails, which keeps emails unique across shards.
+
+A write touching a user shard and the default database, such as creating a
+user with its outbox message, commits on each database in turn: it is not
+atomic across them. Run the migrations against every shard URL.
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import (
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+    ColumnElement,
+)
+
+from app.core.config import settings
+
+DEFAULT_SHARD = "default"
+# Tables partitioned across the user shards, keyed by their id column
+SHARDED_TABLES = frozenset({"users"})
+
+# 2026-01-01T00:00:00Z
+SNOWFLAKE_EPOCH_MS = 1_767_225_600_000
+_WORKER_BITS = 10
+_SEQUENCE_BITS = 12
+
+
+class HashRing:
+    """Consistent hash ring placing every shard at ``vnodes`` points."""
+
+    def __init__(self, shards: Sequence[str], vnodes: int = 128) -> None:
+        if not shards:
+            raise ValueError("A hash ring needs at least one shard")
+        self.shards = list(shards)
+        points = sorted(
+            (_hash(f"{shard}#{n}"), shard)
+            for shard in self.shards
+            for n in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: object) -> str:
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._owners[index]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class SnowflakeGenerator:
+    """64-bit ids ordered by creation time: 41 bits of milliseconds since
+    SNOWFLAKE_EPOCH_MS, 10 bits of worker id and a 12-bit sequence."""
+
+    def __init__(self, worker_id: int) -> None:
+        if not 0 <= worker_id < 1 << _WORKER_BITS:
+            raise ValueError(f"Worker id must be below {1 << _WORKER_BITS}")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = max(self._now_ms(), self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << _SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    # Sequence exhausted within this millisecond
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (
+                (now - SNOWFLAKE_EPOCH_MS) << (_WORKER_BITS + _SEQUENCE_BITS)
+                | self.worker_id << _SEQUENCE_BITS
+                | self._sequence
+            )
+
+    @staticmethod
+    def _now_ms() -> int:
+        return time.time_ns() // 1_000_000
+
+
+class ShardRouter:
+    """Routes users statements to the user shards, everything else to the
+    default database."""
+
+    def __init__(
+        self,
+        default: Engine,
+        shards: Dict[str, Engine],
+        vnodes: int = settings.USER_SHARD_VNODES,
+    ) -> None:
+        if DEFAULT_SHARD in shards:
+            raise ValueError(f"{DEFAULT_SHARD!r} is reserved for the default database")
+        self.default = default
+        self.shards = dict(shards)
+        self.ring = HashRing(sorted(self.shards), vnodes)
+
+    def shard_for_user(self, user_id: int) -> str:
+        return self.ring.shard_for(user_id)
+
+    def sessionmaker(self, **kw: Any) -> sessionmaker:
+        return sessionmaker(
+            class_=ShardedSession,
+            shards={DEFAULT_SHARD: self.default, **self.shards},
+            shard_chooser=self._shard_chooser,
+            identity_chooser=self._identity_chooser,
+            execute_chooser=self._execute_chooser,
+            **kw,
+        )
+
+    def _shard_chooser(self, mapper, instance, clause=None) -> str:
+        if mapper is None or mapper.local_table.name not in SHARDED_TABLES:
+            return DEFAULT_SHARD
+        if instance is None or instance.id is None:
+            raise ValueError("Sharded rows need their id before they are flushed")
+        return self.shard_for_user(instance.id)
+
+    def _identity_chooser(self, mapper, primary_key, **kw: Any) -> List[str]:
+        if mapper.local_table.name not in SHARDED_TABLES:
+            return [DEFAULT_SHARD]
+        return [self.shard_for_user(primary_key[0])]
+
+    def _execute_chooser(self, context: ORMExecuteState) -> List[str]:
+        mapper = context.bind_mapper
+        if mapper is None or mapper.local_table.name not in SHARDED_TABLES:
+            return [DEFAULT_SHARD]
+        params = context.parameters if isinstance(context.parameters, dict) else None
+        ids = restricted_ids(context.statement, params)
+        if ids is None:
+            return sorted(self.shards)
+        return sorted({self.shard_for_user(user_id) for user_id in ids})
+
+
+def restricted_ids(
+    statement: Any, params: Optional[Dict[str, Any]] = None
+) -> Optional[Set[int]]:
+    """Ids a statement over a sharded table is restricted to by top-level
+    ``id == x`` or ``id IN (...)`` criteria, or None if it is not. Values of
+    ``bindparam``s come from ``params``, the parameters of the execution."""
+    whereclause = getattr(statement, "whereclause", None)
+    if whereclause is None:
+        return None
+    if (
+        isinstance(whereclause, BooleanClauseList)
+        and whereclause.operator is operators.and_
+    ):
+        clauses = whereclause.clauses
+    else:
+        clauses = [whereclause]
+    ids: Optional[Set[int]] = None
+    for clause in clauses:
+        if not (
+            isinstance(clause, BinaryExpression)
+            and _is_sharded_id(clause.left)
+            and isinstance(clause.right, BindParameter)
+        ):
+            continue
+        bind = clause.right
+        if params and bind.key in params:
+            value = params[bind.key]
+        elif bind.value is None and bind.callable is None:
+            # A bindparam given no value at this execution
+            continue
+        else:
+            value = bind.effective_value
+        if clause.operator is operators.eq:
+            found = {value}
+        elif clause.operator is operators.in_op:
+            found = set(value)
+        else:
+            continue
+        ids = found if ids is None else ids & found
+    return ids
+
+
+def _is_sharded_id(column: ColumnElement) -> bool:
+    table = getattr(column, "table", None)
+    return (
+        getattr(column, "key", None) == "id"
+        and table is not None
+        and getattr(table, "name", None) in SHARDED_TABLES
+    )
+
+
+def is_sharded(db: Session) -> bool:
+    return isinstance(db, ShardedSession)
+
+
+def merge_sorted(
+    rows: Iterable[Any],
+    sort: Sequence[str],
+    value: Callable[[Any, str], Any] = getattr,
+) -> List[Any]:
+    """Order rows gathered from several shards by ``sort`` keys, each a
+    field name prefixed with ``-`` for descending order.
+
+    Strings compare by code point, like the C collation; shards should use
+    it for their sort columns so pages line up with keyset cursors.
+    """
+    rows = list(rows)
+    # Stable sorts from the last key to the first give the combined order
+    for key in reversed(sort):
+        field = key.lstrip("-")
+        rows.sort(key=lambda row: value(row, field), reverse=key.startswith("-"))
+    return rows
+
+
+def build_router(
+    default: Engine, urls: Dict[str, str], **engine_kw: Any
+) -> ShardRouter:
+    engines = {
+        shard: create_engine(url, pool_pre_ping=True, **engine_kw)
+        for shard, url in urls.items()
+    }
+    return ShardRouter(default, engines)
+
+
+ids = SnowflakeGenerator(settings.SNOWFLAKE_WORKER_ID)
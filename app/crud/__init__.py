@@ -2,6 +2,7 @@ from app.crud.crud_user import (  # noqa: F401
     get,
     get_by_email,
     get_multi,
+    get_multi_fields,
     create,
     update,
     remove,
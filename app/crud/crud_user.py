@@ -1,28 +1,276 @@
-from typing import Any, Dict, Optional, Union
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+from sqlalchemy import Select, and_, bindparam, delete, func, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.core import deadline, outbox, sharding
+from app.core.changefeed import notifier
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.crud import crud_user_change, token_versions, user_cache
+from app.exceptions import EmailAlreadyRegisteredError, UserVersionConflictError
+from app.models.user import User, UserEmail
+from app.models.user_change import DELETE, INSERT, UPDATE
+from app.schemas.user import USER_RECORD_FIELDS, UserCreate, UserRecord, UserUpdate
+
+# Changes to these fields invalidate the user's previously issued tokens
+TOKEN_SENSITIVE_FIELDS = ("is_active", "is_superuser", "hashed_password")
+
+# Columns that list queries may select and sort by; sorting is limited to
+# columns backed by an index
+PROJECTABLE_FIELDS = ("id", "name", "surname", "email", "is_active", "is_superuser")
+SORTABLE_FIELDS = ("id", "email", "name")
+
+
+# Soft-deleted users are invisible to every read
+NOT_DELETED = User.deleted_at.is_(None)
+
+
+# Hot lookups are built once with bound parameters, so every call reuses
+# their SQL compiled in the engine's cache instead of building a new query
+GET_BY_ID = select(User).where(User.id == bindparam("id"), NOT_DELETED).limit(1)
+GET_BY_EMAIL = (
+    select(User)
+    .where(func.lower(User.email) == bindparam("email"), NOT_DELETED)
+    .limit(1)
+)
 
 
 def get(db: Session, id: int) -> Optional[User]:
-    return db.query(User).filter(User.id == id).first()
+    return db.scalars(GET_BY_ID, {"id": id}).first()
 
 
 def get_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(GET_BY_EMAIL, {"email": email.lower()}).first()
+
+
+def get_token_version(db: Session, id: int) -> Optional[int]:
+    """Token version of a user, or None if there is no such user."""
+    row = db.execute(
+        select(User.token_version).where(User.id == id, NOT_DELETED)
+    ).first()
+    return None if row is None else row[0] or 0
 
 
 def get_multi(
-    db: Session, *, skip: int = 0, limit: int = 100
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Sequence[str] = ("id",),
+    **filters: Any,
 ) -> list[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+    stmt = build_list_query(select(User), sort=sort, **filters)
+    return _fetch_page(db, stmt, skip=skip, limit=limit, sort=sort, scalars=True)
+
+
+def get_record(db: Session, id: int) -> Optional[UserRecord]:
+    columns = [getattr(User, field) for field in USER_RECORD_FIELDS]
+    row = db.execute(select(*columns).where(User.id == id, NOT_DELETED)).first()
+    return UserRecord(*row) if row is not None else None
+
+
+def get_versioned_record(
+    db: Session, id: int
+) -> Optional[Tuple[UserRecord, int, Optional[datetime]]]:
+    """The user's UserRecord, row version and last modification time."""
+    columns = [getattr(User, field) for field in USER_RECORD_FIELDS]
+    row = db.execute(
+        select(*columns, User.version, User.updated_at).where(
+            User.id == id, NOT_DELETED
+        )
+    ).first()
+    return (UserRecord(*row[:-2]), *row[-2:]) if row is not None else None
+
+
+def get_multi_records(
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Sequence[str] = ("id",),
+    **filters: Any,
+) -> List[UserRecord]:
+    """List users as trusted records, skipping the ORM identity map."""
+    columns = [getattr(User, field) for field in USER_RECORD_FIELDS]
+    stmt = build_list_query(select(*columns), sort=sort, **filters)
+    rows = _fetch_page(db, stmt, skip=skip, limit=limit, sort=sort)
+    return [UserRecord(*row) for row in rows]
+
+
+def get_multi_fields(
+    db: Session,
+    *,
+    fields: Sequence[str],
+    skip: int = 0,
+    limit: int = 100,
+    sort: Sequence[str] = ("id",),
+    **filters: Any,
+) -> List[Dict[str, Any]]:
+    """List users selecting only the requested columns."""
+    unknown = set(fields) - set(PROJECTABLE_FIELDS)
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown)) or '(none)'}")
+    columns = [getattr(User, field) for field in fields]
+    if sharding.is_sharded(db):
+        # Shards are merged on the sort columns, so they are selected too
+        columns += [
+            getattr(User, key.lstrip("-"))
+            for key in sort_keys(sort)
+            if key.lstrip("-") not in fields
+        ]
+    stmt = build_list_query(select(*columns), sort=sort, **filters)
+    rows = _fetch_page(db, stmt, skip=skip, limit=limit, sort=sort)
+    return [{field: getattr(row, field) for field in fields} for row in rows]
+
+
+def _fetch_page(
+    db: Session,
+    stmt: Select,
+    *,
+    skip: int,
+    limit: int,
+    sort: Sequence[str],
+    scalars: bool = False,
+) -> list:
+    """Run a list query, gathering the page from every shard if ``db`` is a
+    sharded session."""
+    if not sharding.is_sharded(db):
+        result = db.execute(stmt.offset(skip).limit(limit))
+        return list(result.scalars() if scalars else result)
+    # Each shard returns its first skip + limit rows: the page is cut from
+    # their merge. Prefer keyset pagination (``after``) to deep offsets.
+    result = db.execute(stmt.limit(skip + limit))
+    rows = sharding.merge_sorted(
+        result.scalars() if scalars else result, sort_keys(sort)
+    )
+    return rows[skip:][:limit]
+
+
+def sort_keys(sort: Sequence[str]) -> List[str]:
+    """The sort keys a list query orders by: ``sort`` and the id tie-break.
+
+    Raises:
+        ValueError: If a sort key is not one of SORTABLE_FIELDS
+    """
+    for key in sort:
+        if key.lstrip("-") not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {key.lstrip('-')!r}")
+    keys = list(sort)
+    if not any(key.lstrip("-") == "id" for key in sort):
+        # Tie-break on the primary key for stable pagination, in the same
+        # direction as the last key so one index scan covers the ordering
+        descending = bool(sort) and sort[-1].startswith("-")
+        keys.append("-id" if descending else "id")
+    return keys
+
+
+def build_list_query(
+    stmt: Select,
+    *,
+    sort: Sequence[str] = ("id",),
+    email_prefix: Optional[str] = None,
+    name: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_superuser: Optional[bool] = None,
+    after: Optional[Sequence[Any]] = None,
+) -> Select:
+    """Apply list filters and ordering to a select over the users table.
+
+    Sort keys are column names, prefixed with ``-`` for descending order.
+    ``after`` holds the values of ``sort_keys(sort)`` of the last row of the
+    previous page, to continue after it (keyset pagination).
+
+    Raises:
+        ValueError: If a sort key is not one of SORTABLE_FIELDS
+    """
+    keys = sort_keys(sort)
+    stmt = stmt.where(NOT_DELETED)
+    if email_prefix:
+        # The range lets a plain btree index on email serve the prefix match
+        # regardless of LIKE collation rules; startswith keeps it exact
+        upper = email_prefix[:-1] + chr(ord(email_prefix[-1]) + 1)
+        stmt = stmt.where(
+            User.email >= email_prefix,
+            User.email < upper,
+            User.email.startswith(email_prefix, autoescape=True),
+        )
+    if name is not None:
+        stmt = stmt.where(User.name == name)
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    if is_superuser is not None:
+        stmt = stmt.where(User.is_superuser == is_superuser)
+
+    if after is not None:
+        if len(after) != len(keys):
+            raise ValueError(f"Cursor needs {len(keys)} values, got {len(after)}")
+        stmt = stmt.where(_after(keys, after))
+
+    order_by = []
+    for key in keys:
+        column = getattr(User, key.lstrip("-"))
+        order_by.append(column.desc() if key.startswith("-") else column.asc())
+    return stmt.order_by(*order_by)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque keyset cursor for the ``after`` of build_list_query."""
+    payload = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Raises:
+        ValueError: If ``cursor`` was not made by encode_cursor
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or not all(
+        isinstance(value, (int, str)) for value in values
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _after(keys: Sequence[str], values: Sequence[Any]):
+    """Rows ordered after ``values`` by ``keys``: (k1 > v1) OR (k1 = v1 AND
+    k2 > v2) OR ..., with < for descending keys."""
+    clauses = []
+    for n, key in enumerate(keys):
+        column = getattr(User, key.lstrip("-"))
+        beyond = column < values[n] if key.startswith("-") else column > values[n]
+        equal = [
+            getattr(User, prior.lstrip("-")) == values[m]
+            for m, prior in enumerate(keys[:n])
+        ]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
 
 
 def create(db: Session, *, obj_in: UserCreate) -> User:
+    # A deleted user awaiting purge still holds the unique email
+    db.execute(
+        delete(User).where(
+            func.lower(User.email) == obj_in.email.lower(),
+            User.deleted_at.is_not(None),
+        )
+    )
+    # Hashing the password is the slowest step, skip it for abandoned requests
+    deadline.check()
     db_obj = User(
+        # A sharded user needs its id up front to be routed to its shard
+        id=sharding.ids.next_id() if sharding.is_sharded(db) else None,
         email=obj_in.email,
         hashed_password=get_password_hash(obj_in.password),
         name=obj_in.name,
@@ -31,8 +279,26 @@ def create(db: Session, *, obj_in: UserCreate) -> User:
         is_active=True,
     )
     db.add(db_obj)
+    try:
+        # Assigns the id; the message commits or rolls back with the user
+        db.flush()
+        # Shards only see their own users: claim the email on the default
+        # database, waiting for a concurrent claim and failing if it won
+        db.add(UserEmail(email=db_obj.email.lower(), user_id=db_obj.id))
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise EmailAlreadyRegisteredError() from None
+    outbox.enqueue(
+        db,
+        outbox.USER_CREATED,
+        {"user_id": db_obj.id, "email": db_obj.email, "name": db_obj.name},
+    )
+    crud_user_change.record(db, INSERT, db_obj)
     db.commit()
     db.refresh(db_obj)
+    user_cache.store(db_obj)
+    notifier.notify()
     return db_obj
 
 
@@ -47,29 +313,106 @@ def update(
     else:
         update_data = obj_in.dict(exclude_unset=True)
     if update_data.get("password"):
+        deadline.check()
         hashed_password = get_password_hash(update_data["password"])
         del update_data["password"]
         update_data["hashed_password"] = hashed_password
+    if any(
+        field in update_data and getattr(db_obj, field) != update_data[field]
+        for field in TOKEN_SENSITIVE_FIELDS
+    ):
+        update_data["token_version"] = (db_obj.token_version or 0) + 1
+    if update_data.get("email") and update_data["email"] != db_obj.email:
+        _move_email(db, db_obj, update_data["email"])
     for field in update_data:
         setattr(db_obj, field, update_data[field])
     db.add(db_obj)
-    db.commit()
+    _commit_versioned(db, UPDATE, db_obj)
     db.refresh(db_obj)
+    if "token_version" in update_data:
+        token_versions.store(db_obj.id, db_obj.token_version)
+    user_cache.store(db_obj)
+    notifier.notify()
     return db_obj
 
 
 def remove(db: Session, *, id: int) -> Optional[User]:
-    obj = db.query(User).get(id)
-    if obj:
+    """Delete a user, returning it, or None if there is no such user.
+
+    With USER_SOFT_DELETE the row is only tombstoned, which touches one row
+    instead of taking the locks of a delete; purge_deleted removes it later.
+    """
+    obj = get(db, id=id)
+    if obj is None:
+        return None
+    if settings.USER_SOFT_DELETE:
+        obj.deleted_at = datetime.utcnow()
+        # Revokes the tokens issued to the user
+        obj.token_version = (obj.token_version or 0) + 1
+    else:
         db.delete(obj)
-        db.commit()
+    # A soft-deleted user's email is free again, see create
+    db.execute(delete(UserEmail).where(UserEmail.email == obj.email.lower()))
+    _commit_versioned(db, DELETE, obj)
+    if settings.USER_SOFT_DELETE:
+        token_versions.store(id, obj.token_version)
+    else:
+        token_versions.invalidate(id)
+    user_cache.invalidate(id)
+    notifier.notify()
     return obj
 
 
+def _move_email(db: Session, user: User, email: str) -> None:
+    db.execute(delete(UserEmail).where(UserEmail.email == user.email.lower()))
+    db.add(UserEmail(email=email.lower(), user_id=user.id))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise EmailAlreadyRegisteredError() from None
+
+
+def _commit_versioned(db: Session, operation: str, user: User) -> None:
+    """Log and commit a write to a user; the flush only matches the row
+    version read.
+
+    Raises:
+        UserVersionConflictError: If another transaction changed the user
+    """
+    user_id = user.id
+    try:
+        # The change is numbered after the user row is written and locked
+        db.flush()
+        crud_user_change.record(db, operation, user)
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise UserVersionConflictError(user_id) from None
+
+
+def purge_deleted(db: Session, *, deleted_before: datetime, batch_size: int) -> int:
+    """Hard-delete up to ``batch_size`` users soft-deleted before
+    ``deleted_before`` and return how many were deleted."""
+    ids = list(
+        db.scalars(
+            select(User.id)
+            .where(User.deleted_at < deleted_before)
+            .order_by(User.deleted_at)
+            .limit(batch_size)
+        )
+    )
+    if ids:
+        db.execute(delete(User).where(User.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
 def authenticate(db: Session, *, email: str, password: str) -> Optional[User]:
     user = get_by_email(db=db, email=email)
     if not user:
         return None
+    deadline.check()
     if not verify_password(password, user.hashed_password):
         return None
-    return user 
\ No newline at end of file
+    return user
@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.user_change import DELETE, UserChange, UserChangeSequence
+from app.schemas.user import UserRecord, dump_record
+
+
+def record(db: Session, operation: str, user: User) -> UserChange:
+    """Log a change to ``user`` in the current transaction of ``db``.
+
+    Changes are serialized from here until the transaction ends; record
+    them last, just before committing.
+    """
+    change = UserChange(
+        seq=next_seq(db),
+        user_id=user.id,
+        operation=operation,
+        data=(
+            None
+            if operation == DELETE
+            else dump_record(UserRecord.from_user(user)).decode()
+        ),
+    )
+    db.add(change)
+    return change
+
+
+def next_seq(db: Session) -> int:
+    """Take the next sequence number, locking the counter until the current
+    transaction of ``db`` ends."""
+    stmt = (
+        update(UserChangeSequence)
+        .values(value=UserChangeSequence.value + 1)
+        .returning(UserChangeSequence.value)
+    )
+    return db.execute(stmt).scalar_one()
+
+
+def get_since(db: Session, seq: int, limit: int = 100) -> List[UserChange]:
+    """Changes after ``seq``, oldest first."""
+    stmt = (
+        select(UserChange)
+        .where(UserChange.seq > seq)
+        .order_by(UserChange.seq)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
+
+
+def last_seq(db: Session) -> Optional[int]:
+    return db.scalar(select(func.max(UserChange.seq)))
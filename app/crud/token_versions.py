@@ -0,0 +1,76 @@
+"""
+token_versions.py
+
+Latest token version of each user, checked by claim-only authorisation
+(deps.get_current_claims) so that tokens issued before a privilege change,
+a deactivation, a deletion or a forced logout are rejected without loading
+the user on every request.
+
+Versions are cached per worker, at most TOKEN_VERSION_CACHE_MAX_ENTRIES for
+TOKEN_VERSION_CACHE_TTL_SECONDS, and read from the database on a miss, so
+users a worker has not seen or has evicted are checked, not trusted.
+crud_user writes through: ``store`` caches a bumped version and
+``invalidate`` drops a deleted user, and both publish the key on the
+invalidation bus (USER_CACHE_BUS) so other workers reload it.
+"""
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, build_bus
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logger import logger
+
+cache: "TTLCache[int]" = TTLCache(
+    settings.TOKEN_VERSION_CACHE_MAX_ENTRIES, settings.TOKEN_VERSION_CACHE_TTL_SECONDS
+)
+bus = build_bus(settings.USER_CACHE_BUS, engine, channel="token_versions")
+bus.subscribe(cache.invalidate)
+
+
+def cache_key(user_id: int) -> str:
+    return f"token_version:{user_id}"
+
+
+def is_current(db: Session, user_id: int, version: Optional[int]) -> bool:
+    """Check a token version against the latest one of the user; tokens of
+    users that no longer exist are not current."""
+    # Imported here: crud_user writes through this module
+    from app.crud import crud_user
+
+    key = cache_key(user_id)
+    latest = cache.get(key)
+    if latest is None:
+        latest = crud_user.get_token_version(db, user_id)
+        if latest is None:
+            return False
+        cache.set(key, latest)
+    return (version or 0) >= latest
+
+
+def record(user_id: int, version: Optional[int]) -> None:
+    """Cache the token version a user was just read with."""
+    cache.set(cache_key(user_id), version or 0)
+
+
+def store(user_id: int, version: Optional[int]) -> None:
+    """Cache a bumped token version and have other workers reload it."""
+    key = cache_key(user_id)
+    cache.set(key, version or 0)
+    _publish(key)
+
+
+def invalidate(user_id: int) -> None:
+    key = cache_key(user_id)
+    cache.delete(key)
+    _publish(key)
+
+
+def _publish(key: str) -> None:
+    try:
+        bus.publish(key)
+    except Exception:
+        # The write is committed; peers fall back to the TTL
+        logger.exception(f"Failed to publish invalidation of {key}")
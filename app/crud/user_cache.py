@@ -0,0 +1,121 @@
+"""
+user_cache.py
+
+Cache of serialized UserResponse bodies served by GET /users/{user_id}.
+crud_user writes through it: ``create`` and ``update`` store the new body
+and ``remove`` drops it, and each publishes the key on the invalidation bus
+so other workers drop their copies.
+
+Entries are the response JSON itself, built from trusted UserRecords, and
+its validators: about 150 bytes per user against over a kilobyte for a
+UserResponse instance (see benchmarks/bench_user_serialization.py), and
+nothing to serialize on a hit.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, build_bus
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logger import logger
+from app.core.metrics import registry
+from app.models.user import User
+from app.schemas.user import UserRecord, dump_record
+from app.utils.etag import user_etag, validator_headers
+
+
+cache: "TTLCache[CachedUser]" = TTLCache(
+    settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS
+)
+bus = build_bus(settings.USER_CACHE_BUS, engine, channel="user_cache")
+bus.subscribe(cache.invalidate)
+
+registry.gauge("user_cache_hits", "User cache hits", lambda: cache.hits)
+registry.gauge("user_cache_misses", "User cache misses", lambda: cache.misses)
+registry.gauge("user_cache_entries", "Users in the cache", lambda: len(cache))
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    """A GET /users/{user_id} response body and its validators."""
+
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(serialize(user), user_etag(user.id, user.version), user.updated_at)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return validator_headers(self.etag, self.last_modified)
+
+
+def cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def serialize(user: User) -> bytes:
+    return dump_record(UserRecord.from_user(user))
+
+
+async def get_response(
+    session_factory: Callable[[], Session], user_id: int
+) -> Optional[CachedUser]:
+    """Serialized UserResponse of a user, or None if it does not exist."""
+
+    async def load() -> Optional[CachedUser]:
+        # Off the event loop, so requests for other users are not stalled
+        return await asyncio.to_thread(_load, session_factory, user_id)
+
+    if not settings.USER_CACHE_ENABLED:
+        return await load()
+    return await cache.get_or_load(cache_key(user_id), load)
+
+
+def _load(
+    session_factory: Callable[[], Session], user_id: int
+) -> Optional[CachedUser]:
+    # Imported here: crud_user writes through this module
+    from app.crud import crud_user
+
+    # A session of its own: the load is shared by every request waiting for
+    # the user and outlives the first one if it is cancelled
+    with session_factory() as db:
+        row = crud_user.get_versioned_record(db, user_id)
+    if row is None:
+        return None
+    record, version, updated_at = row
+    return CachedUser(dump_record(record), user_etag(user_id, version), updated_at)
+
+
+def store(user: User) -> None:
+    """Write a created or updated user through to the cache."""
+    if not settings.USER_CACHE_ENABLED:
+        return
+    key = cache_key(user.id)
+    cache.delete(key)
+    cache.set(key, CachedUser.from_user(user))
+    _publish(key)
+
+
+def invalidate(user_id: int) -> None:
+    if not settings.USER_CACHE_ENABLED:
+        return
+    key = cache_key(user_id)
+    cache.delete(key)
+    _publish(key)
+
+
+def _publish(key: str) -> None:
+    try:
+        bus.publish(key)
+    except Exception:
+        # The write is committed; peers fall back to the TTL
+        logger.exception(f"Failed to publish invalidation of {key}")
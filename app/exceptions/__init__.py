@@ -1,3 +1,9 @@
 from app.exceptions.custom_exceptions import (UserDatabaseError, UserError,
                                               UserNotFoundError, InvalidRangeError,
-                                              SumExceedsLimitError)
+                                              SumExceedsLimitError,
+                                              IdempotencyKeyConflictError,
+                                              IdempotencyKeyInProgressError,
+                                              UserVersionConflictError,
+                                              EmailAlreadyRegisteredError,
+                                              PreconditionFailedError,
+                                              DeadlineExceededError)
@@ -31,6 +31,67 @@ class UserDatabaseError(HTTPException):
         )
 
 
+class IdempotencyKeyConflictError(HTTPException):
+    """Exception raised when an idempotency key is reused with another payload."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request.",
+        )
+
+
+class IdempotencyKeyInProgressError(HTTPException):
+    """Exception raised when a request with the same key is still running."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress.",
+        )
+
+
+class UserVersionConflictError(HTTPException):
+    """Exception raised when a user was changed by another request meanwhile."""
+
+    def __init__(self, user_id: int):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"User with ID {user_id} was modified concurrently, retry.",
+        )
+        self.user_id = user_id
+
+
+class EmailAlreadyRegisteredError(HTTPException):
+    """Exception raised when another user already has the email."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
+
+
+class PreconditionFailedError(HTTPException):
+    """Exception raised when an If-Match header does not match the resource."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="The resource does not match the If-Match header.",
+        )
+
+
+class DeadlineExceededError(HTTPException):
+    """Exception raised when a request runs past its deadline."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The request did not complete before its deadline.",
+        )
+
+
 class InvalidRangeError(Exception):
     def __init__(self, start, end):
         self.start = start
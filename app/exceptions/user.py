@@ -24,6 +24,15 @@ class UserValidationError(UserError):
         self.field = field
 
 
+class UserBatchValidationError(UserError):
+    """Exception listing every invalid record of a batch."""
+
+    def __init__(self, errors: list):
+        super().__init__(f"{len(errors)} validation errors in batch")
+        # (record index, field, message) tuples
+        self.errors = errors
+
+
 class UserAlreadyExistsError(UserError):
     """Exception raised when attempting to create a duplicate user."""
 
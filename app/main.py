@@ -4,12 +4,15 @@ from fastapi.responses import JSONResponse
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.lifespan import lifespan
+from app.core.profiling import ProfilingMiddleware
 from app.exceptions import UserDatabaseError, UserNotFoundError
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description=settings.DESCRIPTION,
+    lifespan=lifespan,
 )
 
 
@@ -30,6 +33,9 @@ async def user_database_exception_handler(request: Request, exc: UserDatabaseErr
     )
 
 
+# Set up profiling middleware first so it wraps the endpoint directly
+app.add_middleware(ProfilingMiddleware)
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
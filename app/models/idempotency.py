@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    # NULL while the first request is still executing
+    status_code = Column(Integer, nullable=True)
+    body = Column(Text, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Token of the claim executing the request; fences out claims that lost
+    # their lease
+    owner = Column(String(32), nullable=True)
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from app.core.database import Base
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # Serves the worker's "next pending messages that are due" query
+        Index("ix_outbox_messages_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(100), nullable=False)
+    # JSON document handed to the topic's handler
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not delivered before this time: retry backoff, or a worker's lease
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
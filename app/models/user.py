@@ -1,15 +1,98 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    func,
+    text,
+)
 
 from app.core.database import Base
 
+# Predicate of the partial indexes serving live users only
+NOT_DELETED = text("deleted_at IS NULL")
+
+# Wide enough for the snowflake ids of sharded users (see app.core.sharding);
+# SQLite only autoincrements an INTEGER primary key
+UserId = BigInteger().with_variant(Integer, "sqlite")
+
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Serve the filters and orderings offered by GET /users, which
+        # never lists deleted users
+        Index(
+            "ix_users_active_superuser_id",
+            "is_active",
+            "is_superuser",
+            "id",
+            postgresql_where=NOT_DELETED,
+            sqlite_where=NOT_DELETED,
+        ),
+        Index(
+            "ix_users_name_id",
+            "name",
+            "id",
+            postgresql_where=NOT_DELETED,
+            sqlite_where=NOT_DELETED,
+        ),
+        # Finds the tombstones due for purging
+        Index(
+            "ix_users_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    id = Column(UserId, primary_key=True)
+    email = Column(String, unique=True, nullable=False)
     name = Column(String, nullable=False)
     surname = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # Bumped whenever privileges change to invalidate previously issued tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set by a soft delete; the row is hard-deleted later by app.core.purge
+    deleted_at = Column(DateTime, nullable=True)
+    # Backs the Last-Modified header of user responses
+    updated_at = Column(
+        DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # Row version: every ORM update and delete is conditional on it, so
+    # concurrent writers cannot silently overwrite each other
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Case-insensitive email lookups, see crud_user.get_by_email; unique, so
+# emails differing only in case cannot both belong to live users
+Index(
+    "ix_users_email_lower",
+    func.lower(User.email),
+    unique=True,
+    postgresql_where=NOT_DELETED,
+    sqlite_where=NOT_DELETED,
+)
+
+
+class UserEmail(Base):
+    """Owner of each live user's lowercased email.
+
+    Kept on the default database when users are sharded (see
+    app.core.sharding), where each shard's unique index only covers its own
+    users: claiming the email here makes it unique across every shard.
+    """
+
+    __tablename__ = "user_emails"
+
+    email = Column(String, primary_key=True)
+    user_id = Column(UserId, nullable=False)
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, Column, DateTime, Integer, String, Text, event
+
+from app.core.database import Base
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+
+class UserChange(Base):
+    """Append-only log of writes to the users table."""
+
+    __tablename__ = "user_changes"
+
+    # Increases with every change in commit order (see UserChangeSequence);
+    # consumers resume after the last one seen
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(BigInteger, nullable=False)
+    operation = Column(String(10), nullable=False)
+    # The user as UserResponse JSON after the change, NULL for deletes
+    data = Column(Text, nullable=True)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class UserChangeSequence(Base):
+    """Single-row counter numbering the changes.
+
+    A writer takes the next number by updating the row, which stays locked
+    until its transaction ends, so changes are numbered in commit order: a
+    reader that sees a change has seen every change numbered before it.
+    """
+
+    __tablename__ = "user_change_sequence"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    value = Column(Integer, nullable=False)
+
+
+event.listen(
+    UserChangeSequence.__table__,
+    "after_create",
+    DDL("INSERT INTO user_change_sequence (id, value) VALUES (1, 0)"),
+)
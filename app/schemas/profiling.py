@@ -0,0 +1,28 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+
+class ProfilingStart(BaseModel):
+    # "window" profiles every matching request, "sample" one in every_n
+    mode: Literal["window", "sample"] = "window"
+    seconds: float = Field(30, gt=0, le=settings.PROFILER_MAX_SECONDS)
+    every_n: int = Field(1, ge=1)
+    # Route path templates, e.g. "/api/v1/users/{user_id}"; empty for all
+    routes: List[str] = []
+    interval_ms: float = Field(5, ge=1, le=1000)
+
+
+class ProfilingStatus(BaseModel):
+    active: bool
+    mode: Optional[str] = None
+    routes: List[str] = []
+    every_n: int
+    interval_ms: float
+    remaining_seconds: float
+    seen: int
+    profiled: int
+    samples: int
+    dropped: int
@@ -3,7 +3,7 @@ from typing import Any
 from pydantic import (BaseModel, ConfigDict, EmailStr, field_validator,
                       model_validator)
 
-from app.core.config import settings
+from app.utils import validation
 
 
 class UserBase(BaseModel):
@@ -37,12 +37,7 @@ class UserBase(BaseModel):
         Raises:
             ValueError: If name is too short or contains non-letters
         """
-        cleaned_value = value.strip()
-        if len(cleaned_value) < 2:
-            raise ValueError(f"{field.name} must be at least 2 characters long")
-        if not cleaned_value.isalpha():
-            raise ValueError(f"{field.name} must contain only letters")
-        return cleaned_value.title()
+        return validation.clean_name(value, field.field_name.capitalize())
 
     @field_validator("email")
     @classmethod
@@ -58,11 +53,7 @@ class UserBase(BaseModel):
         Raises:
             ValueError: If email domain is not in allowed list
         """
-        if not value.endswith(settings.ALLOWED_EMAIL_DOMAIN):
-            raise ValueError(
-                f"Email must end with {settings.ALLOWED_EMAIL_DOMAIN}, got {value}"
-            )
-        return value
+        return validation.check_email_domain(value)
 
 
 class UserCreate(UserBase):
@@ -104,12 +95,7 @@ class UserCreate(UserBase):
         Raises:
             ValueError: If password is too short
         """
-        if len(value) < settings.PASSWORD_MIN_LENGTH:
-            raise ValueError(
-                "Password must be at least "
-                f"{settings.PASSWORD_MIN_LENGTH} characters long"
-            )
-        return value
+        return validation.check_password(value)
 
 
 class User(UserBase):
@@ -6,8 +6,20 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenPayload(BaseModel):
     sub: int | None = None
     exp: Optional[int] = None
+    jti: Optional[str] = None
+    typ: Optional[str] = None
+    # Authorization claims, see app.core.security.user_claims
+    cv: Optional[int] = None
+    act: Optional[bool] = None
+    adm: Optional[bool] = None
+    tv: Optional[int] = None
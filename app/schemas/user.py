@@ -1,9 +1,10 @@
-from typing import Optional
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
 
-from pydantic import (BaseModel, ConfigDict, EmailStr, field_validator,
-                      model_validator)
+from pydantic import (BaseModel, ConfigDict, EmailStr, TypeAdapter,
+                      field_validator, model_validator)
 
-from app.core.config import settings
+from app.utils import validation
 
 
 class UserBase(BaseModel):
@@ -38,12 +39,7 @@ class UserBase(BaseModel):
         Raises:
             ValueError: If name is too short or contains non-letters
         """
-        cleaned_value = value.strip()
-        if len(cleaned_value) < 2:
-            raise ValueError("Name must be at least 2 characters long")
-        if not cleaned_value.isalpha():
-            raise ValueError("Name must contain only letters")
-        return cleaned_value.title()
+        return validation.clean_name(value)
 
     @field_validator("email")
     @classmethod
@@ -59,11 +55,7 @@ class UserBase(BaseModel):
         Raises:
             ValueError: If email domain is not in allowed list
         """
-        if not value.endswith(settings.ALLOWED_EMAIL_DOMAIN):
-            raise ValueError(
-                f"Email must end with {settings.ALLOWED_EMAIL_DOMAIN}, got {value}"
-            )
-        return value
+        return validation.check_email_domain(value)
 
 
 class UserCreate(UserBase):
@@ -105,12 +97,7 @@ class UserCreate(UserBase):
         Raises:
             ValueError: If password is too short
         """
-        if len(value) < settings.PASSWORD_MIN_LENGTH:
-            raise ValueError(
-                "Password must be at least "
-                f"{settings.PASSWORD_MIN_LENGTH} characters long"
-            )
-        return value
+        return validation.check_password(value)
 
 
 class UserUpdate(UserBase):
@@ -207,3 +194,50 @@ class UserResponse(UserBase):
         if self.name.lower() == self.surname.lower():
             raise ValueError("Name and surname must not be the same")
         return self
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """Trusted read-only user, built from a database row.
+
+    Rows were validated by UserCreate or UserUpdate before being written, so
+    read paths serialize records directly instead of re-running the
+    UserResponse validators for every row. Serializes to the same JSON as
+    UserResponse, so fields are declared in the same order.
+
+    Attributes:
+        name: User's first name
+        surname: User's surname
+        email: User's email address
+        is_active: Whether the user account is active
+        id: Unique identifier for the user
+        is_superuser: Whether the user has admin privileges
+    """
+
+    name: str
+    surname: str
+    email: str
+    is_active: bool
+    id: int
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserRecord":
+        """Build a record from a User model instance."""
+        return cls(*(getattr(user, field) for field in USER_RECORD_FIELDS))
+
+
+USER_RECORD_FIELDS = ("name", "surname", "email", "is_active", "id", "is_superuser")
+
+_user_record_adapter = TypeAdapter(UserRecord)
+_user_records_adapter = TypeAdapter(List[UserRecord])
+
+
+def dump_record(record: UserRecord) -> bytes:
+    """Serialize a record as UserResponse JSON without validating it."""
+    return _user_record_adapter.dump_json(record)
+
+
+def dump_records(records: Sequence[UserRecord]) -> bytes:
+    """Serialize records as a JSON list of UserResponse without validating."""
+    return _user_records_adapter.dump_json(list(records))
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class UserChangeResponse(BaseModel):
+    seq: int
+    user_id: int
+    operation: Literal["insert", "update", "delete"]
+    # The user after the change, null for deletes
+    data: Optional[Dict[str, Any]] = None
+    changed_at: datetime
+
+
+class UserChangePage(BaseModel):
+    changes: List[UserChangeResponse]
+    # Pass as ``since`` to get the following changes
+    last_seq: int
@@ -1,14 +1,12 @@
-import re
-
-from exceptions.base import AppError
-from exceptions.database import DatabaseError
-from exceptions.user import UserAlreadyExistsError, UserValidationError
-from logger import logger
-from models.user import User
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-EMAIL_PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+from app.core.logger import logger
+from app.exceptions.base import AppError
+from app.exceptions.database import DatabaseError
+from app.exceptions.user import UserAlreadyExistsError, UserValidationError
+from app.models.user import User
+from app.utils.validation import check_email
 
 
 def _validate_user_data(name: str, surname: str, email: str) -> None:
@@ -27,8 +25,10 @@ def _validate_user_data(name: str, surname: str, email: str) -> None:
         raise UserValidationError("name", "Must contain only letters")
     if not surname or not surname.isalpha():
         raise UserValidationError("surname", "Must contain only letters")
-    if not email or not re.match(EMAIL_PATTERN, email):
-        raise UserValidationError("email", "Invalid email format")
+    try:
+        check_email(email)
+    except ValueError as e:
+        raise UserValidationError("email", str(e))
 
 
 def create_user(db: Session, name: str, surname: str, email: str) -> User | None:
@@ -0,0 +1,100 @@
+"""
+etag.py
+
+Entity tags and the conditional request headers that carry them
+(RFC 9110, section 13). A user's tag is derived from its id and row
+version, so it changes with every committed update; other representations,
+such as pages of users, are tagged with a hash of their content.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional
+
+ANY = "*"
+
+
+def make_etag(*parts: object) -> str:
+    """Strong entity tag made of ``parts``."""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def user_etag(user_id: int, version: int) -> str:
+    return make_etag(user_id, version)
+
+
+def content_etag(content: object) -> str:
+    """Strong entity tag hashing the ``repr`` of plain data, such as the rows
+    a response is about to be serialized from."""
+    return make_etag(
+        hashlib.blake2b(repr(content).encode(), digest_size=16).hexdigest()
+    )
+
+
+def parse_etags(header: str) -> List[str]:
+    """Entity tags listed in an If-Match or If-None-Match header.
+
+    Weak tags keep their ``W/`` prefix; a lone ``*`` is returned as ANY.
+    """
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_match(header: Optional[str], etag: str) -> bool:
+    """Whether a request with this If-Match header may change the resource
+    whose current tag is ``etag``. Weak tags never match."""
+    if header is None:
+        return True
+    tags = parse_etags(header)
+    return ANY in tags or etag in tags
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Whether this If-None-Match header lists ``etag``, comparing weakly."""
+    if header is None:
+        return False
+    tags = [_opaque(tag) for tag in parse_etags(header)]
+    return ANY in tags or _opaque(etag) in tags
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP-date."""
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Whether a GET with these request headers is answered with 304.
+
+    If-None-Match takes precedence over If-Modified-Since, which is only
+    compared with ``last_modified`` (naive UTC) to the second.
+    """
+    tags = headers.get("if-none-match")
+    if tags is not None:
+        return if_none_match(tags, etag)
+    since = headers.get("if-modified-since")
+    if since is None or last_modified is None:
+        return False
+    try:
+        since_date = parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+    if since_date.tzinfo is None:
+        since_date = since_date.replace(tzinfo=timezone.utc)
+    modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return modified <= since_date
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Dict[str, str]:
+    """ETag and Last-Modified response headers."""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
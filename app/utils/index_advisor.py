@@ -0,0 +1,338 @@
+"""
+index_advisor.py
+
+Audit the indexes of the users table against the queries crud_user actually
+issues. The workload in ``WORKLOAD`` is replayed against a scratch database
+to capture every SELECT statement; each statement is then EXPLAINed against
+the target database to find sequential scans and the indexes in use. The
+report lists indexes declared on the model but missing from the database,
+indexes present but never used, and can be rendered as an Alembic migration.
+
+Usage:
+    python -m app.utils.index_advisor [--url URL] [--write-migration]
+"""
+
+import argparse
+import re
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Column, Table, create_engine, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.crud import crud_user
+from app.models.user import User
+
+# Every read query crud_user can issue, keyed by a readable name
+WORKLOAD: Dict[str, Callable[[Session], Any]] = {
+    "get": lambda db: crud_user.get(db, id=1),
+    "get_by_email": lambda db: crud_user.get_by_email(db, email="john@gmail.com"),
+    "get_multi": lambda db: crud_user.get_multi(db),
+    "get_multi_active": lambda db: crud_user.get_multi(
+        db, is_active=True, is_superuser=False
+    ),
+    "get_multi_name": lambda db: crud_user.get_multi(db, name="John"),
+    "get_multi_email_prefix": lambda db: crud_user.get_multi(
+        db, email_prefix="john", sort=["email"]
+    ),
+    "get_multi_sort_name": lambda db: crud_user.get_multi(db, sort=["-name"]),
+    "get_multi_fields": lambda db: crud_user.get_multi_fields(
+        db, fields=["id", "email"], is_active=True, is_superuser=True
+    ),
+    "remove_lookup": lambda db: crud_user.remove(db, id=0),
+}
+
+# Workload queries that read the whole table by design
+FULL_SCAN_QUERIES = {"get_multi"}
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)$")
+_POSTGRES_INDEX = re.compile(
+    r"(?:Index(?: Only)? Scan(?: Backward)? using|Bitmap Index Scan on) (\w+)"
+)
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+@dataclass
+class CapturedQuery:
+    name: str
+    statement: Any
+    parameters: Dict[str, Any]
+
+
+@dataclass
+class QueryPlan:
+    name: str
+    sql: str
+    plan: List[str]
+    indexes: Set[str]
+    sequential_scans: Set[str]
+
+
+@dataclass
+class IndexReport:
+    table: str
+    plans: List[QueryPlan] = field(default_factory=list)
+    missing: Dict[str, Tuple[List[str], bool]] = field(default_factory=dict)
+    unused: List[str] = field(default_factory=list)
+
+    @property
+    def sequential_scans(self) -> List[QueryPlan]:
+        return [
+            plan
+            for plan in self.plans
+            if plan.sequential_scans and plan.name not in FULL_SCAN_QUERIES
+        ]
+
+    def render(self) -> str:
+        lines = [f"Index report for table '{self.table}'", ""]
+        flagged = {id(plan) for plan in self.sequential_scans}
+        for plan in self.plans:
+            status = "SEQ SCAN" if id(plan) in flagged else "ok"
+            used = ", ".join(sorted(plan.indexes)) or "-"
+            lines.append(f"  {plan.name:<26} {status:<9} indexes: {used}")
+        lines.append("")
+        lines.append("Missing indexes (declared on the model):")
+        lines.extend(f"  {name}" for name in sorted(self.missing) or ["none"])
+        lines.append("Unused indexes (no captured query uses them):")
+        lines.extend(f"  {name}" for name in self.unused or ["none"])
+        return "\n".join(lines)
+
+
+def scratch_engine() -> Engine:
+    """In-memory database with the schema declared by the models."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def migrated_engine() -> Engine:
+    """Temporary SQLite database with the schema built by the migrations."""
+    path = Path(tempfile.mkdtemp(prefix="index_advisor_")) / "migrated.db"
+    engine = create_engine(f"sqlite:///{path}")
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    return engine
+
+
+def capture_workload(
+    engine: Engine, workload: Optional[Dict[str, Callable[[Session], Any]]] = None
+) -> List[CapturedQuery]:
+    """Run each workload query and record the statements it executes."""
+    captured: List[CapturedQuery] = []
+    for name, run in (workload or WORKLOAD).items():
+        with Session(engine) as db:
+
+            def record(state, name=name):
+                if state.is_select:
+                    captured.append(
+                        CapturedQuery(
+                            name, state.statement, dict(state.parameters or {})
+                        )
+                    )
+
+            event.listen(db, "do_orm_execute", record)
+            run(db)
+            db.rollback()
+    return captured
+
+
+def explain(engine: Engine, query: CapturedQuery) -> QueryPlan:
+    """EXPLAIN a captured statement against ``engine``."""
+    compiled = query.statement.compile(dialect=engine.dialect)
+    params = compiled.construct_params(query.parameters)
+    if compiled.positional:
+        args: Any = tuple(params[name] for name in compiled.positiontup)
+    else:
+        args = params
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            # Show whether an index *can* serve the query, not whether the
+            # planner prefers a scan on a small scratch table
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            rows = connection.exec_driver_sql(f"EXPLAIN {compiled.string}", args)
+            plan = [row[0] for row in rows]
+            index_pattern, scan_pattern = _POSTGRES_INDEX, _POSTGRES_SCAN
+        else:
+            rows = connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {compiled.string}", args
+            )
+            plan = [row[-1] for row in rows]
+            index_pattern, scan_pattern = _SQLITE_INDEX, _SQLITE_SCAN
+        connection.rollback()
+
+    indexes = {m.group(1) for line in plan for m in index_pattern.finditer(line)}
+    scans = {m.group(1) for line in plan for m in scan_pattern.finditer(line.strip())}
+    return QueryPlan(query.name, compiled.string, plan, indexes, scans)
+
+
+def audit(target: Engine, table: Table = User.__table__) -> IndexReport:
+    """Compare the indexes of ``table`` on ``target`` with the model and the
+    indexes used by the crud_user workload."""
+    scratch = scratch_engine()
+    try:
+        queries = capture_workload(scratch)
+    finally:
+        scratch.dispose()
+
+    report = IndexReport(table=table.name)
+    report.plans = [explain(target, query) for query in queries]
+
+    used = set().union(*(plan.indexes for plan in report.plans))
+    database_indexes = _database_indexes(target, table.name)
+    for index in table.indexes:
+        present = index.name in database_indexes
+        # Some dialects do not reflect expression indexes; one that shows up
+        # in a plan clearly exists
+        if (not present and index.name not in used) or (
+            # A unique index built without its constraint is missing too
+            present
+            and index.unique
+            and not database_indexes[index.name]
+        ):
+            columns = [
+                (
+                    expression.name
+                    if isinstance(expression, Column)
+                    else str(expression).replace(f"{table.name}.", "")
+                )
+                for expression in index.expressions
+            ]
+            report.missing[index.name] = (columns, bool(index.unique))
+
+    report.unused = sorted(
+        name
+        for name, unique in database_indexes.items()
+        if name not in used and not unique
+    )
+    return report
+
+
+def _database_indexes(target: Engine, table: str) -> Dict[str, bool]:
+    """Whether each index of ``table`` on ``target`` is unique, by name."""
+    if target.dialect.name == "sqlite":
+        # The SQLite inspector skips expression indexes; the pragma does not.
+        # Indexes backing constraints are not declared indexes
+        with target.connect() as connection:
+            rows = connection.exec_driver_sql(f"PRAGMA index_list('{table}')")
+            return {row.name: bool(row.unique) for row in rows if row.origin == "c"}
+    return {
+        index["name"]: bool(index.get("unique"))
+        for index in inspect(target).get_indexes(table)
+    }
+
+
+def render_migration(report: IndexReport, down_revision: Optional[str]) -> str:
+    """Render an Alembic migration creating the missing indexes."""
+    revision = uuid.uuid4().hex[:12]
+    upgrade: List[str] = []
+    downgrade: List[str] = []
+    for name, (columns, unique) in sorted(report.missing.items()):
+        rendered = ", ".join(_render_column(column) for column in columns)
+        upgrade.append(
+            f"    op.create_index('{name}', '{report.table}', [{rendered}], "
+            f"unique={unique})"
+        )
+        downgrade.insert(0, f"    op.drop_index('{name}', table_name='{report.table}')")
+    for name in report.unused:
+        upgrade.append(f"    # Unused by the crud_user workload: {name}")
+    return _MIGRATION_TEMPLATE.format(
+        revision=revision,
+        down_revision=repr(down_revision),
+        down_revision_doc=down_revision or "",
+        create_date=datetime.now(),
+        upgrade="\n".join(upgrade) or "    pass",
+        downgrade="\n".join(downgrade) or "    pass",
+    )
+
+
+def _render_column(column: str) -> str:
+    if re.fullmatch(r"\w+", column):
+        return f"'{column}'"
+    return f"sa.text({column!r})"
+
+
+_MIGRATION_TEMPLATE = '''"""Index advisor corrections
+
+Revision ID: {revision}
+Revises: {down_revision_doc}
+Create Date: {create_date}
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '{revision}'
+down_revision: Union[str, None] = {down_revision}
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+{upgrade}
+
+
+def downgrade() -> None:
+{downgrade}
+'''
+
+
+def _current_head() -> Optional[str]:
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Audit users table indexes.")
+    parser.add_argument(
+        "--url", help="Database to audit (defaults to a migrated scratch schema)"
+    )
+    parser.add_argument(
+        "--write-migration",
+        action="store_true",
+        help="Write an Alembic migration creating the missing indexes",
+    )
+    args = parser.parse_args(argv)
+
+    target = create_engine(args.url) if args.url else migrated_engine()
+    try:
+        report = audit(target)
+    finally:
+        target.dispose()
+    print(report.render())
+
+    if args.write_migration and report.missing:
+        source = render_migration(report, _current_head())
+        revision = re.search(r"revision: str = '(\w+)'", source).group(1)
+        path = Path("alembic/versions") / f"{revision}_index_advisor_corrections.py"
+        path.write_text(source)
+        print(f"\nWrote {path}")
+    return 1 if report.missing or report.sequential_scans else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
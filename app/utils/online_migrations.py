@@ -0,0 +1,296 @@
+"""
+online_migrations.py
+
+Helpers for migrations that must not block traffic on large tables. Use them
+from revision scripts in place of the plain ``op`` calls:
+
+    from app.utils import online_migrations as online
+
+    def upgrade() -> None:
+        online.add_column('users', sa.Column('nickname', sa.String()))
+        online.backfill('users', {'nickname': sa.text('name')}, name='nickname')
+        online.create_index('ix_users_nickname', 'users', ['nickname'])
+
+When alembic runs with ``-x online=true`` (``make migrate ONLINE=1``):
+
+* indexes are built with ``CREATE INDEX CONCURRENTLY`` outside the migration
+  transaction, and an invalid index left by an interrupted build is rebuilt;
+* DDL needing an exclusive lock runs under ``lock_timeout`` and is retried
+  with backoff instead of queueing behind long transactions;
+* backfills update the table in primary key batches, each committed on its
+  own, pausing between batches and recording progress so an interrupted run
+  resumes where it stopped.
+
+Without the flag the same helpers run inside the migration transaction.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+
+logger = logging.getLogger("alembic.online")
+
+# Called after every backfill batch with (name, rows done, rows total)
+ProgressCallback = Callable[[str, int, int], None]
+
+_progress = sa.Table(
+    "online_migration_progress",
+    sa.MetaData(),
+    sa.Column("name", sa.String(255), primary_key=True),
+    sa.Column("last_key", sa.BigInteger, nullable=False),
+    sa.Column("rows_done", sa.BigInteger, nullable=False),
+)
+
+# SQLSTATE lock_not_available, raised when lock_timeout expires
+_LOCK_NOT_AVAILABLE = "55P03"
+
+
+def is_online() -> bool:
+    """Whether alembic was started in online migration mode."""
+    return bool(op.get_context().opts.get("online"))
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _is_lock_timeout(exc: OperationalError) -> bool:
+    if getattr(exc.orig, "pgcode", None) == _LOCK_NOT_AVAILABLE:
+        return True
+    return "database is locked" in str(exc.orig)
+
+
+def with_lock_timeout(
+    operation: Callable[[], Any],
+    timeout_ms: Optional[int] = None,
+    retries: Optional[int] = None,
+    backoff: float = 0.5,
+) -> Any:
+    """Run DDL under a lock timeout, retrying when the lock is not granted.
+
+    Each attempt runs in a savepoint so a timed out attempt does not abort
+    the migration transaction.
+    """
+    if not is_online():
+        return operation()
+
+    timeout_ms = (
+        settings.MIGRATION_LOCK_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    )
+    retries = settings.MIGRATION_LOCK_RETRIES if retries is None else retries
+    bind = op.get_bind()
+    for attempt in range(1, retries + 1):
+        savepoint = bind.begin_nested()
+        try:
+            if _is_postgres():
+                bind.exec_driver_sql(f"SET LOCAL lock_timeout = {int(timeout_ms)}")
+            result = operation()
+        except OperationalError as exc:
+            savepoint.rollback()
+            if not _is_lock_timeout(exc) or attempt == retries:
+                raise
+            logger.warning(
+                "Lock not granted within %sms (attempt %s/%s), retrying",
+                timeout_ms,
+                attempt,
+                retries,
+            )
+            time.sleep(backoff * 2 ** (attempt - 1))
+        else:
+            savepoint.commit()
+            return result
+
+
+def add_column(table: str, column: sa.Column, **kw: Any) -> None:
+    """Add a column under a lock timeout.
+
+    Keep new columns nullable or give them a constant server default so the
+    table is not rewritten, then backfill.
+    """
+    with_lock_timeout(lambda: op.add_column(table, column, **kw))
+
+
+def drop_column(table: str, column: str, **kw: Any) -> None:
+    with_lock_timeout(lambda: op.drop_column(table, column, **kw))
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Drop an index left invalid by an interrupted concurrent build."""
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid.first() is not None:
+        logger.info("Dropping invalid index %s before rebuilding it", name)
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+@contextmanager
+def _without_timeouts() -> Iterator[None]:
+    """Lift the session timeouts set by env.py for a concurrent index build,
+    which waits for running transactions but never blocks writers."""
+    bind = op.get_bind()
+    bind.exec_driver_sql("SET lock_timeout = 0")
+    bind.exec_driver_sql("SET statement_timeout = 0")
+    try:
+        yield
+    finally:
+        bind.exec_driver_sql(
+            f"SET lock_timeout = {int(settings.MIGRATION_LOCK_TIMEOUT_MS)}"
+        )
+        bind.exec_driver_sql(
+            f"SET statement_timeout = {int(settings.MIGRATION_STATEMENT_TIMEOUT_MS)}"
+        )
+
+
+def create_index(
+    name: str, table: str, columns: Sequence[Any], unique: bool = False, **kw: Any
+) -> None:
+    """Create an index, concurrently on Postgres in online mode."""
+    if not (is_online() and _is_postgres()):
+        op.create_index(name, table, list(columns), unique=unique, **kw)
+        return
+    with op.get_context().autocommit_block(), _without_timeouts():
+        _drop_invalid_index(name)
+        op.create_index(
+            name,
+            table,
+            list(columns),
+            unique=unique,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+            **kw,
+        )
+
+
+def drop_index(name: str, table: str, **kw: Any) -> None:
+    """Drop an index, concurrently on Postgres in online mode."""
+    if not (is_online() and _is_postgres()):
+        op.drop_index(name, table_name=table, **kw)
+        return
+    with op.get_context().autocommit_block(), _without_timeouts():
+        op.drop_index(
+            name,
+            table_name=table,
+            postgresql_concurrently=True,
+            if_exists=True,
+            **kw,
+        )
+
+
+def backfill(
+    table: str,
+    values: Dict[str, Any],
+    name: str,
+    where: Optional[Any] = None,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> int:
+    """UPDATE ``table`` SET ``values`` in batches, in primary key order.
+
+    Args:
+        table: Table to update
+        values: Column values, literals or SQL expressions
+        name: Identifies the backfill in the progress table; must be unique
+            across revisions
+        where: Extra condition restricting the rows to update
+        key: Integer primary key column used to walk the table
+        batch_size: Rows updated by each batch
+        pause: Seconds to sleep between batches
+        progress: Called after each batch with (name, rows done, rows total),
+            counting the rows ``where`` selects
+
+    Returns:
+        int: Number of rows updated by this run
+    """
+    batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+    pause = settings.MIGRATION_BATCH_PAUSE_SECONDS if pause is None else pause
+    target = sa.table(table, sa.column(key), *(sa.column(col) for col in values))
+    key_column = target.c[key]
+
+    def run(bind: sa.engine.Connection, persist: bool) -> int:
+        last_key, done = _load_progress(bind, name) if persist else (None, 0)
+        pending = sa.select(sa.func.count()).select_from(target)
+        if where is not None:
+            pending = pending.where(where)
+        if last_key is not None:
+            pending = pending.where(key_column > last_key)
+        total = done + bind.execute(pending).scalar()
+        updated = 0
+        while True:
+            # Keyset batches: each holds batch_size rows however sparse the
+            # keys, where fixed key ranges would mostly be empty
+            batch = sa.select(key_column).order_by(key_column).limit(batch_size)
+            if where is not None:
+                batch = batch.where(where)
+            if last_key is not None:
+                batch = batch.where(key_column > last_key)
+            keys = bind.execute(batch).scalars().all()
+            if not keys:
+                break
+            stmt = sa.update(target).where(key_column <= keys[-1]).values(values)
+            if where is not None:
+                stmt = stmt.where(where)
+            if last_key is not None:
+                stmt = stmt.where(key_column > last_key)
+            rows = bind.execute(stmt).rowcount
+            updated += rows
+            done += rows
+            last_key = keys[-1]
+            if persist:
+                _save_progress(bind, name, last_key, done)
+            logger.info("Backfill %s: %s/%s rows", name, done, total)
+            if progress is not None:
+                progress(name, done, total)
+            if len(keys) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        if persist:
+            bind.execute(_progress.delete().where(_progress.c.name == name))
+        return updated
+
+    if not is_online():
+        return run(op.get_bind(), persist=False)
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _progress.create(bind, checkfirst=True)
+        return run(bind, persist=True)
+
+
+def _load_progress(bind: sa.engine.Connection, name: str):
+    row = bind.execute(
+        sa.select(_progress.c.last_key, _progress.c.rows_done).where(
+            _progress.c.name == name
+        )
+    ).first()
+    if row is None:
+        return None, 0
+    logger.info("Resuming backfill %s after key %s", name, row.last_key)
+    return row.last_key, row.rows_done
+
+
+def _save_progress(
+    bind: sa.engine.Connection, name: str, last_key: int, rows_done: int
+) -> None:
+    updated = bind.execute(
+        _progress.update()
+        .where(_progress.c.name == name)
+        .values(last_key=last_key, rows_done=rows_done)
+    ).rowcount
+    if not updated:
+        bind.execute(
+            _progress.insert().values(name=name, last_key=last_key, rows_done=rows_done)
+        )
@@ -0,0 +1,145 @@
+"""
+reshard.py
+
+Moves users to the shards a new USER_SHARDS layout maps them to (see
+app.core.sharding). Every shard is walked in id order, batch by batch, and
+users owned by another shard on the new hash ring are copied there, then
+deleted from the shard they were on. With consistent hashing, adding one
+shard to N moves about 1/(N + 1) of the users, all of them to the new one.
+
+Stop writes to users while it runs, then deploy the new USER_SHARDS. Create
+the schema on new shards first (alembic with DATABASE_URL set to each).
+A run interrupted between a copy and its delete leaves those users on both
+shards; running it again completes the move.
+
+Usage:
+    python -m app.utils.reshard NEW_SHARDS [--from OLD_SHARDS]
+        [--batch-size N] [--dry-run]
+
+Shard layouts are JSON objects of shard id to database URL. The old layout
+defaults to USER_SHARDS, or to the unsharded DATABASE_URL if that is empty.
+"""
+
+import argparse
+import json
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.sharding import DEFAULT_SHARD, HashRing
+from app.models.user import User
+
+# Called after every batch with (source shard, rows scanned, rows moved)
+ProgressCallback = Callable[[str, int, int], None]
+
+users = User.__table__
+
+
+def reshard(
+    shards: Dict[str, Engine],
+    new_layout: List[str],
+    *,
+    vnodes: int = settings.USER_SHARD_VNODES,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> Counter:
+    """Move the users of every shard in ``shards`` to their shard in
+    ``new_layout``, a list of shard ids that ``shards`` has engines for.
+
+    Returns:
+        Counter: Users moved (or to move, if ``dry_run``) per
+        (source, target) pair of shards
+    """
+    missing = set(new_layout) - set(shards)
+    if missing:
+        raise ValueError(f"No database for shards: {', '.join(sorted(missing))}")
+    ring = HashRing(sorted(new_layout), vnodes)
+    moved: Counter = Counter()
+    for source, engine in shards.items():
+        last_id, scanned = None, 0
+        while True:
+            stmt = select(users).order_by(users.c.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(users.c.id > last_id)
+            with engine.connect() as connection:
+                rows = [dict(row._mapping) for row in connection.execute(stmt)]
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            scanned += len(rows)
+            by_target: Dict[str, List[dict]] = {}
+            for row in rows:
+                target = ring.shard_for(row["id"])
+                if target != source:
+                    by_target.setdefault(target, []).append(row)
+            for target, batch in by_target.items():
+                moved[source, target] += len(batch)
+                if not dry_run:
+                    _move(batch, engine, shards[target])
+            if progress is not None:
+                progress(source, scanned, sum(map(len, by_target.values())))
+    return moved
+
+
+def _move(rows: List[dict], source: Engine, target: Engine) -> None:
+    ids = [row["id"] for row in rows]
+    with target.begin() as connection:
+        # Users copied by an interrupted run are already there
+        present = set(connection.scalars(select(users.c.id).where(users.c.id.in_(ids))))
+        copies = [row for row in rows if row["id"] not in present]
+        if copies:
+            connection.execute(users.insert(), copies)
+    with source.begin() as connection:
+        connection.execute(delete(users).where(users.c.id.in_(ids)))
+
+
+def _engines(
+    old: Dict[str, str], new: Dict[str, str]
+) -> Tuple[Dict[str, Engine], List[str]]:
+    for shard in set(old) & set(new):
+        if old[shard] != new[shard]:
+            raise ValueError(f"Shard {shard} has a different URL in each layout")
+    by_url: Dict[str, Engine] = {}
+    shards = {}
+    for shard, url in {**old, **new}.items():
+        if url not in by_url:
+            by_url[url] = create_engine(url)
+        shards[shard] = by_url[url]
+    return shards, list(new)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move users between shards.")
+    parser.add_argument("shards", help="New layout: JSON of shard id to URL")
+    parser.add_argument(
+        "--from", dest="old", help="Old layout (defaults to USER_SHARDS)"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Only count moves")
+    args = parser.parse_args(argv)
+
+    if args.old:
+        old = json.loads(args.old)
+    else:
+        old = settings.USER_SHARDS or {DEFAULT_SHARD: settings.DATABASE_URL}
+    shards, new_layout = _engines(old, json.loads(args.shards))
+    moved = reshard(
+        shards,
+        new_layout,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        progress=lambda shard, scanned, count: print(
+            f"{shard}: {scanned} scanned, {count} to move in this batch"
+        ),
+    )
+    for (source, target), count in sorted(moved.items()):
+        print(f"{source} -> {target}: {count} users")
+    print(f"{sum(moved.values())} users {'to move' if args.dry_run else 'moved'}")
+
+
+if __name__ == "__main__":
+    main()
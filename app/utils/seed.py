@@ -0,0 +1,205 @@
+"""
+seed.py
+
+Bulk generation of realistic users for benchmarks and scaling tests. Every
+user shares one bcrypt hash computed up front, so loading 10^6 rows costs
+one hash instead of a million. Rows are streamed with COPY on Postgres and
+with batched executemany elsewhere.
+
+Seeded SQLite databases can be snapshotted in memory and restored into a
+fresh database in milliseconds with the SQLite backup API, so a session can
+seed once and hand every test a pristine copy.
+
+Usage:
+    python -m app.utils.seed COUNT [--url URL] [--admins N]
+"""
+
+import argparse
+import csv
+import io
+import random
+import sqlite3
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, exists, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.security import get_password_hash
+from app.models.user import User, UserEmail
+
+DEFAULT_PASSWORD = "seed-password"
+EMAIL_DOMAIN = "gmail.com"
+
+FIRST_NAMES = [
+    "Adam", "Alice", "Anna", "Ben", "Carla", "Daniel", "Emma", "Eva", "Filip",
+    "Grace", "Hugo", "Ida", "Jan", "John", "Julia", "Karol", "Laura", "Leo",
+    "Maria", "Marek", "Nina", "Olga", "Oscar", "Piotr", "Rosa", "Sam", "Zofia",
+]  # fmt: skip
+SURNAMES = [
+    "Adams", "Baker", "Brown", "Clark", "Davis", "Evans", "Garcia", "Green",
+    "Hall", "Johnson", "King", "Kowalski", "Lee", "Lewis", "Miller", "Moore",
+    "Nowak", "Smith", "Taylor", "Walker", "White", "Wilson", "Wright", "Young",
+]  # fmt: skip
+
+_COLUMNS = ("email", "name", "surname", "hashed_password", "is_active", "is_superuser")
+
+
+@lru_cache
+def hashed_password(password: str = DEFAULT_PASSWORD) -> str:
+    return get_password_hash(password)
+
+
+def letters(n: int) -> str:
+    """Spell ``n`` in letters: user names may not contain digits."""
+    word = ""
+    while True:
+        n, digit = divmod(n, 26)
+        word = chr(ord("a") + digit) + word
+        if not n:
+            return word
+
+
+def generate_users(
+    count: int,
+    start: int = 0,
+    admins: int = 0,
+    password: str = DEFAULT_PASSWORD,
+    seed: int = 0,
+) -> Iterator[Dict]:
+    """Yield ``count`` user rows with unique emails.
+
+    User ``start + n`` always gets the same email,
+    ``user<start + n>@gmail.com``, so callers can address seeded users
+    directly. The first ``admins`` users are superusers and about one in
+    twenty users is inactive.
+    """
+    rng = random.Random(seed + start)
+    password_hash = hashed_password(password)
+    for n in range(start, start + count):
+        yield {
+            "email": f"user{n}@{EMAIL_DOMAIN}",
+            "name": rng.choice(FIRST_NAMES),
+            # Suffix keeps (name, surname) pairs varied like real data
+            "surname": rng.choice(SURNAMES) + letters(n % 676),
+            "hashed_password": password_hash,
+            "is_active": rng.random() >= 0.05 or n - start < admins,
+            "is_superuser": n - start < admins,
+        }
+
+
+def seed_users(
+    engine: Engine,
+    count: int,
+    start: int = 0,
+    admins: int = 0,
+    password: str = DEFAULT_PASSWORD,
+    batch_size: int = 10000,
+) -> int:
+    """Insert ``count`` generated users and return the number inserted."""
+    rows = generate_users(count, start=start, admins=admins, password=password)
+    if engine.dialect.name == "postgresql":
+        _copy_users(engine, rows)
+    else:
+        with engine.begin() as connection:
+            while batch := list(islice(rows, batch_size)):
+                connection.execute(User.__table__.insert(), batch)
+    _claim_emails(engine)
+    return count
+
+
+def _claim_emails(engine: Engine) -> None:
+    # Seeded users own their emails like users created through crud_user
+    unclaimed = ~exists().where(UserEmail.email == func.lower(User.email))
+    with engine.begin() as connection:
+        connection.execute(
+            insert(UserEmail).from_select(
+                ["email", "user_id"],
+                select(func.lower(User.email), User.id).where(
+                    User.deleted_at.is_(None), unclaimed
+                ),
+            )
+        )
+
+
+def _copy_users(engine: Engine, rows: Iterator[Dict]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in _COLUMNS])
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY users ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def count_users(engine: Engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(User)).scalar()
+
+
+def memory_engine() -> Engine:
+    """Single-connection in-memory SQLite engine with the model schema."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def snapshot(engine: Engine) -> sqlite3.Connection:
+    """Copy a SQLite database into an in-memory snapshot."""
+    target = sqlite3.connect(":memory:", check_same_thread=False)
+    _backup(engine, target, into_engine=False)
+    return target
+
+
+def restore(snapshot_connection: sqlite3.Connection, engine: Engine) -> None:
+    """Replace the contents of a SQLite database with a snapshot."""
+    _backup(engine, snapshot_connection, into_engine=True)
+
+
+def _backup(engine: Engine, other: sqlite3.Connection, into_engine: bool) -> None:
+    if engine.dialect.name != "sqlite":
+        raise ValueError("Snapshots are only supported for SQLite databases")
+    connection = engine.raw_connection()
+    try:
+        driver_connection = connection.driver_connection
+        if into_engine:
+            other.backup(driver_connection)
+        else:
+            driver_connection.backup(other)
+    finally:
+        connection.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk load generated users.")
+    parser.add_argument("count", type=int)
+    parser.add_argument("--url", help="Database URL (defaults to DATABASE_URL)")
+    parser.add_argument("--admins", type=int, default=0)
+    parser.add_argument("--start", type=int, default=0, help="First user number")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from app.core.database import engine
+    seed_users(engine, args.count, start=args.start, admins=args.admins)
+    print(f"{count_users(engine)} users in the database")
+
+
+if __name__ == "__main__":
+    main()
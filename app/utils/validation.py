@@ -0,0 +1,195 @@
+"""
+validation.py
+
+User data validation shared by the pydantic schemas, the services layer and
+bulk imports. Emails are checked by the EmailStr validator of the schemas,
+built once, and the settings the rules depend on are snapshotted into
+``rules`` when the module is first imported, so a check costs no settings
+lookups or validator construction.
+
+``validate_users`` checks a whole batch of records in one call and returns
+every error found instead of stopping at the first one.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.exceptions.user import UserBatchValidationError
+
+_email_adapter = TypeAdapter(EmailStr)
+NAME_MIN_LENGTH = 2
+
+
+@dataclass(frozen=True)
+class ValidationRules:
+    allowed_email_domain: str
+    password_min_length: int
+
+    @classmethod
+    def from_settings(cls) -> "ValidationRules":
+        return cls(
+            allowed_email_domain=settings.ALLOWED_EMAIL_DOMAIN,
+            password_min_length=settings.PASSWORD_MIN_LENGTH,
+        )
+
+
+rules = ValidationRules.from_settings()
+
+
+def reload_rules() -> ValidationRules:
+    """Snapshot the settings again, e.g. after a test changed them."""
+    global rules
+    rules = ValidationRules.from_settings()
+    return rules
+
+
+def clean_name(value: str, label: str = "Name") -> str:
+    """Strip and title-case a name or surname.
+
+    Raises:
+        ValueError: If it is shorter than two letters or contains non-letters
+    """
+    cleaned_value = value.strip()
+    if len(cleaned_value) < NAME_MIN_LENGTH:
+        raise ValueError(f"{label} must be at least {NAME_MIN_LENGTH} characters long")
+    if not cleaned_value.isalpha():
+        raise ValueError(f"{label} must contain only letters")
+    return cleaned_value.title()
+
+
+def check_email(value: str) -> str:
+    """Check the email format as UserCreate.email (EmailStr) does.
+
+    Returns:
+        str: The normalized email, e.g. with a lowercased domain
+
+    Raises:
+        ValueError: If the email is malformed
+    """
+    try:
+        return _email_adapter.validate_python(value)
+    except ValidationError as e:
+        reason = e.errors()[0].get("ctx", {}).get("reason")
+        message = "Invalid email format"
+        raise ValueError(f"{message}: {reason}" if reason else message) from None
+
+
+def check_email_domain(value: str) -> str:
+    """Check that the email belongs to the allowed domain.
+
+    Raises:
+        ValueError: If the email domain is not allowed
+    """
+    if not value.endswith(rules.allowed_email_domain):
+        raise ValueError(
+            f"Email must end with {rules.allowed_email_domain}, got {value}"
+        )
+    return value
+
+
+def check_password(value: str) -> str:
+    """Check the password length.
+
+    Raises:
+        ValueError: If the password is too short
+    """
+    if len(value) < rules.password_min_length:
+        raise ValueError(
+            f"Password must be at least {rules.password_min_length} characters long"
+        )
+    return value
+
+
+@dataclass
+class RecordError:
+    index: int
+    field: str
+    message: str
+
+
+@dataclass
+class ValidationReport:
+    """Outcome of ``validate_users``: the cleaned valid records and the
+    errors of the others, in input order."""
+
+    valid: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[RecordError] = field(default_factory=list)
+    # Input position of every valid record
+    valid_indexes: List[int] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def raise_for_errors(self) -> None:
+        """Raise UserBatchValidationError listing every error, if any."""
+        if self.errors:
+            raise UserBatchValidationError(
+                [(error.index, error.field, error.message) for error in self.errors]
+            )
+
+
+def validate_users(
+    records: Iterable[Mapping[str, Any]],
+    *,
+    require_password: bool = True,
+    max_errors: Optional[int] = None,
+) -> ValidationReport:
+    """Validate and clean a batch of user records.
+
+    Applies the UserCreate rules to every record, emails included, and
+    rejects emails repeated within the batch.
+    Validation stops early once ``max_errors`` errors were found.
+
+    Returns:
+        ValidationReport: The cleaned valid records and every error
+    """
+    report = ValidationReport()
+    errors = report.errors
+    seen_emails: Dict[str, int] = {}
+    for index, record in enumerate(records):
+        errors_before = len(errors)
+        cleaned = dict(record)
+
+        for field_name, label in (("name", "Name"), ("surname", "Surname")):
+            value = record.get(field_name)
+            if not isinstance(value, str):
+                errors.append(RecordError(index, field_name, "Field required"))
+                continue
+            try:
+                cleaned[field_name] = clean_name(value, label)
+            except ValueError as e:
+                errors.append(RecordError(index, field_name, str(e)))
+
+        email = record.get("email")
+        if not isinstance(email, str):
+            errors.append(RecordError(index, "email", "Field required"))
+        else:
+            try:
+                email = cleaned["email"] = check_email_domain(check_email(email))
+            except ValueError as e:
+                errors.append(RecordError(index, "email", str(e)))
+            else:
+                first = seen_emails.setdefault(email.lower(), index)
+                if first != index:
+                    message = f"Duplicate of record {first}"
+                    errors.append(RecordError(index, "email", message))
+
+        password = record.get("password")
+        if password is not None or require_password:
+            try:
+                if not isinstance(password, str):
+                    raise ValueError("Field required")
+                check_password(password)
+            except ValueError as e:
+                errors.append(RecordError(index, "password", str(e)))
+
+        if len(errors) == errors_before:
+            report.valid.append(cleaned)
+            report.valid_indexes.append(index)
+        elif max_errors is not None and len(errors) >= max_errors:
+            break
+    return report
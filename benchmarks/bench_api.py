@@ -0,0 +1,362 @@
+"""
+bench_api.py
+
+Load test of the API routes. The application runs in-process behind an
+httpx ASGI transport, against a SQLite file (default) or any database given
+with ``--database-url``; its tables are dropped, recreated and seeded with
+app.utils.seed. Each route is driven by ``--concurrency`` concurrent clients
+and its p50/p99 latency and throughput are compared with a JSON baseline.
+
+Usage:
+    python -m benchmarks.bench_api [--users N] [--concurrency C]
+        [--requests R] [--route NAME ...] [--baseline PATH]
+        [--save-baseline] [--threshold 0.2] [--json]
+
+Exits with status 1 when a route is slower than the baseline by more than
+``--threshold`` (p50, p99 or requests per second) or fails more often.
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import deps
+from app.core import database, security
+from app.core.config import settings
+from app.core.database import Base
+from app.models.user import User
+from app.utils import seed
+
+BASE_URL = "http://bench"
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "api.json"
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    # Builds the path from the request number, so requests vary their target
+    path: Callable[[int], str]
+    # "admin", "user" or None
+    auth: Optional[str] = None
+    form: Optional[Callable[[int], Dict[str, str]]] = None
+    expected_status: int = 200
+
+
+@dataclass
+class RouteResult:
+    name: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p99_ms: float
+    rps: float
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+
+def build_routes(emails: List[str]) -> List[Route]:
+    prefix = settings.API_V1_STR
+
+    def user_email(n: int) -> str:
+        return emails[n % len(emails)]
+
+    return [
+        Route(
+            "auth_login",
+            "POST",
+            lambda n: f"{prefix}/auth/login",
+            form=lambda n: {
+                "username": user_email(n),
+                "password": seed.DEFAULT_PASSWORD,
+            },
+        ),
+        Route("users_list", "GET", lambda n: f"{prefix}/users/?limit=50", "admin"),
+        Route("users_me", "GET", lambda n: f"{prefix}/users/me", "user"),
+        Route(
+            "odd_numbers",
+            "GET",
+            lambda n: f"{prefix}/odd-numbers/odd-numbers/?start=1&end=15",
+        ),
+        Route("check_number", "GET", lambda n: f"{prefix}/odd-numbers/check/{n}"),
+        Route("health", "GET", lambda n: f"{prefix}/health"),
+    ]
+
+
+def create_bench_engine(url: Optional[str]) -> Engine:
+    if url is None:
+        path = Path(tempfile.mkdtemp(prefix="bench_api_")) / "bench.db"
+        url = f"sqlite:///{path}"
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url, pool_size=settings.DATABASE_POOL_SIZE)
+
+
+def prepare_database(engine: Engine, users: int) -> List[str]:
+    """Recreate the schema with ``users`` users, the first an admin, and
+    return the emails of active regular users."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed.seed_users(engine, users, admins=1)
+    with engine.connect() as connection:
+        return list(
+            connection.scalars(
+                select(User.email)
+                .where(User.is_active.is_(True), User.is_superuser.is_(False))
+                .order_by(User.id)
+            )
+        )
+
+
+def load_app(import_path: str, engine: Engine, rate_limit: bool) -> FastAPI:
+    module_name, _, attribute = import_path.partition(":")
+    app: FastAPI = getattr(importlib.import_module(module_name), attribute or "app")
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[database.get_db] = get_bench_db
+    app.dependency_overrides[deps.get_db] = get_bench_db
+    if not rate_limit:
+        app.user_middleware = [
+            middleware
+            for middleware in app.user_middleware
+            if getattr(middleware.cls, "__name__", "") != "RateLimitMiddleware"
+        ]
+        app.middleware_stack = None
+    return app
+
+
+def auth_headers(engine: Engine, emails: List[str]) -> Dict[str, Dict[str, str]]:
+    """Request headers per Route.auth value."""
+    tokens = {
+        "admin": access_token(engine, "user0@gmail.com"),
+        "user": access_token(engine, emails[0]),
+    }
+    headers = {
+        auth: {"Authorization": f"Bearer {token}"} for auth, token in tokens.items()
+    }
+    headers[None] = {}
+    return headers
+
+
+def access_token(engine: Engine, email: str) -> str:
+    with sessionmaker(bind=engine)() as db:
+        user = db.query(User).filter(User.email == email).one()
+        return security.create_user_access_token(user)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_route(
+    client: httpx.AsyncClient,
+    route: Route,
+    headers: Dict[str, str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> RouteResult:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = itertools.count()
+
+    async def send(n: int) -> None:
+        form = route.form(n) if route.form else None
+        start = time.perf_counter()
+        response = await client.request(
+            route.method, route.path(n), headers=headers, data=form
+        )
+        latencies.append(time.perf_counter() - start)
+        statuses[str(response.status_code)] = (
+            statuses.get(str(response.status_code), 0) + 1
+        )
+
+    async def worker() -> None:
+        while (n := next(counter)) < requests:
+            await send(n)
+
+    for n in range(warmup):
+        form = route.form(n) if route.form else None
+        await client.request(route.method, route.path(n), headers=headers, data=form)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return RouteResult(
+        name=route.name,
+        requests=len(latencies),
+        errors=len(latencies) - statuses.get(str(route.expected_status), 0),
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        rps=len(latencies) / elapsed,
+        statuses=statuses,
+    )
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[RouteResult]:
+    engine = create_bench_engine(args.database_url)
+    emails = prepare_database(engine, args.users)
+    app = load_app(args.app, engine, args.rate_limit)
+    headers = auth_headers(engine, emails)
+
+    routes = [
+        route
+        for route in build_routes(emails)
+        if not args.route or route.name in args.route
+    ]
+    results = []
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        for route in routes:
+            results.append(
+                await run_route(
+                    client,
+                    route,
+                    headers[route.auth],
+                    args.requests,
+                    args.concurrency,
+                    args.warmup,
+                )
+            )
+    engine.dispose()
+    return results
+
+
+def compare(
+    results: List[RouteResult], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Describe every metric that regressed beyond ``threshold``."""
+    regressions = []
+    for result in results:
+        previous = baseline.get("routes", {}).get(result.name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = previous[metric] * (1 + threshold)
+            if getattr(result, metric) > limit:
+                regressions.append(
+                    f"{result.name}: {metric} {getattr(result, metric):.2f} "
+                    f"> {limit:.2f} (baseline {previous[metric]:.2f})"
+                )
+        if result.rps < previous["rps"] * (1 - threshold):
+            regressions.append(
+                f"{result.name}: rps {result.rps:.0f} "
+                f"< {previous['rps'] * (1 - threshold):.0f} "
+                f"(baseline {previous['rps']:.0f})"
+            )
+        previous_error_rate = previous["errors"] / max(previous["requests"], 1)
+        if result.error_rate > previous_error_rate:
+            regressions.append(
+                f"{result.name}: error rate {result.error_rate:.1%} "
+                f"> baseline {previous_error_rate:.1%}"
+            )
+    return regressions
+
+
+def to_baseline(results: List[RouteResult], args: argparse.Namespace) -> Dict:
+    return {
+        "meta": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "database": "sqlite" if args.database_url is None else "custom",
+            "python": platform.python_version(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "routes": {result.name: asdict(result) for result in results},
+    }
+
+
+def print_results(results: List[RouteResult]) -> None:
+    print(
+        f"{'route':<14}{'requests':>10}{'errors':>8}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'rps':>10}"
+    )
+    for result in results:
+        print(
+            f"{result.name:<14}{result.requests:>10}{result.errors:>8}"
+            f"{result.p50_ms:>10.2f}{result.p99_ms:>10.2f}{result.rps:>10.0f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the API routes.")
+    parser.add_argument("--app", default="main:app", help="ASGI app import path")
+    parser.add_argument("--database-url", help="Database to seed (wiped!)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="Per route")
+    parser.add_argument("--warmup", type=int, default=20, help="Per route")
+    parser.add_argument("--route", action="append", help="Only run these routes")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Write results as baseline"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed regression ratio"
+    )
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="Keep RateLimitMiddleware"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args(argv)
+
+    # One log line per request would distort the measurements
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(to_baseline(results, args), indent=2))
+    else:
+        print_results(results)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(to_baseline(results, args), indent=2))
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = compare(
+        results, json.loads(args.baseline.read_text()), args.threshold
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
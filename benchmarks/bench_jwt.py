@@ -0,0 +1,80 @@
+"""
+bench_jwt.py
+
+Sign/verify throughput of the supported JWT algorithms through the same
+``jose`` key objects the application uses.
+
+Usage:
+    python -m benchmarks.bench_jwt [--iterations N] [--json]
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from jose import jwt
+
+from app.core.keys import KeyRing, generate_private_key
+
+ALGORITHMS = ["HS256", "RS256", "ES256"]
+
+
+def build_keyring(algorithm: str) -> KeyRing:
+    if algorithm.startswith("HS"):
+        return KeyRing(algorithm, secret="benchmark-secret")
+    keyring = KeyRing(algorithm)
+    keyring.add_private_key("bench", generate_private_key(algorithm))
+    keyring.activate("bench")
+    return keyring
+
+
+def bench_algorithm(algorithm: str, iterations: int) -> Dict[str, float]:
+    keyring = build_keyring(algorithm)
+    kid, signing_key = keyring.signing_key()
+    verification_key = keyring.verification_key(kid)
+    headers = {"kid": kid} if kid else None
+    claims = {"sub": "1", "exp": int(time.time()) + 3600, "adm": False}
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        token = jwt.encode(claims, signing_key, algorithm=algorithm, headers=headers)
+    sign_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        jwt.decode(token, verification_key, algorithms=[algorithm])
+    verify_seconds = time.perf_counter() - start
+
+    return {
+        "algorithm": algorithm,
+        "sign_per_second": iterations / sign_seconds,
+        "verify_per_second": iterations / verify_seconds,
+        "token_bytes": len(token),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, float]] = [
+        bench_algorithm(algorithm, args.iterations) for algorithm in ALGORITHMS
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'algorithm':<10}{'sign/s':>12}{'verify/s':>12}{'bytes':>8}")
+    for result in results:
+        print(
+            f"{result['algorithm']:<10}"
+            f"{result['sign_per_second']:>12.0f}"
+            f"{result['verify_per_second']:>12.0f}"
+            f"{result['token_bytes']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
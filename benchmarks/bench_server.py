@@ -0,0 +1,188 @@
+"""
+bench_server.py
+
+Requests per second and latency of the API routes for each server profile
+of app.core.server. Unlike bench_api, which calls the app in-process, every
+profile runs as a real server process on a local port and is driven over
+TCP by ``--concurrency`` keep-alive connections, so the event loop, HTTP
+parser and connection handling of the profile are part of the measurement.
+HTTP/2 profiles are driven over h2c and need ``pip install httpx[http2]``.
+
+Usage:
+    python -m benchmarks.bench_server [--profile NAME ...] [--users N]
+        [--concurrency C] [--requests R] [--route NAME ...] [--json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core import server
+from app.core.config import settings
+from benchmarks.bench_api import (
+    RouteResult,
+    auth_headers,
+    build_routes,
+    create_bench_engine,
+    load_app,
+    prepare_database,
+    print_results,
+    run_route,
+)
+
+STARTUP_TIMEOUT_SECONDS = 30.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def missing_requirement(profile: server.ServerProfile) -> Optional[str]:
+    if profile.server == "hypercorn" and not importlib.util.find_spec("hypercorn"):
+        return "hypercorn"
+    if profile.http2 and not importlib.util.find_spec("h2"):
+        return "httpx[http2]"
+    return None
+
+
+def start_server(profile: str, url: str, port: int) -> subprocess.Popen:
+    # Only the profile differs between runs; SERVER_* overrides are ignored
+    env = {
+        key: value for key, value in os.environ.items() if not key.startswith("SERVER_")
+    }
+    env["DATABASE_URL"] = url
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_server", "--serve", profile],
+        env={**env, "SERVER_PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_up(client: httpx.AsyncClient, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            response = await client.get(f"{settings.API_V1_STR}/health")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not start in time")
+
+
+async def bench_profile(
+    profile: server.ServerProfile,
+    url: str,
+    emails: List[str],
+    headers: Dict,
+    args: argparse.Namespace,
+) -> List[RouteResult]:
+    port = free_port()
+    process = start_server(profile.name, url, port)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            http1=not profile.http2,
+            http2=profile.http2,
+            limits=limits,
+        ) as client:
+            await wait_until_up(client, process)
+            return [
+                await run_route(
+                    client,
+                    route,
+                    headers[route.auth],
+                    args.requests,
+                    args.concurrency,
+                    args.warmup,
+                )
+                for route in build_routes(emails)
+                if not args.route or route.name in args.route
+            ]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, List[RouteResult]]:
+    path = Path(tempfile.mkdtemp(prefix="bench_server_")) / "bench.db"
+    url = f"sqlite:///{path}"
+    engine = create_bench_engine(url)
+    emails = prepare_database(engine, args.users)
+    headers = auth_headers(engine, emails)
+    engine.dispose()
+
+    results = {}
+    for name in args.profile or list(server.PROFILES):
+        profile = server.get_profile(name)
+        missing = missing_requirement(profile)
+        if missing:
+            print(f"Skipping profile {name}: needs {missing}", file=sys.stderr)
+            continue
+        results[name] = await bench_profile(profile, url, emails, headers, args)
+    return results
+
+
+def serve(profile: str) -> None:
+    """Serve the app against the seeded database, without rate limiting."""
+    app = load_app("main:app", create_bench_engine(settings.DATABASE_URL), False)
+    server.serve(app, server.get_profile(profile), host="127.0.0.1")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the server profiles.")
+    parser.add_argument(
+        "--profile", action="append", choices=server.PROFILES, help="Default all"
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="Per route")
+    parser.add_argument("--warmup", type=int, default=20, help="Per route")
+    parser.add_argument("--route", action="append", help="Only run these routes")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    parser.add_argument("--serve", metavar="PROFILE", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve)
+        return
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    name: {result.name: asdict(result) for result in routes}
+                    for name, routes in results.items()
+                },
+                indent=2,
+            )
+        )
+        return
+    for name, routes in results.items():
+        print(f"\nprofile {name}")
+        print_results(routes)
+
+
+if __name__ == "__main__":
+    main()
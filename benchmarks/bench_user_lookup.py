@@ -0,0 +1,128 @@
+"""
+bench_user_lookup.py
+
+Per-lookup cost of fetching a user by id and by email with an ORM
+``db.query(User).filter(...)`` built on every call, as crud_user used to,
+against the statements crud_user builds once (GET_BY_ID, GET_BY_EMAIL).
+Time spent in the database driver is measured separately with cursor
+events, so the Python-side overhead of building, compiling and loading
+stands out from the query itself.
+
+Usage:
+    python -m benchmarks.bench_user_lookup [--users N] [--lookups L]
+        [--database-url URL] [--json]
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.crud import crud_user
+from app.models.user import User
+from benchmarks.bench_api import create_bench_engine, prepare_database
+
+Lookup = Callable[[Session, str], Optional[User]]
+
+
+def query_by_email(db: Session, email: str) -> Optional[User]:
+    return (
+        db.query(User)
+        .filter(func.lower(User.email) == email.lower(), crud_user.NOT_DELETED)
+        .first()
+    )
+
+
+def query_by_id(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id, crud_user.NOT_DELETED).first()
+
+
+class DriverTimer:
+    """Seconds spent in cursor.execute on ``engine``."""
+
+    def __init__(self, engine: Engine) -> None:
+        self.seconds = 0.0
+        self._start = 0.0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, *args) -> None:
+        self._start = time.perf_counter()
+
+    def _after(self, *args) -> None:
+        self.seconds += time.perf_counter() - self._start
+
+
+def time_lookups(
+    engine: Engine, timer: DriverTimer, lookup: Lookup, keys: List, rounds: int
+) -> Dict[str, float]:
+    with Session(engine) as db:
+        # Warms up the compiled cache and the connection
+        for key in keys[:10]:
+            lookup(db, key)
+        timer.seconds = 0.0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for key in keys:
+                if lookup(db, key) is None:
+                    raise RuntimeError(f"No user for {key!r}")
+                # Loads every row again, as separate requests would
+                db.expunge_all()
+        seconds = time.perf_counter() - start
+    count = rounds * len(keys)
+    return {
+        "microseconds_per_lookup": seconds / count * 1e6,
+        "python_microseconds_per_lookup": (seconds - timer.seconds) / count * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--database-url", help="Default a temporary SQLite file")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    emails = prepare_database(engine, args.users)
+    with Session(engine) as db:
+        ids = [crud_user.get_by_email(db, email).id for email in emails]
+    timer = DriverTimer(engine)
+    rounds = max(1, args.lookups // len(emails))
+
+    def cached_by_id(db: Session, user_id: int) -> Optional[User]:
+        return crud_user.get(db, id=user_id)
+
+    def cached_by_email(db: Session, email: str) -> Optional[User]:
+        return crud_user.get_by_email(db, email=email)
+
+    cases = {
+        "id_query": (query_by_id, ids),
+        "id_cached": (cached_by_id, ids),
+        "email_query": (query_by_email, emails),
+        "email_cached": (cached_by_email, emails),
+    }
+    results = {
+        name: time_lookups(engine, timer, lookup, keys, rounds)
+        for name, (lookup, keys) in cases.items()
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'lookup':<14}{'us/lookup':>12}{'python us':>12}{'speedup':>10}")
+    for name, result in results.items():
+        baseline = results[name.rsplit("_", 1)[0] + "_query"]
+        python = result["python_microseconds_per_lookup"]
+        print(
+            f"{name:<14}{result['microseconds_per_lookup']:>12.2f}{python:>12.2f}"
+            f"{baseline['python_microseconds_per_lookup'] / python:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
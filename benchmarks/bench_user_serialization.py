@@ -0,0 +1,117 @@
+"""
+bench_user_serialization.py
+
+Per-row cost of serializing a page of users, and memory per cached user,
+for the validated path (UserResponse built from ORM objects, as FastAPI
+does for a ``response_model``) against the trusted path (UserRecord rows
+dumped without validation).
+
+Usage:
+    python -m benchmarks.bench_user_serialization [--rows N]
+        [--iterations I] [--json]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+
+from app.models.user import User
+from app.schemas.user import UserRecord, UserResponse, dump_record, dump_records
+from app.utils import seed
+
+_responses = TypeAdapter(List[UserResponse])
+
+
+def build_users(rows: int) -> List[User]:
+    return [
+        User(id=n + 1, **row)
+        for n, row in enumerate(seed.generate_users(rows, password="bench"))
+    ]
+
+
+def validated(users: List[User]) -> bytes:
+    return _responses.dump_json(
+        _responses.validate_python(users, from_attributes=True)
+    )
+
+
+def trusted(users: List[User]) -> bytes:
+    return dump_records([UserRecord.from_user(user) for user in users])
+
+
+def trusted_rows(records: List[UserRecord]) -> bytes:
+    return dump_records(records)
+
+
+def time_per_row(
+    serialize: Callable[[list], bytes], rows: list, iterations: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serialize(rows)
+    return (time.perf_counter() - start) / iterations / len(rows)
+
+
+def bytes_per_entry(build: Callable[[User], object], users: List[User]) -> float:
+    # Strings an entry shares with its User are not counted
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entries = [build(user) for user in users]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del entries
+    return (after - before) / len(users)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100, help="Users per page")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    users = build_users(args.rows)
+    records = [UserRecord.from_user(user) for user in users]
+    assert validated(users) == trusted(users), "paths serialize differently"
+
+    timings = {
+        "validated": time_per_row(validated, users, args.iterations),
+        "trusted": time_per_row(trusted, users, args.iterations),
+        "trusted_rows": time_per_row(trusted_rows, records, args.iterations),
+    }
+    memory = {
+        "UserResponse": bytes_per_entry(
+            lambda user: UserResponse.model_validate(user), users
+        ),
+        "UserRecord": bytes_per_entry(UserRecord.from_user, users),
+        "json_bytes": bytes_per_entry(
+            lambda user: dump_record(UserRecord.from_user(user)), users
+        ),
+    }
+    results: Dict[str, Dict[str, float]] = {
+        "microseconds_per_row": {
+            name: seconds * 1e6 for name, seconds in timings.items()
+        },
+        "bytes_per_cached_user": memory,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'path':<14}{'us/row':>10}{'speedup':>10}")
+    for name, seconds in timings.items():
+        print(
+            f"{name:<14}{seconds * 1e6:>10.2f}"
+            f"{timings['validated'] / seconds:>9.1f}x"
+        )
+    print()
+    print(f"{'cached as':<14}{'bytes/user':>12}")
+    for name, size in memory.items():
+        print(f"{name:<14}{size:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+bench_user_validation.py
+
+Per-record cost of validating user records one UserCreate model at a time
+against one ``validate_users`` batch call, for a batch where every
+``--invalid-every``-th record is invalid.
+
+Usage:
+    python -m benchmarks.bench_user_validation [--records N]
+        [--invalid-every K] [--json]
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from pydantic import ValidationError
+
+from app.schemas.user import UserCreate
+from app.utils import seed
+from app.utils.validation import validate_users
+
+
+def build_records(count: int, invalid_every: int) -> List[Dict[str, Any]]:
+    records = []
+    for n, user in enumerate(seed.generate_users(count, password="bench")):
+        record = {
+            "name": user["name"],
+            "surname": user["surname"],
+            "email": user["email"],
+            "password": "bench-password",
+        }
+        if invalid_every and n % invalid_every == invalid_every - 1:
+            record["surname"] = "X"
+        records.append(record)
+    return records
+
+
+def per_model(records: List[Dict[str, Any]]) -> int:
+    errors = 0
+    for record in records:
+        try:
+            UserCreate.model_validate(record)
+        except ValidationError as e:
+            errors += e.error_count()
+    return errors
+
+
+def batch(records: List[Dict[str, Any]]) -> int:
+    return len(validate_users(records).errors)
+
+
+def time_per_record(validate: Callable[[list], int], records: list) -> Dict:
+    start = time.perf_counter()
+    errors = validate(records)
+    seconds = time.perf_counter() - start
+    return {"microseconds_per_record": seconds / len(records) * 1e6, "errors": errors}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--invalid-every", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    records = build_records(args.records, args.invalid_every)
+    results = {
+        "per_model": time_per_record(per_model, records),
+        "batch": time_per_record(batch, records),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = results["per_model"]["microseconds_per_record"]
+    print(f"{'path':<12}{'us/record':>12}{'speedup':>10}{'errors':>8}")
+    for name, result in results.items():
+        micros = result["microseconds_per_record"]
+        print(
+            f"{name:<12}{micros:>12.2f}{baseline / micros:>9.1f}x"
+            f"{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,24 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import api_router
+from app.core.admission import AdmissionControlMiddleware
 from app.core.config import settings
+from app.core.deadline import DeadlineMiddleware
+from app.core.lifespan import lifespan
 from app.core.middleware import add_process_time_header, RateLimitMiddleware
+from app.core.profiling import ProfilingMiddleware
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description=settings.DESCRIPTION,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
 )
 
+# Add profiling middleware first so it wraps the endpoint directly
+app.add_middleware(ProfilingMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +32,13 @@ app.add_middleware(
 # Add custom middleware
 app.middleware("http")(add_process_time_header)
 
+# Add admission control below rate limiting, so rate limited requests never
+# take a slot
+app.add_middleware(AdmissionControlMiddleware)
+
+# Start the deadline before admission, so time spent queued counts
+app.add_middleware(DeadlineMiddleware)
+
 # Add rate limiting middleware
 app.add_middleware(RateLimitMiddleware)
 
@@ -0,0 +1,59 @@
+import pytest
+
+
+@pytest.fixture
+def tokens(request, client, api_v1_prefix, create_user):
+    """Log a new user in and return the issued token pair."""
+    email = f"{request.node.name.replace('_', '.')}@gmail.com"
+    create_user(email)
+    response = client.post(
+        f"{api_v1_prefix}/auth/login",
+        data={"username": email, "password": "password123"},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_refresh_rotates_tokens(client, api_v1_prefix, tokens):
+    """Test that a refresh token is exchanged for a new working pair."""
+    response = client.post(
+        f"{api_v1_prefix}/auth/refresh",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    response = client.get(
+        f"{api_v1_prefix}/users/me", headers=bearer(rotated["access_token"])
+    )
+    assert response.status_code == 200
+
+
+def test_refresh_token_reuse_revokes_the_family(client, api_v1_prefix, tokens):
+    """Test that replaying a rotated refresh token is rejected and also
+    invalidates the token it was rotated into."""
+    url = f"{api_v1_prefix}/auth/refresh"
+    rotated = client.post(url, json={"refresh_token": tokens["refresh_token"]}).json()
+
+    response = client.post(url, json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    response = client.post(url, json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+    response = client.get(
+        f"{api_v1_prefix}/users/me", headers=bearer(rotated["access_token"])
+    )
+    assert response.status_code == 403
+
+
+def test_access_token_rejected_after_logout(client, api_v1_prefix, tokens):
+    """Test that logout revokes the access token it was called with."""
+    headers = bearer(tokens["access_token"])
+    assert client.get(f"{api_v1_prefix}/users/me", headers=headers).status_code == 200
+
+    response = client.post(f"{api_v1_prefix}/auth/logout", headers=headers)
+    assert response.status_code == 204
+    assert client.get(f"{api_v1_prefix}/users/me", headers=headers).status_code == 403
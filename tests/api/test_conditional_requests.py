@@ -0,0 +1,57 @@
+from app.core import security
+from app.crud import crud_user
+
+
+def test_get_user_not_modified(admin_client, db_session, api_v1_prefix, create_user):
+    """Test that a current If-None-Match or If-Modified-Since gets a 304."""
+    user = create_user("conditional@gmail.com")
+    url = f"{api_v1_prefix}/users/{user.id}"
+    response = admin_client.get(url)
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'"other", W/{etag}'},
+        {"If-Modified-Since": last_modified},
+    ):
+        response = admin_client.get(url, headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    crud_user.update(db_session, db_obj=user, obj_in={"surname": "Kowalski"})
+    response = admin_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["surname"] == "Kowalski"
+
+
+def test_list_not_modified(admin_client, api_v1_prefix, create_user):
+    """Test that a page of users is tagged by its content."""
+    create_user("page1@gmail.com")
+    url = f"{api_v1_prefix}/users/?email_prefix=page"
+    etag = admin_client.get(url).headers["ETag"]
+
+    response = admin_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    create_user("page2@gmail.com")
+    response = admin_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["ETag"] != etag
+
+
+def test_read_user_me_not_modified(client, api_v1_prefix, create_user):
+    """Test that /users/me is not taken for a user id and answers a current
+    If-None-Match with a 304."""
+    user = create_user("me.conditional@gmail.com")
+    headers = {"Authorization": f"Bearer {security.create_user_access_token(user)}"}
+    url = f"{api_v1_prefix}/users/me"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "me.conditional@gmail.com"
+    etag = response.headers["ETag"]
+
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
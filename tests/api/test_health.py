@@ -5,4 +5,20 @@ def test_health_check(client: TestClient, api_v1_prefix: str):
     """Test health check endpoint."""
     response = client.get(f"{api_v1_prefix}/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "healthy"} 
\ No newline at end of file
+    assert response.json() == {"status": "healthy"}
+
+
+def test_liveness(client: TestClient, api_v1_prefix: str):
+    """Test liveness endpoint."""
+    response = client.get(f"{api_v1_prefix}/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_readiness(client: TestClient, api_v1_prefix: str):
+    """Test readiness endpoint reports every probe."""
+    response = client.get(f"{api_v1_prefix}/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert set(body["checks"]) == {"database", "pool", "event_loop"}
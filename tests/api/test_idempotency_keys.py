@@ -0,0 +1,57 @@
+from sqlalchemy import func, select
+
+from app.core import security
+from app.core.idempotency import REPLAYED_HEADER
+from app.models.user import User
+
+
+def user_payload(email):
+    return {
+        "name": "Anna",
+        "surname": "Nowak",
+        "email": email,
+        "password": "Password123!",
+    }
+
+
+def count_users(db_session, email):
+    return db_session.scalar(
+        select(func.count()).select_from(User).where(User.email == email)
+    )
+
+
+def test_retry_replays_creation(client, db_session, api_v1_prefix):
+    """Test that a retry with the same key replays the 201 without creating
+    the user again, and that reusing the key for another body conflicts."""
+    url = f"{api_v1_prefix}/users/"
+    headers = {"Idempotency-Key": "create-anna-once"}
+    payload = user_payload("idempotent.anna@gmail.com")
+
+    first = client.post(url, json=payload, headers=headers)
+    assert first.status_code == 201
+    retry = client.post(url, json=payload, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert count_users(db_session, "idempotent.anna@gmail.com") == 1
+
+    other = user_payload("idempotent.other@gmail.com")
+    response = client.post(url, json=other, headers=headers)
+    assert response.status_code == 422
+    assert count_users(db_session, "idempotent.other@gmail.com") == 0
+
+
+def test_keys_are_scoped_per_client(client, api_v1_prefix, create_user):
+    """Test that clients sending the same key do not share its record."""
+    url = f"{api_v1_prefix}/users/"
+    for n in range(2):
+        token = security.create_user_access_token(
+            create_user(f"idempotency.client{n}@gmail.com")
+        )
+        response = client.post(
+            url,
+            json=user_payload(f"idempotency.created{n}@gmail.com"),
+            headers={"Idempotency-Key": "shared", "Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 201
+        assert response.headers[REPLAYED_HEADER] == "false"
@@ -0,0 +1,9 @@
+from fastapi.testclient import TestClient
+
+
+def test_metrics(client: TestClient, api_v1_prefix: str):
+    """Test metrics endpoint exports the event loop lag histogram."""
+    response = client.get(f"{api_v1_prefix}/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE event_loop_lag_seconds histogram" in response.text
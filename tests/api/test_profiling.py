@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.profiling import profiler
+
+
+@pytest.fixture(autouse=True)
+def reset_profiler():
+    yield
+    profiler.stop()
+    profiler.reset()
+
+
+def test_profiling_requires_admin(client: TestClient, api_v1_prefix: str):
+    """Test that profiling endpoints reject anonymous requests."""
+    response = client.post(f"{api_v1_prefix}/profiling/start", json={})
+    assert response.status_code == 401
+
+
+def test_profile_window(admin_client: TestClient, api_v1_prefix: str):
+    """Test starting a window, profiling a route and reading its stacks."""
+    response = admin_client.post(
+        f"{api_v1_prefix}/profiling/start",
+        json={"seconds": 10, "routes": [f"{api_v1_prefix}/health"], "interval_ms": 1},
+    )
+    assert response.status_code == 200
+    assert response.json()["active"] is True
+
+    for _ in range(5):
+        admin_client.get(f"{api_v1_prefix}/health")
+    response = admin_client.post(f"{api_v1_prefix}/profiling/stop")
+    assert response.json()["active"] is False
+    assert response.json()["profiled"] == 5
+
+    response = admin_client.get(f"{api_v1_prefix}/profiling/stacks")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert all(
+        line.startswith(f"GET {api_v1_prefix}/health;")
+        for line in response.text.splitlines()
+    )
+
+
+def test_profile_rejects_unknown_mode(admin_client: TestClient, api_v1_prefix: str):
+    """Test that an unknown profiling mode is rejected."""
+    response = admin_client.post(
+        f"{api_v1_prefix}/profiling/start", json={"mode": "always"}
+    )
+    assert response.status_code == 422
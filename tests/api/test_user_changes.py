@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints.user_changes import change_events
+from app.crud import crud_user, crud_user_change
+from app.models.user import Base
+from app.models.user_change import DELETE
+
+
+def test_changes_since_sequence(admin_client, db_session, api_v1_prefix, create_user):
+    """Test that writes are listed in order after the given sequence."""
+    since = crud_user_change.last_seq(db_session) or 0
+    user = create_user("changes@gmail.com")
+    crud_user.update(db_session, db_obj=user, obj_in={"surname": "Kowalski"})
+    crud_user.remove(db_session, id=user.id)
+
+    response = admin_client.get(f"{api_v1_prefix}/user-changes?since={since}")
+    assert response.status_code == 200
+    body = response.json()
+    assert [change["operation"] for change in body["changes"]] == [
+        "insert",
+        "update",
+        "delete",
+    ]
+    assert body["changes"][1]["data"]["surname"] == "Kowalski"
+    assert body["changes"][2]["data"] is None
+    assert body["last_seq"] == body["changes"][-1]["seq"]
+
+    response = admin_client.get(
+        f"{api_v1_prefix}/user-changes?since={body['last_seq']}&wait=0.2"
+    )
+    assert response.json() == {"changes": [], "last_seq": body["last_seq"]}
+
+
+def test_changes_require_admin(client, api_v1_prefix):
+    """Test that the change feed is not public."""
+    assert client.get(f"{api_v1_prefix}/user-changes").status_code == 401
+
+
+class FakeRequest:
+    def __init__(self, events):
+        self.events = events
+
+    async def is_disconnected(self):
+        return self.events <= 0
+
+
+def test_event_stream_wakes_on_commit(db_session, create_user):
+    """Test that a subscriber gets a change as an event without polling."""
+    since = crud_user_change.last_seq(db_session) or 0
+    request = FakeRequest(events=1)
+
+    async def run():
+        events = change_events(request, db_session, since)
+        later = asyncio.get_running_loop().call_later(
+            0.05, create_user, "stream@gmail.com"
+        )
+        started = time.monotonic()
+        event = await events.__anext__()
+        request.events -= 1
+        later.cancel()
+        await events.aclose()
+        return event, time.monotonic() - started
+
+    event, elapsed = asyncio.run(run())
+    lines = event.splitlines()
+    assert lines[1] == "event: insert"
+    assert json.loads(lines[2].removeprefix("data: "))["data"]["email"] == (
+        "stream@gmail.com"
+    )
+    assert elapsed < 0.5
+
+
+def test_interleaved_writers_are_numbered_in_commit_order(tmp_path):
+    """Test that a writer starting after another is numbered after it even
+    when it would have committed first, so no reader skips a change."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'changes.db'}")
+    Base.metadata.create_all(engine)
+    first, second, reader = (Session(engine) for _ in range(3))
+    crud_user_change.record(first, DELETE, SimpleNamespace(id=1))
+    first.flush()
+
+    def write_second():
+        crud_user_change.record(second, DELETE, SimpleNamespace(id=2))
+        second.commit()
+
+    writer = threading.Thread(target=write_second)
+    writer.start()
+    writer.join(0.2)
+    # The second writer waits for the first to commit before taking a number
+    assert writer.is_alive()
+    assert crud_user_change.get_since(reader, 0) == []
+
+    first.commit()
+    writer.join()
+    changes = crud_user_change.get_since(reader, 0)
+    assert [(change.seq, change.user_id) for change in changes] == [(1, 1), (2, 2)]
+    for db in (first, second, reader):
+        db.close()
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.database import get_db
+from app.crud import crud_user
+from app.exceptions import UserVersionConflictError
+from main import app
+
+
+def test_update_with_if_match(admin_client, api_v1_prefix, create_user):
+    """Test that PUT applies only while the If-Match ETag is current."""
+    user = create_user("versions@gmail.com")
+    url = f"{api_v1_prefix}/users/{user.id}"
+    etag = admin_client.get(url).headers["ETag"]
+    assert etag == f'"{user.id}-1"'
+
+    response = admin_client.put(
+        url, json={"surname": "Kowalski"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{user.id}-2"'
+
+    response = admin_client.put(
+        url, json={"surname": "Wisniewski"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert admin_client.get(url).json()["surname"] == "Kowalski"
+
+    response = admin_client.put(
+        url, json={"surname": "Wisniewski"}, headers={"If-Match": "*"}
+    )
+    assert response.status_code == 200
+
+
+def test_concurrent_update_conflicts(db_session, create_user):
+    """Test that an update based on a stale read does not overwrite."""
+    user = create_user("conflict@gmail.com")
+    with Session(db_session.get_bind()) as other:
+        stale = crud_user.get(other, id=user.id)
+        crud_user.update(db_session, db_obj=user, obj_in={"surname": "Kowalski"})
+
+        with pytest.raises(UserVersionConflictError):
+            crud_user.update(other, db_obj=stale, obj_in={"surname": "Wisniewski"})
+
+    db_session.refresh(user)
+    assert (user.surname, user.version) == ("Kowalski", 2)
+
+
+def test_update_me_with_if_match(client, api_v1_prefix, db_engine, create_user):
+    """Test that a user updates themselves with every dependency of the
+    request given a fresh session, as in production."""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+    def get_fresh_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    create_user("versions.me@gmail.com")
+    app.dependency_overrides[get_db] = get_fresh_db
+    response = client.post(
+        f"{api_v1_prefix}/auth/login",
+        data={"username": "versions.me@gmail.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    url = f"{api_v1_prefix}/users/me"
+    etag = client.get(url, headers=headers).headers["ETag"]
+
+    response = client.put(
+        url, json={"surname": "Kowalski"}, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["surname"] == "Kowalski"
+    response = client.put(
+        url, json={"surname": "Nowak"}, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 412
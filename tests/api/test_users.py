@@ -7,11 +7,7 @@ from app.models.user import User
 @pytest.fixture
 def test_user(db_session):
     """Create a test user."""
-    user = User(
-        name="Test",
-        surname="User",
-        email="test.user@example.com"
-    )
+    user = User(name="Test", surname="User", email="test.user@example.com")
     db_session.add(user)
     db_session.commit()
     db_session.refresh(user)
@@ -20,11 +16,7 @@ def test_user(db_session):
 
 def test_create_user_success(client: TestClient, api_v1_prefix: str):
     """Test creating user successfully."""
-    user_data = {
-        "name": "John",
-        "surname": "Doe",
-        "email": "john.doe@example.com"
-    }
+    user_data = {"name": "John", "surname": "Doe", "email": "john.doe@example.com"}
     response = client.post(f"{api_v1_prefix}/users/", json=user_data)
     assert response.status_code == 201
     assert response.json()["email"] == user_data["email"]
@@ -32,11 +24,7 @@ def test_create_user_success(client: TestClient, api_v1_prefix: str):
 
 def test_create_user_invalid_email(client: TestClient, api_v1_prefix: str):
     """Test creating user with invalid email."""
-    user_data = {
-        "name": "John",
-        "surname": "Doe",
-        "email": "invalid-email"
-    }
+    user_data = {"name": "John", "surname": "Doe", "email": "invalid-email"}
     response = client.post(f"{api_v1_prefix}/users/", json=user_data)
     assert response.status_code == 422
 
@@ -60,4 +48,28 @@ def test_get_user_by_id(client: TestClient, api_v1_prefix: str, test_user: User)
 def test_get_user_not_found(client: TestClient, api_v1_prefix: str):
     """Test getting non-existent user."""
     response = client.get(f"{api_v1_prefix}/users/999")
-    assert response.status_code == 404 
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_get_users_next_link(admin_client: TestClient, api_v1_prefix: str, create_user):
+    """Test that following the next links walks every user once."""
+    for n in range(5):
+        create_user(f"cursor{n}@gmail.com")
+    # A client of its own, not throttled by the requests of other tests
+    client = TestClient(admin_client.app, client=("next-link", 50000))
+    # The id the cursor is made of is left out of the selected fields
+    url = f"{api_v1_prefix}/users/?email_prefix=cursor&fields=email&limit=3&skip=0"
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(response.json())
+        url = response.links.get("next", {}).get("url")
+        assert url is None or "skip" not in url
+    assert pages == [
+        [{"email": f"cursor{n}@gmail.com"} for n in range(3)],
+        [{"email": f"cursor{n}@gmail.com"} for n in range(3, 5)],
+    ]
+
+    response = client.get(f"{api_v1_prefix}/users/?after=bogus")
+    assert response.status_code == 422
@@ -4,14 +4,24 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.api import deps
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_session_factory
+from app.crud import crud_user, user_cache
 from app.models.user import Base
+from app.schemas.user import UserCreate
 from main import app
 
+pytest_plugins = ["tests.plugins.index_advisor"]
+
 # Test database URL
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
+# The background workers are bound to the application's SessionLocal, not
+# to the test database; tests drive them directly instead
+settings.OUTBOX_ENABLED = False
+settings.USER_PURGE_ENABLED = False
+
 @pytest.fixture(scope="session")
 def db_engine():
     """Create a test database engine."""
@@ -48,10 +58,37 @@ def client(db_session):
             db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(
+        autocommit=False, autoflush=False, bind=db_session.get_bind()
+    )
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
+@pytest.fixture
+def admin_client(client):
+    """Test client authorised as an admin."""
+    user_cache.cache.clear()
+    app.dependency_overrides[deps.get_current_admin_claims] = lambda: None
+    app.dependency_overrides[deps.get_current_admin_user] = lambda: None
+    yield client
+    app.dependency_overrides.pop(deps.get_current_admin_claims, None)
+    app.dependency_overrides.pop(deps.get_current_admin_user, None)
+    user_cache.cache.clear()
+
+@pytest.fixture
+def create_user(db_session):
+    """Create a user with the given email in the test database."""
+    def create(email):
+        return crud_user.create(
+            db_session,
+            obj_in=UserCreate.model_construct(
+                name="Anna", surname="Nowak", email=email, password="password123"
+            ),
+        )
+
+    return create
+
 @pytest.fixture
 def api_v1_prefix():
     """API v1 prefix fixture."""
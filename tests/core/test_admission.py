@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AIMDLimit,
+    Overloaded,
+    Priority,
+)
+
+TIMEOUTS_MS = {"health": 1000.0, "read": 1000.0, "write": 200.0, "login": 50.0}
+
+
+def test_aimd_limit_follows_latency():
+    """Test that the limit grows while used and fast, and backs off once per
+    target interval when slow."""
+    limit = AIMDLimit(10, 2, 20, latency_target_ms=100, backoff_ratio=0.5)
+    limit.observe(0.01, in_flight=2, now=0.0)
+    assert limit.value == 10
+    limit.observe(0.01, in_flight=8, now=0.0)
+    assert limit.value == pytest.approx(10.1)
+
+    limit = AIMDLimit(10, 2, 20, latency_target_ms=100, backoff_ratio=0.5)
+    limit.observe(1.0, in_flight=10, now=10.0)
+    limit.observe(1.0, in_flight=10, now=10.05)
+    assert limit.value == 5
+    limit.observe(1.0, in_flight=10, now=10.2)
+    assert limit.value == 2.5
+    limit.observe(1.0, in_flight=10, now=10.4)
+    assert limit.value == 2
+
+
+def test_queue_admits_by_priority_and_sheds_login():
+    """Test that queued reads go before logins and logins time out."""
+
+    async def scenario():
+        controller = AdmissionController(AIMDLimit(1, 1, 1), TIMEOUTS_MS)
+        await controller.acquire(Priority.WRITE)
+        login = asyncio.create_task(controller.acquire(Priority.LOGIN))
+        read = asyncio.create_task(controller.acquire(Priority.READ))
+        await asyncio.sleep(0)
+        assert controller.queued == 2
+
+        controller.release(0.01)
+        await read
+        with pytest.raises(Overloaded):
+            await login
+        assert controller.in_flight == 1
+        assert controller.rejected[Priority.LOGIN] == 1
+        assert controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_rejects_fast_with_retry_after():
+    """Test that a request expected to wait past its timeout gets a 503."""
+    limit = AIMDLimit(1, 1, 1)
+    limit.latency = 2.0
+    controller = AdmissionController(limit, TIMEOUTS_MS)
+    controller.in_flight = 1
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, enabled=True)
+
+    @app.post("/items")
+    async def create_item():
+        return {}
+
+    response = TestClient(app).post("/items")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert controller.rejected[Priority.WRITE] == 1
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import InvalidationBus, LocalInvalidationBus, TTLCache
+
+
+def test_entries_expire_and_evict_least_recently_used():
+    """Test TTL expiry and LRU eviction."""
+    cache = TTLCache(max_entries=2, ttl_seconds=0.05)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_concurrent_misses_load_once():
+    """Test that callers missing the same key share one load."""
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return b"value"
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_load("key", loader) for _ in range(50))
+        )
+
+    assert asyncio.run(run()) == [b"value"] * 50
+    assert len(loads) == 1
+    assert cache.get("key") == b"value"
+
+
+def test_delete_during_load_discards_loaded_value():
+    """Test that a value loaded before a concurrent delete is not cached."""
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        return b"stale"
+
+    async def run():
+        load = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        cache.delete("key")
+        return await load
+
+    assert asyncio.run(run()) == b"stale"
+    assert cache.get("key") is None
+
+
+def test_local_bus_invalidates_peers_only():
+    """Test that publishing drops the key from peer caches, not the
+    publisher's."""
+    peers = []
+    caches = [TTLCache(max_entries=10, ttl_seconds=60) for _ in range(3)]
+    buses = [LocalInvalidationBus(peers) for _ in caches]
+    for cache, bus in zip(caches, buses):
+        bus.subscribe(cache.invalidate)
+        cache.set("key", b"value")
+
+    buses[0].publish("key")
+    assert [cache.get("key") for cache in caches] == [b"value", None, None]
+
+
+def test_bus_without_publish_cannot_be_created():
+    """Test that a bus must implement publish."""
+
+    class SilentBus(InvalidationBus):
+        pass
+
+    with pytest.raises(TypeError):
+        SilentBus()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineMiddleware
+from app.exceptions import DeadlineExceededError
+
+
+def scope(path: str, headers=()) -> dict:
+    return {"type": "http", "method": "GET", "path": path, "headers": list(headers)}
+
+
+def test_request_timeout_from_route_and_header(monkeypatch):
+    """Test that route timeouts match by prefix and the header only shortens."""
+    monkeypatch.setattr(settings, "REQUEST_TIMEOUT_SECONDS", 30.0)
+    monkeypatch.setattr(
+        settings, "REQUEST_TIMEOUT_ROUTES", {"/auth": 10.0, "/auth/slow": 0.0}
+    )
+    api = settings.API_V1_STR
+    assert deadline.request_timeout(scope(f"{api}/users")) == 30.0
+    assert deadline.request_timeout(scope(f"{api}/auth/login")) == 10.0
+    assert deadline.request_timeout(scope(f"{api}/auth/slow")) is None
+
+    header = [(b"x-request-timeout", b"2.5")]
+    assert deadline.request_timeout(scope(f"{api}/users", header)) == 2.5
+    assert deadline.request_timeout(scope(f"{api}/auth/slow", header)) == 2.5
+    header = [(b"x-request-timeout", b"60")]
+    assert deadline.request_timeout(scope(f"{api}/auth/login", header)) == 10.0
+
+
+def test_middleware_answers_504_and_cancels():
+    """Test that a request past its deadline is cancelled with a 504 and
+    that endpoints see the deadline."""
+    cancelled = []
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    @app.get("/remaining")
+    async def remaining():
+        return {"remaining": deadline.remaining()}
+
+    client = TestClient(app)
+    headers = {"X-Request-Timeout": "0.05"}
+    start = time.monotonic()
+    response = client.get("/slow", headers=headers)
+    assert response.status_code == 504
+    assert time.monotonic() - start < 2
+    assert cancelled == [True]
+    assert 0 < client.get("/remaining", headers=headers).json()["remaining"] <= 0.05
+
+
+def test_tracked_session_refuses_work_after_deadline():
+    """Test that sessions follow the request deadline and forget finished
+    transactions."""
+    engine = create_engine("sqlite://")
+    current = Deadline(time.monotonic() + 60)
+    token = deadline._current.set(current)
+    try:
+        with Session(engine) as db:
+            deadline.track_session(db)
+            db.execute(text("SELECT 1"))
+            assert current._connections
+            db.commit()
+            assert not current._connections
+
+            current.expires_at = time.monotonic() - 1
+            with pytest.raises(DeadlineExceededError):
+                db.execute(text("SELECT 1"))
+            with pytest.raises(DeadlineExceededError):
+                deadline.check()
+    finally:
+        deadline._current.reset(token)
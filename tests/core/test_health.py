@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.health import ReadinessChecker
+
+
+def file_engine(tmp_path, **kw):
+    return create_engine(
+        f"sqlite:///{tmp_path / 'health.db'}", poolclass=QueuePool, **kw
+    )
+
+
+def test_ready_when_all_probes_pass(tmp_path):
+    """Test that a reachable database with a free pool is ready."""
+    checker = ReadinessChecker(file_engine(tmp_path))
+
+    async def run():
+        try:
+            return await checker.status()
+        finally:
+            await checker.stop()
+
+    result = asyncio.run(run())
+    assert result.ready
+    assert set(result.checks) == {"database", "pool", "event_loop"}
+    assert result.to_dict()["status"] == "ready"
+
+
+def test_status_is_cached_between_refreshes(tmp_path):
+    """Test that polling readiness does not run the database probe again."""
+    checker = ReadinessChecker(file_engine(tmp_path), refresh_seconds=60)
+    calls = []
+    select_one = checker._select_one
+    checker._select_one = lambda: calls.append(1) or select_one()
+
+    async def run():
+        try:
+            for _ in range(50):
+                await checker.status()
+        finally:
+            await checker.stop()
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_unreachable_database_is_not_ready(tmp_path):
+    """Test that a failing database probe makes the worker not ready."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'health.db'}")
+    checker = ReadinessChecker(engine)
+
+    async def run():
+        try:
+            return await checker.refresh()
+        finally:
+            await checker.stop()
+
+    result = asyncio.run(run())
+    assert not result.ready
+    assert not result.checks["database"].ok
+    assert "OperationalError" in result.checks["database"].error
+
+
+def test_saturated_pool_is_not_ready(tmp_path):
+    """Test that an exhausted pool fails the pool and database probes."""
+    engine = file_engine(tmp_path, pool_size=1, max_overflow=0, pool_timeout=5)
+    checker = ReadinessChecker(engine, db_timeout_seconds=0.1)
+
+    async def run():
+        with engine.connect():
+            return await checker.refresh()
+
+    result = asyncio.run(run())
+    assert not result.ready
+    assert "1/1 in use" in result.checks["pool"].error
+    assert "did not answer" in result.checks["database"].error
+
+
+def test_event_loop_lag_is_not_ready(tmp_path):
+    """Test that a blocked event loop is reported by the lag probe."""
+    checker = ReadinessChecker(file_engine(tmp_path), loop_lag_threshold_ms=100)
+
+    async def run():
+        checker.loop_lag.start()
+        await asyncio.sleep(0.15)
+        time.sleep(0.3)
+        await asyncio.sleep(0.15)
+        try:
+            return await checker.refresh()
+        finally:
+            await checker.stop()
+
+    result = asyncio.run(run())
+    assert not result.checks["event_loop"].ok
+    assert result.checks["database"].ok
+
+
+def test_stale_result_is_not_ready(tmp_path):
+    """Test that readiness fails when the cached result is too old."""
+    checker = ReadinessChecker(file_engine(tmp_path), max_age_seconds=0)
+
+    async def run():
+        try:
+            return await checker.status()
+        finally:
+            await checker.stop()
+
+    result = asyncio.run(run())
+    assert not result.ready
+    assert not result.checks["freshness"].ok
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.idempotency import (
+    REPLAYED_HEADER,
+    DatabaseIdempotencyStore,
+    IdempotencyManager,
+    MemoryIdempotencyStore,
+)
+from app.exceptions import IdempotencyKeyConflictError
+from app.models import idempotency as idempotency_models  # noqa: F401
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, tmp_path):
+    """Create each idempotency store implementation."""
+    if request.param == "memory":
+        return MemoryIdempotencyStore(max_entries=10, ttl_seconds=60, lease_seconds=5)
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    Base.metadata.create_all(bind=engine)
+    return DatabaseIdempotencyStore(
+        sessionmaker(bind=engine), ttl_seconds=60, lease_seconds=5
+    )
+
+
+def test_retry_replays_first_response(store):
+    """Test that a retry returns the stored response without executing."""
+    manager = IdempotencyManager(store, wait_timeout=5)
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        return {"id": len(calls)}
+
+    async def scenario():
+        first = await manager.run("k", "fp", execute, status_code=201)
+        second = await manager.run("k", "fp", execute, status_code=201)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert second.status_code == 201
+    assert second.body == first.body
+    assert second.headers[REPLAYED_HEADER] == "true"
+
+
+def test_concurrent_retries_wait_for_first_execution(store):
+    """Test that concurrent requests with one key execute only once."""
+    manager = IdempotencyManager(store, wait_timeout=5)
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"ok": True}
+
+    async def scenario():
+        return await asyncio.gather(
+            *(manager.run("k", "fp", execute) for _ in range(5))
+        )
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {response.body for response in responses} == {b'{"ok": true}'}
+
+
+def test_key_reuse_with_other_payload_rejected(store):
+    """Test that reusing a key with a different payload is refused."""
+    manager = IdempotencyManager(store, wait_timeout=5)
+
+    async def execute():
+        return {}
+
+    async def scenario():
+        await manager.run("k", "fp-1", execute)
+        await manager.run("k", "fp-2", execute)
+
+    with pytest.raises(IdempotencyKeyConflictError):
+        asyncio.run(scenario())
+
+
+def test_failed_execution_is_not_stored(store):
+    """Test that a failed first execution lets the retry run again."""
+    manager = IdempotencyManager(store, wait_timeout=5)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return {"ok": True}
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await manager.run("k", "fp", fail)
+        return await manager.run("k", "fp", succeed)
+
+    assert asyncio.run(scenario()).headers[REPLAYED_HEADER] == "false"
+
+
+def test_claim_is_renewed_while_executing():
+    """Test that a request outlasting the lease is not run again by a retry
+    on another worker."""
+    store = MemoryIdempotencyStore(max_entries=10, ttl_seconds=60, lease_seconds=0.2)
+    workers = [IdempotencyManager(store, wait_timeout=5) for _ in range(2)]
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.5)
+        return {"ok": True}
+
+    async def scenario():
+        first = asyncio.ensure_future(workers[0].run("k", "fp", execute))
+        await asyncio.sleep(0.3)
+        retry = await workers[1].run("k", "fp", execute)
+        return await first, retry
+
+    first, retry = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert retry.headers[REPLAYED_HEADER] == "true"
+
+
+def test_lost_claim_cannot_touch_the_new_one(store):
+    """Test that a claim taken over after its lease expired can no longer
+    renew, complete or release the key."""
+    store.lease_seconds = 0
+    lost = store.claim("k", "fp")
+    owner = store.claim("k", "fp")
+    assert lost and owner and lost != owner
+
+    assert not store.renew("k", lost)
+    store.release("k", lost)
+    store.complete("k", owner, 201, '{"id": 2}')
+    store.complete("k", lost, 201, '{"id": 1}')
+    record = store.get("k")
+    assert (record.status_code, record.body) == (201, '{"id": 2}')
+
+
+def test_memory_store_keeps_running_claims():
+    """Test that eviction skips claims whose request has not completed."""
+    store = MemoryIdempotencyStore(max_entries=2, ttl_seconds=60, lease_seconds=60)
+    owners = {key: store.claim(key, "fp") for key in "abc"}
+    assert all(store.get(key) is not None for key in "abc")
+
+    store.complete("b", owners["b"], 200, "{}")
+    store.claim("d", "fp")
+    assert store.get("b") is None
+    assert all(store.get(key) is not None for key in "acd")
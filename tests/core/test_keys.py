@@ -0,0 +1,89 @@
+import pytest
+from jose import jwt
+from jose.exceptions import JWTError
+
+from app.core import keys
+from app.core.keys import KeyRing, generate_private_key, rotate
+
+
+def jwk_of(kid: str):
+    keyring = KeyRing("ES256")
+    keyring.add_private_key(kid, generate_private_key("ES256"))
+    (key,) = keyring.jwks()["keys"]
+    return key
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256"])
+def test_asymmetric_sign_and_verify(algorithm: str):
+    """Test signing with the active key and verifying with its public key."""
+    keyring = KeyRing(algorithm)
+    keyring.add_private_key("k1", generate_private_key(algorithm))
+    keyring.activate()
+
+    kid, key = keyring.signing_key()
+    token = jwt.encode({"sub": "1"}, key, algorithm=algorithm, headers={"kid": kid})
+    header_kid = jwt.get_unverified_header(token)["kid"]
+    payload = jwt.decode(
+        token, keyring.verification_key(header_kid), algorithms=[algorithm]
+    )
+    assert payload["sub"] == "1"
+
+
+def test_rotation_keeps_old_keys_verifiable(tmp_path):
+    """Test that rotating keeps tokens signed with the previous key valid."""
+    (tmp_path / "k1.pem").write_bytes(generate_private_key("RS256"))
+    keyring = KeyRing("RS256")
+    keyring.load_dir(str(tmp_path))
+    keyring.activate()
+    old_kid, old_key = keyring.signing_key()
+    old_token = jwt.encode({"sub": "1"}, old_key, algorithm="RS256")
+
+    new_kid = rotate(str(tmp_path), "RS256")
+    keyring.load_dir(str(tmp_path))
+    keyring.activate(new_kid)
+
+    assert keyring.signing_key()[0] == new_kid
+    assert jwt.decode(
+        old_token, keyring.verification_key(old_kid), algorithms=["RS256"]
+    )
+    assert {key["kid"] for key in keyring.jwks()["keys"]} == {old_kid, new_kid}
+
+
+def test_jwks_contains_only_public_material():
+    """Test that the JWKS never exposes private key parameters."""
+    keyring = KeyRing("RS256")
+    keyring.add_private_key("k1", generate_private_key("RS256"))
+    (key,) = keyring.jwks()["keys"]
+    assert key["kid"] == "k1"
+    assert "d" not in key
+
+
+def test_unknown_kid_rejected():
+    """Test that tokens signed with an unknown key id are refused."""
+    keyring = KeyRing("ES256")
+    with pytest.raises(JWTError):
+        keyring.verification_key("missing")
+
+
+def test_rescan_follows_the_directory(tmp_path, monkeypatch):
+    """Test that a rescan adds new keys, drops deleted ones and moves the
+    active key to the newest unless it is pinned."""
+    monkeypatch.setattr(keys, "RELOAD_INTERVAL_SECONDS", -1)
+    (tmp_path / "k1.pem").write_bytes(generate_private_key("ES256"))
+    keyring = KeyRing("ES256")
+    keyring.load_dir(str(tmp_path))
+    keyring.add_public_jwk(jwk_of("k9"))
+    keyring.activate()
+
+    (tmp_path / "k2.pem").write_bytes(generate_private_key("ES256"))
+    assert keyring.signing_key()[0] == "k2"
+    keyring.activate("k1")
+    (tmp_path / "k3.pem").write_bytes(generate_private_key("ES256"))
+    assert keyring.signing_key()[0] == "k1"
+
+    (tmp_path / "k1.pem").unlink()
+    assert keyring.signing_key()[0] == "k3"
+    with pytest.raises(JWTError):
+        keyring.verification_key("k1")
+    # Keys trusted from elsewhere are not the directory's to drop
+    assert {key["kid"] for key in keyring.jwks()["keys"]} == {"k2", "k3", "k9"}
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from app.core.loop_monitor import LoopMonitor
+from app.core.metrics import Counter, Histogram, Registry
+
+
+def test_heartbeat_records_lag():
+    """Test that a blocking call shows up as lag in the histogram."""
+    histogram = Histogram("lag", "lag")
+    monitor = LoopMonitor(interval=0.01, histogram=histogram)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.1)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert histogram.count > 0
+    assert monitor.take_max_lag() >= 0.05
+    assert monitor.take_max_lag() == 0.0
+
+
+def test_watchdog_captures_blocking_stack():
+    """Test that a callback blocking past the threshold is reported once with
+    its stack."""
+    counter = Counter("blocked", "blocked")
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.05, blocked_counter=counter)
+
+    def slow_handler():
+        time.sleep(0.3)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        slow_handler()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor.blocked_total == 1
+    assert counter.value == 1
+    block = monitor.recent_blocks[0]
+    assert block.blocked_seconds >= 0.05
+    assert any("slow_handler" in line for line in block.stack)
+
+
+def test_no_blocks_reported_when_idle():
+    """Test that an idle loop is never reported as blocked."""
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.3)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor.blocked_total == 0
+
+
+def test_registry_renders_prometheus_text():
+    """Test the text exposition format of counters, gauges and histograms."""
+    registry = Registry()
+    registry.counter("requests_total", "Requests").inc(3)
+    registry.gauge("workers", "Workers", lambda: 2)
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    assert registry.histogram("latency_seconds", "Latency") is histogram
+
+    text = registry.render()
+    assert "# TYPE requests_total counter\nrequests_total 3.0" in text
+    assert "workers 2.0" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core import outbox
+from app.core.database import Base
+from app.core.mail import MemoryTransport
+from app.crud import crud_user
+from app.exceptions import EmailAlreadyRegisteredError
+from app.models.outbox import FAILED, PENDING, SENT, OutboxMessage
+from app.schemas.user import UserCreate
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database: deliveries update it from several threads at once
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def new_user(email="anna@gmail.com"):
+    return UserCreate.model_construct(
+        name="Anna", surname="Nowak", email=email, password="password123"
+    )
+
+
+def messages(session_factory):
+    with session_factory() as db:
+        return list(db.scalars(select(OutboxMessage).order_by(OutboxMessage.id)))
+
+
+def test_create_enqueues_in_the_same_transaction(session_factory):
+    """Test that creating a user writes one outbox message, and a failed
+    create writes none."""
+    with session_factory() as db:
+        user_id = crud_user.create(db, obj_in=new_user()).id
+        with pytest.raises(EmailAlreadyRegisteredError):
+            crud_user.create(db, obj_in=new_user())
+        db.rollback()
+
+    [message] = messages(session_factory)
+    assert message.topic == outbox.USER_CREATED
+    assert message.status == PENDING
+    assert json.loads(message.payload)["user_id"] == user_id
+
+
+def test_worker_delivers_pending_messages(session_factory):
+    """Test that a drain sends the welcome email and marks it sent."""
+    with session_factory() as db:
+        crud_user.create(db, obj_in=new_user())
+    transport = MemoryTransport()
+    worker = outbox.OutboxWorker(session_factory, transport)
+
+    assert asyncio.run(worker.drain_once()) == 1
+    assert asyncio.run(worker.drain_once()) == 0
+    [email] = transport.sent
+    assert email["To"] == "anna@gmail.com"
+    [message] = messages(session_factory)
+    assert message.status == SENT
+    assert message.attempts == 1
+
+
+def test_failures_back_off_then_give_up(session_factory):
+    """Test that failed deliveries are retried later and dropped after
+    max_attempts."""
+    with session_factory() as db:
+        outbox.enqueue(db, "unknown.topic", {})
+        db.commit()
+    worker = outbox.OutboxWorker(
+        session_factory, MemoryTransport(), max_attempts=2, backoff_seconds=60
+    )
+
+    assert asyncio.run(worker.drain_once()) == 1
+    [message] = messages(session_factory)
+    assert message.status == PENDING
+    assert message.attempts == 1
+    assert "No handler" in message.last_error
+    # Not due again until the backoff expires
+    assert asyncio.run(worker.drain_once()) == 0
+
+    worker.backoff_seconds = 0
+    with session_factory() as db:
+        db.get(OutboxMessage, message.id).available_at = message.created_at
+        db.commit()
+    assert asyncio.run(worker.drain_once()) == 1
+    assert messages(session_factory)[0].status == FAILED
+
+
+def test_concurrency_is_limited(session_factory):
+    """Test that at most ``concurrency`` deliveries run at once."""
+    with session_factory() as db:
+        for n in range(20):
+            outbox.enqueue(db, "slow", {"n": n})
+        db.commit()
+    running = []
+    peak = []
+
+    async def slow(payload, transport):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    worker = outbox.OutboxWorker(
+        session_factory,
+        MemoryTransport(),
+        handlers={"slow": slow},
+        batch_size=15,
+        concurrency=4,
+    )
+    assert asyncio.run(worker.drain_once()) == 15
+    assert max(peak) == 4
+    assert asyncio.run(worker.drain_once()) == 5
@@ -0,0 +1,98 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, SamplingProfiler
+
+
+def busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_app(profiler: SamplingProfiler) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/busy/{item_id}")
+    async def busy(item_id: int):
+        busy_loop(0.05)
+        return {"item_id": item_id}
+
+    @app.get("/idle")
+    async def idle():
+        busy_loop(0.05)
+        return {}
+
+    return app
+
+
+def test_window_collects_folded_stacks():
+    """Test that a profiling window records stacks rooted at the route."""
+    profiler = SamplingProfiler(max_stacks=1000)
+    client = TestClient(build_app(profiler))
+    profiler.start("window", seconds=10, interval=0.001)
+
+    for item_id in range(3):
+        assert client.get(f"/busy/{item_id}").status_code == 200
+    profiler.stop()
+
+    folded = profiler.folded()
+    assert profiler.state.profiled == 3
+    assert profiler.state.samples > 0
+    for line in folded.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("GET /busy/{item_id};")
+        assert int(count) > 0
+    assert "busy_loop (" in folded
+    assert profiler.folded("/busy/{item_id}") == folded
+    assert profiler.folded("GET /idle") == ""
+
+
+def test_only_selected_routes_are_profiled():
+    """Test that a route filter leaves other routes unprofiled."""
+    profiler = SamplingProfiler(max_stacks=1000)
+    client = TestClient(build_app(profiler))
+    profiler.start("window", seconds=10, routes=["/idle"], interval=0.001)
+
+    client.get("/busy/1")
+    client.get("/idle")
+    profiler.stop()
+
+    assert profiler.state.profiled == 1
+    assert profiler.folded()
+    assert all(
+        line.startswith("GET /idle;") for line in profiler.folded().split("\n")[:-1]
+    )
+
+
+def test_sample_mode_profiles_one_in_n():
+    """Test that sample mode selects one in every_n requests."""
+    profiler = SamplingProfiler(max_stacks=1000)
+    assert profiler.select("/idle") == (False, None)
+    profiler.start("sample", seconds=10, every_n=3)
+
+    selected = [profiler.select("/idle")[0] for _ in range(9)]
+
+    assert selected == [True, False, False] * 3
+    assert profiler.state.seen == 9
+    assert profiler.state.profiled == 3
+
+
+def test_window_expires_and_stacks_are_bounded():
+    """Test that sessions end on their own and distinct stacks are capped."""
+    profiler = SamplingProfiler(max_stacks=1)
+    profiler.start("window", seconds=0.01)
+    with profiler._lock:
+        profiler._record("GET /a;f (a.py:1)")
+        profiler._record("GET /a;g (a.py:2)")
+    time.sleep(0.02)
+
+    assert profiler.select("/a") == (False, None)
+    assert profiler.state.samples == 2
+    assert profiler.state.dropped == 1
+    assert profiler.folded() == "GET /a;f (a.py:1) 1\n"
+    profiler.reset()
+    assert profiler.folded() == ""
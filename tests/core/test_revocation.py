@@ -0,0 +1,36 @@
+import time
+
+from app.core.revocation import RevocationList, SQLiteRevocationStore
+
+
+def test_revoke_is_single_use():
+    """Test that a token id can only be revoked once."""
+    revocations = RevocationList()
+    exp = int(time.time()) + 600
+    assert revocations.revoke("abc", exp) is True
+    assert revocations.revoke("abc", exp) is False
+    assert revocations.is_revoked("abc")
+    assert not revocations.is_revoked("other")
+
+
+def test_expired_entries_are_evicted():
+    """Test that revocations are dropped once their bucket has expired."""
+    revocations = RevocationList(bucket_seconds=10)
+    now = int(time.time())
+    revocations.revoke("expired", now - 30)
+    revocations.revoke("live", now + 600)
+    assert not revocations.is_revoked("expired")
+    assert revocations.is_revoked("live")
+    assert len(revocations) == 1
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    """Test that persisted revocations are reloaded on startup."""
+    path = str(tmp_path / "revocations.db")
+    exp = int(time.time()) + 600
+    store = SQLiteRevocationStore(path)
+    RevocationList(store=store).revoke("persisted", exp)
+    store.close()
+
+    reloaded = RevocationList(store=SQLiteRevocationStore(path))
+    assert reloaded.is_revoked("persisted")
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import deps
+from app.core import security
+from app.core.cache import LocalInvalidationBus, TTLCache
+from app.core.config import settings
+from app.crud import crud_user, token_versions
+from app.schemas.token import TokenPayload
+
+
+@pytest.fixture
+def user():
+    """Create an in-memory user carrying the fields used for claims."""
+    return SimpleNamespace(id=4242, is_active=True, is_superuser=True, token_version=3)
+
+
+@pytest.fixture(autouse=True)
+def reset_token_versions():
+    """Isolate the token version cache between tests."""
+    token_versions.cache.clear()
+    yield
+    token_versions.cache.clear()
+
+
+def test_user_access_token_embeds_claims(user):
+    """Test that access tokens carry the user's authorization claims."""
+    token = security.create_user_access_token(user)
+    payload = TokenPayload(**security.decode_token(token))
+    assert payload.sub == user.id
+    assert payload.cv == security.TOKEN_CLAIMS_VERSION
+    assert payload.act is True
+    assert payload.adm is True
+    assert payload.tv == 3
+
+
+def test_admin_claims_authorise_without_database(user):
+    """Test that admin claims are accepted without loading the user."""
+    token = security.create_user_access_token(user)
+    token_versions.record(user.id, user.token_version)
+    token_data = deps.get_token_payload(token)
+    claims = deps.get_current_claims(db=None, token_data=token_data)
+    assert deps.get_current_admin_claims(claims).sub == user.id
+
+
+def test_token_version_bump_invalidates_old_tokens(user):
+    """Test that tokens issued before a privilege change are rejected."""
+    token = security.create_user_access_token(user)
+    token_versions.store(user.id, user.token_version + 1)
+    token_data = deps.get_token_payload(token)
+    with pytest.raises(HTTPException) as exc_info:
+        deps.get_current_claims(db=None, token_data=token_data)
+    assert exc_info.value.status_code == 403
+
+
+def test_non_admin_claims_rejected(user):
+    """Test that non-admin claims are refused by the admin dependency."""
+    user.is_superuser = False
+    token_versions.record(user.id, user.token_version)
+    token_data = deps.get_token_payload(security.create_user_access_token(user))
+    claims = deps.get_current_claims(db=None, token_data=token_data)
+    with pytest.raises(HTTPException) as exc_info:
+        deps.get_current_admin_claims(claims)
+    assert exc_info.value.status_code == 400
+
+
+def test_refresh_token_rejected_as_access_token(user):
+    """Test that refresh tokens cannot be used to authenticate requests."""
+    with pytest.raises(HTTPException) as exc_info:
+        deps.get_token_payload(security.create_refresh_token(user))
+    assert exc_info.value.status_code == 403
+
+
+def test_revoked_access_token_rejected(user):
+    """Test that revoked access tokens are refused."""
+    token = security.create_user_access_token(user)
+    token_data = deps.get_token_payload(token)
+    deps.revocation_list.revoke(token_data.jti, token_data.exp)
+    with pytest.raises(HTTPException):
+        deps.get_token_payload(token)
+
+
+def test_unknown_users_are_checked_against_the_database(
+    monkeypatch, db_session, create_user
+):
+    """Test that versions missing from the cache are loaded, and that tokens
+    of a hard-deleted user are rejected."""
+    user = create_user("token.versions@gmail.com")
+    assert token_versions.is_current(db_session, user.id, user.token_version)
+    assert token_versions.cache.get(token_versions.cache_key(user.id)) == 0
+
+    monkeypatch.setattr(settings, "USER_SOFT_DELETE", False)
+    crud_user.remove(db_session, id=user.id)
+    assert not token_versions.is_current(db_session, user.id, user.token_version)
+
+
+def test_token_version_bump_reaches_other_workers(user):
+    """Test that a bump drops the version cached by other workers."""
+    peer_cache = TTLCache(max_entries=10, ttl_seconds=60)
+    peer_bus = LocalInvalidationBus(token_versions.bus.peers)
+    peer_bus.subscribe(peer_cache.invalidate)
+    key = token_versions.cache_key(user.id)
+    peer_cache.set(key, user.token_version)
+    try:
+        token_versions.store(user.id, user.token_version + 1)
+        assert peer_cache.get(key) is None
+    finally:
+        token_versions.bus.peers.remove(peer_bus)
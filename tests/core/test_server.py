@@ -0,0 +1,35 @@
+import pytest
+
+from app.core import server
+from app.core.config import settings
+
+
+def test_profile_overrides(monkeypatch):
+    """Test that SERVER_* settings override the profile's values."""
+    monkeypatch.setattr(settings, "SERVER_KEEPALIVE_SECONDS", 30)
+    monkeypatch.setattr(settings, "SERVER_LIMIT_CONCURRENCY", 64)
+    profile = server.get_profile("tuned")
+    assert (profile.keepalive_seconds, profile.limit_concurrency) == (30, 64)
+    assert profile.backlog == server.PROFILES["tuned"].backlog
+
+    with pytest.raises(ValueError):
+        server.get_profile("nonexistent")
+
+
+def test_uvicorn_options_follow_profile(monkeypatch):
+    """Test that missing accelerators fall back and options map to uvicorn."""
+    monkeypatch.setattr(server, "_installed", lambda module: module == "httptools")
+    profile = server.resolve(server.get_profile("tuned"))
+    options = server.uvicorn_options(profile, "127.0.0.1", 9000)
+    assert options["loop"] == "asyncio"
+    assert options["http"] == "httptools"
+    assert options["timeout_keep_alive"] == 75
+    assert options["limit_concurrency"] == 1000
+    assert options["backlog"] == 4096
+
+
+def test_hypercorn_profile_needs_hypercorn(monkeypatch):
+    """Test that the http2 profile reports a missing hypercorn clearly."""
+    monkeypatch.setattr(server, "_installed", lambda module: False)
+    with pytest.raises(RuntimeError, match="hypercorn"):
+        server.hypercorn_config(server.get_profile("http2"), "127.0.0.1", 9000)
@@ -0,0 +1,142 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.core.database import Base
+from app.core.sharding import (
+    HashRing,
+    ShardRouter,
+    SnowflakeGenerator,
+    restricted_ids,
+)
+from app.crud import crud_user, user_cache
+from app.exceptions import EmailAlreadyRegisteredError
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.utils import seed
+from app.utils.reshard import reshard
+
+
+def sqlite_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    # One bcrypt hash for every user
+    monkeypatch.setattr(crud_user, "get_password_hash", seed.hashed_password)
+    user_cache.cache.clear()
+    yield {f"shard{n}": sqlite_engine(tmp_path / f"shard{n}.db") for n in range(4)}
+    user_cache.cache.clear()
+
+
+@pytest.fixture
+def router(tmp_path, shards):
+    three = {name: shards[name] for name in ("shard0", "shard1", "shard2")}
+    return ShardRouter(sqlite_engine(tmp_path / "default.db"), three)
+
+
+def count_users(engine):
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(User))
+
+
+def create_users(router, count):
+    with router.sessionmaker()() as db:
+        return [
+            crud_user.create(
+                db,
+                obj_in=UserCreate.model_construct(
+                    name="Anna",
+                    surname="Nowak",
+                    email=f"user{n:02d}@gmail.com",
+                    password="password123",
+                ),
+            ).id
+            for n in range(count)
+        ]
+
+
+def test_ring_moves_few_keys_when_a_shard_is_added():
+    """Test that a new shard only takes keys over from the existing ones."""
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    keys = range(10000)
+    moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+    assert all(after.shard_for(key) == "d" for key in moved)
+    assert 1500 < len(moved) < 3500
+
+
+def test_snowflake_ids_are_unique_and_increasing():
+    """Test that generated ids never repeat or go backwards."""
+    ids = SnowflakeGenerator(worker_id=3)
+    generated = [ids.next_id() for _ in range(10000)]
+    assert generated == sorted(set(generated))
+    assert generated[0] >> 12 & 0x3FF == 3
+
+
+def test_crud_on_sharded_session(router):
+    """Test that users are stored on their shard and reads find them."""
+    ids = create_users(router, 30)
+    for name, engine in router.shards.items():
+        expected = sum(router.shard_for_user(user_id) == name for user_id in ids)
+        assert count_users(engine) == expected > 0
+    assert count_users(router.default) == 0
+    assert restricted_ids(select(User).where(User.id == 5, User.name == "A")) == {5}
+    assert restricted_ids(select(User).where(User.id.in_([1, 2]))) == {1, 2}
+    assert restricted_ids(select(User).where(User.id > 5)) is None
+    assert restricted_ids(crud_user.GET_BY_ID, {"id": 9}) == {9}
+    assert restricted_ids(crud_user.GET_BY_ID) is None
+
+    with router.sessionmaker()() as db:
+        user = crud_user.get(db, id=ids[7])
+        assert user.email == "user07@gmail.com"
+        assert crud_user.get_by_email(db, email="user21@gmail.com").id == ids[21]
+        crud_user.update(db, db_obj=user, obj_in={"surname": "Kowalski"})
+        assert crud_user.get_record(db, ids[7]).surname == "Kowalski"
+        crud_user.remove(db, id=ids[8])
+        assert crud_user.get(db, id=ids[8]) is None
+
+
+def test_emails_are_unique_across_shards(router):
+    """Test that an email taken on one shard cannot be registered on another."""
+    (user_id,) = create_users(router, 1)
+    with router.sessionmaker()() as db:
+        for _ in range(5):
+            # Each new user lands on a shard of its own id
+            with pytest.raises(EmailAlreadyRegisteredError):
+                create_users(router, 1)
+        assert sum(count_users(engine) for engine in router.shards.values()) == 1
+
+        crud_user.remove(db, id=user_id)
+        create_users(router, 1)
+
+
+def test_lists_merge_shards(router):
+    """Test that pages gathered from every shard come out in global order."""
+    ids = create_users(router, 30)
+    with router.sessionmaker()() as db:
+        page = crud_user.get_multi_records(db, skip=5, limit=10, sort=["-email"])
+        assert [record.email for record in page] == [
+            f"user{n:02d}@gmail.com" for n in range(24, 14, -1)
+        ]
+        after = crud_user.get_multi(db, limit=5, sort=["id"], after=[ids[9]])
+        assert [user.id for user in after] == ids[10:15]
+        fields = crud_user.get_multi_fields(
+            db, fields=["name"], limit=3, sort=["email"]
+        )
+        assert fields == [{"name": "Anna"}] * 3
+
+
+def test_reshard_moves_users_to_a_new_shard(router, shards):
+    """Test that resharding moves only the users the new ring reassigns."""
+    ids = create_users(router, 40)
+    moved = reshard(shards, ["shard0", "shard1", "shard2", "shard3"], batch_size=7)
+    assert {target for _, target in moved} == {"shard3"}
+    assert count_users(shards["shard3"]) == sum(moved.values()) > 0
+
+    new_router = ShardRouter(router.default, shards)
+    with new_router.sessionmaker()() as db:
+        assert all(crud_user.get(db, id=user_id) is not None for user_id in ids)
+        assert len(crud_user.get_multi(db, limit=100)) == 40
@@ -0,0 +1,45 @@
+from app.utils.index_advisor import (
+    IndexReport,
+    audit,
+    render_migration,
+    scratch_engine,
+)
+
+
+def test_model_indexes_present(index_report: IndexReport):
+    """Test that every index declared on the model exists in the schema."""
+    assert not index_report.missing, index_report.render()
+
+
+def test_no_sequential_scans(index_report: IndexReport):
+    """Test that no crud_user lookup falls back to a sequential scan."""
+    assert not index_report.sequential_scans, index_report.render()
+
+
+def test_case_insensitive_email_lookup_uses_index(index_report: IndexReport):
+    """Test that get_by_email is served by the lower(email) index."""
+    (plan,) = [plan for plan in index_report.plans if plan.name == "get_by_email"]
+    assert "ix_users_email_lower" in plan.indexes
+
+
+def test_unique_index_built_without_uniqueness_is_missing():
+    """Test that a declared unique index that is not unique is reported."""
+    engine = scratch_engine()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_users_email_lower")
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_users_email_lower ON users (lower(email))"
+        )
+    assert "ix_users_email_lower" in audit(engine).missing
+
+
+def test_render_migration_creates_missing_indexes():
+    """Test that the generated migration creates and drops missing indexes."""
+    report = IndexReport(
+        table="users", missing={"ix_users_email_lower": (["lower(email)"], False)}
+    )
+    source = render_migration(report, down_revision="abc123")
+    assert "down_revision: Union[str, None] = 'abc123'" in source
+    assert "[sa.text('lower(email)')]" in source
+    assert "op.drop_index('ix_users_email_lower', table_name='users')" in source
+    compile(source, "migration.py", "exec")
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.crud import crud_user, user_cache
+from app.schemas.user import UserCreate, UserResponse, dump_records
+from app.utils import seed
+
+
+@pytest.fixture
+def db():
+    user_cache.cache.clear()
+    with Session(seed.memory_engine()) as session:
+        yield session
+    user_cache.cache.clear()
+
+
+def create_user(db):
+    return crud_user.create(
+        db,
+        obj_in=UserCreate.model_construct(
+            name="Anna",
+            surname="Nowak",
+            email="anna@gmail.com",
+            password="password123",
+        ),
+    )
+
+
+def test_create_and_update_write_through(db):
+    """Test that create and update store the serialized user."""
+    user = create_user(db)
+    key = user_cache.cache_key(user.id)
+    assert json.loads(user_cache.cache.get(key).body)["surname"] == "Nowak"
+
+    crud_user.update(db, db_obj=user, obj_in={"surname": "Kowalski"})
+    assert json.loads(user_cache.cache.get(key).body)["surname"] == "Kowalski"
+
+
+def test_get_response_reads_through_and_remove_invalidates(db):
+    """Test that a miss loads from the database and remove drops the entry."""
+    user = create_user(db)
+    user_cache.cache.clear()
+    sessions = sessionmaker(bind=db.get_bind())
+
+    cached = asyncio.run(user_cache.get_response(sessions, user.id))
+    assert json.loads(cached.body)["email"] == "anna@gmail.com"
+    assert cached.etag == f'"{user.id}-1"'
+    assert user_cache.cache.get(user_cache.cache_key(user.id)) == cached
+
+    crud_user.remove(db, id=user.id)
+    assert user_cache.cache.get(user_cache.cache_key(user.id)) is None
+    assert asyncio.run(user_cache.get_response(sessions, user.id)) is None
+
+
+def test_shared_load_survives_the_first_request_being_cancelled(db):
+    """Test that a load awaited by two requests runs in a session of its own,
+    so cancelling the request that started it does not affect the other."""
+    user = create_user(db)
+    user_cache.cache.clear()
+    opened = []
+
+    def sessions():
+        session = Session(db.get_bind())
+        opened.append(session)
+        return session
+
+    async def scenario():
+        first = asyncio.ensure_future(user_cache.get_response(sessions, user.id))
+        second = asyncio.ensure_future(user_cache.get_response(sessions, user.id))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    cached = asyncio.run(scenario())
+    assert json.loads(cached.body)["email"] == "anna@gmail.com"
+    assert len(opened) == 1
+    assert not opened[0].in_transaction()
+
+
+def test_records_serialize_like_user_response(db):
+    """Test that the trusted read path returns the UserResponse JSON."""
+    seed.seed_users(db.get_bind(), 50, admins=2)
+    users = crud_user.get_multi(db, limit=50)
+    records = crud_user.get_multi_records(db, limit=50)
+    expected = TypeAdapter(List[UserResponse]).dump_json(
+        [UserResponse.model_validate(user) for user in users]
+    )
+    assert dump_records(records) == expected
+    assert crud_user.get_record(db, users[0].id) == records[0]
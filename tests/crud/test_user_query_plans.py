@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.pool import StaticPool
+
+from app.crud.crud_user import build_list_query
+from app.models.user import Base, User
+
+
+@pytest.fixture(scope="module")
+def plan_engine():
+    """Create an empty schema to inspect query plans against."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def explain(engine, stmt) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN details for a statement."""
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize(
+    "filters,sort",
+    [
+        ({"is_active": True, "is_superuser": False}, ("id",)),
+        ({"name": "John"}, ("id",)),
+        ({"email_prefix": "john"}, ("email",)),
+        ({}, ("email",)),
+        ({}, ("-name",)),
+    ],
+)
+def test_list_query_uses_index(plan_engine, filters: dict, sort: tuple):
+    """Test that list filters and sorts never fall back to a full scan."""
+    stmt = build_list_query(select(User.id, User.email), sort=sort, **filters)
+    plan = explain(plan_engine, stmt)
+    assert not any(detail == "SCAN users" for detail in plan), plan
+    assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+
+def test_unindexed_sort_rejected():
+    """Test that sorting by a column without an index is refused."""
+    with pytest.raises(ValueError):
+        build_list_query(select(User), sort=("surname",))
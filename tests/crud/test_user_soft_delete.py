@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.purge import PurgeWorker
+from app.crud import crud_user, user_cache
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.utils import seed
+
+
+@pytest.fixture
+def engine():
+    user_cache.cache.clear()
+    yield seed.memory_engine()
+    user_cache.cache.clear()
+
+
+def create_user(db, email="anna@gmail.com"):
+    return crud_user.create(
+        db,
+        obj_in=UserCreate.model_construct(
+            name="Anna",
+            surname="Nowak",
+            email=email,
+            password="password123",
+        ),
+    )
+
+
+def test_removed_user_is_hidden_from_reads(engine):
+    """Test that a soft-deleted user is kept but no longer readable."""
+    with Session(engine) as db:
+        user = create_user(db)
+        user_id = user.id
+        crud_user.remove(db, id=user_id)
+
+        assert crud_user.get(db, id=user_id) is None
+        assert crud_user.get_by_email(db, email="anna@gmail.com") is None
+        assert crud_user.get_record(db, user_id) is None
+        assert crud_user.get_multi(db) == []
+        assert crud_user.remove(db, id=user_id) is None
+        assert db.get(User, user_id).deleted_at is not None
+
+
+def test_recreating_a_deleted_email(engine):
+    """Test that a new user may take the email of a deleted one, in any case."""
+    with Session(engine) as db:
+        old_id = create_user(db).id
+        crud_user.remove(db, id=old_id)
+
+        user = create_user(db, email="Anna@gmail.com")
+        assert crud_user.get_by_email(db, email="anna@gmail.com").id == user.id
+        assert db.scalar(select(func.count()).select_from(User)) == 1
+
+
+def test_purge_deletes_old_tombstones_in_batches(engine):
+    """Test that the purge worker only deletes users deleted long enough ago."""
+    with Session(engine) as db:
+        ids = [create_user(db, f"user{n}@gmail.com").id for n in range(5)]
+        for user_id in ids:
+            crud_user.remove(db, id=user_id)
+        # The last one was deleted too recently to be purged
+        db.get(User, ids[-1]).deleted_at = datetime.utcnow() + timedelta(hours=1)
+        db.commit()
+
+    worker = PurgeWorker(
+        sessionmaker(engine),
+        purge_after_seconds=0,
+        batch_size=2,
+        batch_pause_seconds=0,
+    )
+    assert asyncio.run(worker.purge()) == 4
+
+    with Session(engine) as db:
+        assert db.scalars(select(User.id)).all() == [ids[-1]]
+        assert db.scalar(select(func.count()).select_from(User)) == 1
@@ -0,0 +1,51 @@
+"""
+Pytest plugin for the index advisor.
+
+Adds an ``index_report`` fixture auditing the users table, and with
+``--index-advisor`` prints the audit in the terminal summary. The audit runs
+against a SQLite database built by the Alembic migrations, so indexes the
+models declare but no migration creates are reported; point
+``--index-advisor-url`` at another database (e.g. a local Postgres) to audit
+it instead.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.utils.index_advisor import IndexReport, audit, migrated_engine
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("index-advisor")
+    group.addoption(
+        "--index-advisor",
+        action="store_true",
+        help="Print the users table index audit after the test run",
+    )
+    group.addoption(
+        "--index-advisor-url",
+        default=None,
+        help="Database to audit instead of a migrated scratch schema",
+    )
+
+
+def _run_audit(config) -> IndexReport:
+    url = config.getoption("--index-advisor-url")
+    engine = create_engine(url) if url else migrated_engine()
+    try:
+        return audit(engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def index_report(pytestconfig) -> IndexReport:
+    """Index audit of the users table against the crud_user workload."""
+    return _run_audit(pytestconfig)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not config.getoption("--index-advisor"):
+        return
+    terminalreporter.write_sep("=", "index advisor")
+    terminalreporter.write_line(_run_audit(config).render())
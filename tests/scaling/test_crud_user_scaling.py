@@ -0,0 +1,135 @@
+"""
+Scaling tests for crud_user lookups.
+
+Each size in SCALING_SIZES (comma separated, default 1000,10000,100000) is
+seeded once per module and snapshotted; tests restore the snapshot into a
+fresh in-memory database. Operation cost at the largest size must grow by
+less than the square root of the size ratio, which indexed lookups meet
+with a wide margin and full scans cannot.
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.crud import crud_user
+from app.utils.seed import count_users, memory_engine, restore, seed_users, snapshot
+
+SIZES = sorted(
+    int(size) for size in os.getenv("SCALING_SIZES", "1000,10000,100000").split(",")
+)
+CALLS = 200
+ROUNDS = 5
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    """Seed every size incrementally and keep a snapshot of each."""
+    engine = memory_engine()
+    taken = {}
+    seeded = 0
+    for size in SIZES:
+        seed_users(engine, size - seeded, start=seeded, admins=0 if seeded else 1)
+        seeded = size
+        taken[size] = snapshot(engine)
+    engine.dispose()
+    yield taken
+    for connection in taken.values():
+        connection.close()
+
+
+@pytest.fixture
+def seeded_session(snapshots):
+    """Open a session on a fresh copy of the database seeded with ``size``."""
+    engines = []
+
+    def open_session(size: int) -> Session:
+        engine = memory_engine()
+        restore(snapshots[size], engine)
+        engines.append(engine)
+        return Session(engine)
+
+    yield open_session
+    for engine in engines:
+        engine.dispose()
+
+
+def per_call_seconds(db: Session, operation) -> float:
+    """Best mean time of ``operation`` over several rounds."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for n in range(CALLS):
+            operation(db, n)
+            db.expunge_all()
+        best = min(best, (time.perf_counter() - start) / CALLS)
+    return best
+
+
+def assert_sublinear(seeded_session, operation):
+    smallest, largest = SIZES[0], SIZES[-1]
+    timings = {}
+    for size in (smallest, largest):
+        with seeded_session(size) as db:
+            timings[size] = per_call_seconds(db, operation)
+    growth = timings[largest] / timings[smallest]
+    allowed = (largest / smallest) ** 0.5
+    assert growth < allowed, (
+        f"{largest} rows: {timings[largest] * 1e6:.0f}us/call, "
+        f"{smallest} rows: {timings[smallest] * 1e6:.0f}us/call "
+        f"(x{growth:.1f}, allowed x{allowed:.1f})"
+    )
+
+
+def test_snapshot_restores_seeded_rows(seeded_session):
+    """Test that restored databases hold the seeded users."""
+    for size in SIZES:
+        with seeded_session(size) as db:
+            assert count_users(db.get_bind()) == size
+            assert crud_user.get_by_email(db, email="user0@gmail.com").is_superuser
+
+
+def test_restore_isolates_tests(seeded_session):
+    """Test that changes to a restored database do not leak into the snapshot."""
+    size = SIZES[0]
+    with seeded_session(size) as db:
+        crud_user.remove(db, id=1)
+    with seeded_session(size) as db:
+        assert crud_user.get(db, id=1) is not None
+
+
+@pytest.mark.skipif(len(SIZES) < 2, reason="needs at least two sizes")
+def test_get_scales_sublinearly(seeded_session):
+    """Test that get by primary key does not slow down with table size."""
+    assert_sublinear(
+        seeded_session, lambda db, n: crud_user.get(db, id=n * 7 % SIZES[0] + 1)
+    )
+
+
+@pytest.mark.skipif(len(SIZES) < 2, reason="needs at least two sizes")
+def test_get_by_email_scales_sublinearly(seeded_session):
+    """Test that case-insensitive email lookups do not slow down with size."""
+    assert_sublinear(
+        seeded_session,
+        lambda db, n: crud_user.get_by_email(db, email=f"USER{n % SIZES[0]}@gmail.com"),
+    )
+
+
+@pytest.mark.skipif(len(SIZES) < 2, reason="needs at least two sizes")
+def test_paginated_listing_scales_sublinearly(seeded_session):
+    """Test that listing a page at a fixed offset does not slow down with size."""
+    assert_sublinear(
+        seeded_session,
+        lambda db, n: crud_user.get_multi(db, skip=n % 10 * 50, limit=50),
+    )
+
+
+@pytest.mark.skipif(len(SIZES) < 2, reason="needs at least two sizes")
+def test_filtered_listing_scales_sublinearly(seeded_session):
+    """Test that a filtered, sorted page is served by an index at any size."""
+    assert_sublinear(
+        seeded_session,
+        lambda db, n: crud_user.get_multi(db, name="John", sort=["-name"], limit=50),
+    )
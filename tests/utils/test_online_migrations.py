@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+
+import pytest
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy.exc import OperationalError
+
+from app.utils import online_migrations as online
+
+ROWS = 20000
+BATCH_SIZE = 1000
+
+metadata = sa.MetaData()
+users = sa.Table(
+    "users",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String, nullable=False),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'online.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            users.insert(),
+            [{"id": i, "name": f"user{i}"} for i in range(1, ROWS + 1)],
+        )
+    yield engine
+    engine.dispose()
+
+
+@contextmanager
+def migration(engine, online_mode=True):
+    with engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"online": online_mode, "transaction_per_migration": True}
+        )
+        with Operations.context(context), context.begin_transaction():
+            yield
+        if connection.in_transaction():
+            connection.commit()
+
+
+def add_nickname(engine, online_mode=True):
+    with migration(engine, online_mode):
+        online.add_column("users", sa.Column("nickname", sa.String(), nullable=True))
+
+
+def count_missing(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT count(*) FROM users WHERE nickname IS NULL"
+        ).scalar()
+
+
+def test_backfill_in_batches_with_progress(engine):
+    """Test that a backfill walks the table in batches and reports progress."""
+    add_nickname(engine)
+    reports = []
+    with migration(engine):
+        updated = online.backfill(
+            "users",
+            {"nickname": sa.text("name")},
+            name="nickname",
+            batch_size=BATCH_SIZE,
+            pause=0,
+            progress=lambda *report: reports.append(report),
+        )
+
+    assert updated == ROWS
+    assert count_missing(engine) == 0
+    assert len(reports) == ROWS // BATCH_SIZE
+    assert reports[-1] == ("nickname", ROWS, ROWS)
+    with engine.connect() as connection:
+        assert not connection.exec_driver_sql(
+            "SELECT count(*) FROM online_migration_progress"
+        ).scalar()
+
+
+def test_backfill_resumes_after_interruption(engine):
+    """Test that an interrupted backfill resumes after the last batch."""
+    add_nickname(engine)
+
+    def interrupt(name, done, total):
+        if done == 5 * BATCH_SIZE:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        with migration(engine):
+            online.backfill(
+                "users",
+                {"nickname": sa.text("name")},
+                name="nickname",
+                batch_size=BATCH_SIZE,
+                pause=0,
+                progress=interrupt,
+            )
+    # Completed batches were committed
+    assert count_missing(engine) == ROWS - 5 * BATCH_SIZE
+
+    reports = []
+    with migration(engine):
+        updated = online.backfill(
+            "users",
+            {"nickname": sa.text("name")},
+            name="nickname",
+            batch_size=BATCH_SIZE,
+            pause=0,
+            progress=lambda *report: reports.append(report),
+        )
+
+    assert updated == ROWS - 5 * BATCH_SIZE
+    assert reports[0] == ("nickname", 6 * BATCH_SIZE, ROWS)
+    assert count_missing(engine) == 0
+
+
+def test_backfill_where_in_transaction(engine):
+    """Test a filtered backfill inside the migration transaction."""
+    add_nickname(engine, online_mode=False)
+    with migration(engine, online_mode=False):
+        updated = online.backfill(
+            "users",
+            {"nickname": "even"},
+            name="even",
+            where=sa.text("id % 2 = 0"),
+            batch_size=BATCH_SIZE,
+            pause=0,
+        )
+
+    assert updated == ROWS // 2
+    assert count_missing(engine) == ROWS // 2
+
+
+def test_backfill_sparse_keys(engine):
+    """Test that batches hold batch_size rows however far apart the keys are."""
+    with engine.begin() as connection:
+        # Snowflake ids: a few rows spread over a huge key range
+        connection.execute(
+            users.insert(),
+            [{"id": (i << 22) | 7, "name": f"user{i}"} for i in range(1, 101)],
+        )
+    add_nickname(engine)
+    reports = []
+    with migration(engine):
+        updated = online.backfill(
+            "users",
+            {"nickname": sa.text("name")},
+            name="nickname",
+            where=sa.text("id > 4194304"),
+            batch_size=40,
+            pause=0,
+            progress=lambda *report: reports.append(report),
+        )
+
+    assert updated == 100
+    assert [report[1:] for report in reports] == [(40, 100), (80, 100), (100, 100)]
+    assert count_missing(engine) == ROWS
+
+
+def test_create_and_drop_index(engine):
+    """Test index helpers on a database without concurrent builds."""
+    with migration(engine):
+        online.create_index("ix_users_name", "users", ["name"])
+    assert "ix_users_name" in {
+        index["name"] for index in sa.inspect(engine).get_indexes("users")
+    }
+
+    with migration(engine):
+        online.drop_index("ix_users_name", "users")
+    assert not sa.inspect(engine).get_indexes("users")
+
+
+def test_lock_timeout_is_retried(engine):
+    """Test that DDL failing to get its lock is retried."""
+    attempts = []
+
+    def operation():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OperationalError("ALTER TABLE", {}, Exception("database is locked"))
+        return "done"
+
+    with migration(engine):
+        assert online.with_lock_timeout(operation, retries=3, backoff=0) == "done"
+    assert len(attempts) == 3
+
+
+def test_lock_timeout_gives_up(engine):
+    """Test that the lock error propagates once retries are exhausted."""
+
+    def operation():
+        raise OperationalError("ALTER TABLE", {}, Exception("database is locked"))
+
+    with pytest.raises(OperationalError), migration(engine):
+        online.with_lock_timeout(operation, retries=2, backoff=0)
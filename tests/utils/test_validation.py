@@ -0,0 +1,83 @@
+import pytest
+
+from app.exceptions.user import UserBatchValidationError
+from app.schemas.user import UserCreate
+from app.utils import validation
+
+
+def record(**overrides):
+    return {
+        "name": "anna",
+        "surname": " nowak ",
+        "email": "anna@gmail.com",
+        "password": "password123",
+        **overrides,
+    }
+
+
+def test_batch_cleans_valid_records():
+    """Test that valid records come back cleaned like UserCreate does."""
+    report = validation.validate_users([record()])
+    assert report.ok
+    cleaned = UserCreate.model_validate(record())
+    assert report.valid[0]["name"] == cleaned.name == "Anna"
+    assert report.valid[0]["surname"] == cleaned.surname == "Nowak"
+
+
+def test_batch_reports_every_error():
+    """Test that one call reports all errors of all records."""
+    records = [
+        record(),
+        record(name="A1", email="jan@gmail.com", password="short"),
+        record(email="anna@yahoo.com"),
+        record(email="ANNA@gmail.com"),
+        {"name": "Jan"},
+    ]
+    report = validation.validate_users(records)
+    assert report.valid_indexes == [0]
+    assert [(error.index, error.field) for error in report.errors] == [
+        (1, "name"),
+        (1, "password"),
+        (2, "email"),
+        (3, "email"),
+        (4, "surname"),
+        (4, "email"),
+        (4, "password"),
+    ]
+    with pytest.raises(UserBatchValidationError) as excinfo:
+        report.raise_for_errors()
+    assert len(excinfo.value.errors) == 7
+
+
+@pytest.mark.parametrize(
+    "email", ["anna..nowak@gmail.com", "anna.@gmail.com", "Anna@GMAIL.com"]
+)
+def test_batch_checks_emails_like_user_create(email):
+    """Test that the batch accepts, rejects and normalizes emails as UserCreate."""
+    report = validation.validate_users([record(email=email)])
+    try:
+        cleaned = UserCreate.model_validate(record(email=email))
+    except ValueError:
+        assert [error.field for error in report.errors] == ["email"]
+    else:
+        assert report.valid[0]["email"] == cleaned.email
+
+
+def test_max_errors_stops_early():
+    """Test that validation stops once max_errors errors were found."""
+    records = [record(surname="X", email=f"user{n}@gmail.com") for n in range(100)]
+    report = validation.validate_users(records, max_errors=5)
+    assert len(report.errors) == 5
+
+
+def test_rules_are_snapshotted(monkeypatch):
+    """Test that rules only follow settings changes once reloaded."""
+    monkeypatch.setattr(validation.settings, "PASSWORD_MIN_LENGTH", 20)
+    assert validation.check_password("password123")
+    try:
+        validation.reload_rules()
+        with pytest.raises(ValueError):
+            validation.check_password("password123")
+    finally:
+        monkeypatch.undo()
+        validation.reload_rules()